@@ -0,0 +1,71 @@
+"""
+# ----------------------------------------------------------------------
+# ast_arena.py
+#
+# Compare the syntax trees of the sample programs of the test suite
+# with their arena encoding: memory held, time to encode, decode and
+# serialize, and time of a simple pass (counting the uses of names)
+# over each.
+#
+# Usage: python3 -m bench.ast_arena [copies]
+# ----------------------------------------------------------------------
+"""
+
+import gc
+import sys
+import time
+import tracemalloc
+
+from bench.parser_engines import load_sources
+from compiler import arena, ast, error, lex, parse
+
+
+def _traced(func):
+    """Call 'func'; return its result and the memory it left allocated."""
+    gc.collect()
+    tracemalloc.start()
+    result = func()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, size
+
+
+def _timed(func):
+    """Call 'func'; return its result and the time it took."""
+    start = time.perf_counter()
+    result = func()
+    return result, time.perf_counter() - start
+
+
+def main():
+    """Run the benchmark."""
+    copies = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    buf = lex.tokenize_to_buffer(load_sources() * copies)
+    parser = parse.Parser(logger=error.LoggerMock())
+
+    tree, tree_size = _traced(lambda: parser.parse(buf))
+    flat, flat_size = _traced(lambda: arena.Arena.from_tree(tree))
+    print("tree  %10d bytes" % tree_size)
+    print("arena %10d bytes, %d rows" % (flat_size, len(flat)))
+
+    _, encoded = _timed(lambda: arena.Arena.from_tree(tree))
+    _, decoded = _timed(flat.to_tree)
+    data, dumped = _timed(flat.to_bytes)
+    _, loaded = _timed(lambda: arena.Arena.from_bytes(data))
+    print("encode %.3fs, decode %.3fs" % (encoded, decoded))
+    print("to_bytes %.3fs, from_bytes %.3fs, %d bytes" % (
+        dumped, loaded, len(data)
+    ))
+
+    code = arena.kind_codes[ast.GenidExpression]
+    uses, walked = _timed(lambda: sum(
+        1 for node in ast.iter_preorder(tree)
+        if isinstance(node, ast.GenidExpression)
+    ))
+    flat_uses, scanned = _timed(lambda: flat.kinds.count(code))
+    assert uses == flat_uses
+    print("count names: tree %.4fs, arena %.4fs" % (walked, scanned))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,64 @@
+"""
+# ----------------------------------------------------------------------
+# ast_memory.py
+#
+# Measure the memory held by the syntax trees of the sample programs of
+# the test suite, and the time taken to walk, compare and hash them.
+#
+# Usage: python3 -m bench.ast_memory [copies]
+# ----------------------------------------------------------------------
+"""
+
+import sys
+import time
+import tracemalloc
+
+from bench.parser_engines import load_sources
+from compiler import ast, error, lex, parse
+
+
+def main():
+    """Run the benchmark."""
+    copies = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    buf = lex.tokenize_to_buffer(load_sources() * copies)
+    parser = parse.Parser(logger=error.LoggerMock())
+
+    tracemalloc.start()
+    tree = parser.parse(buf)
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    other = parser.parse(buf)
+
+    start = time.perf_counter()
+    count = sum(1 for _ in ast.iter_preorder(tree))
+    walked = time.perf_counter() - start
+
+    start = time.perf_counter()
+    assert tree == other
+    compared = time.perf_counter() - start
+
+    start = time.perf_counter()
+    ast.structural_hash(tree)
+    hashed = time.perf_counter() - start
+
+    # Unequal trees with cached hashes differ at once.
+    changed = parser.parse(buf)
+    changed.list[-1] = other.list[0]
+    with ast.cached_hashes():
+        ast.structural_hash(tree)
+        ast.structural_hash(changed)
+        start = time.perf_counter()
+        assert tree != changed
+        compared_hashed = time.perf_counter() - start
+
+    print("%d nodes, %d bytes, %.1f bytes/node" % (
+        count, size, size / count
+    ))
+    print("preorder walk %.3fs, comparison %.3fs" % (walked, compared))
+    print("structural hash %.3fs, comparison of hashed trees %.6fs" % (
+        hashed, compared_hashed
+    ))
+
+
+if __name__ == '__main__':
+    main()
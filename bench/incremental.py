@@ -0,0 +1,65 @@
+"""
+# ----------------------------------------------------------------------
+# incremental.py
+#
+# Compare full and incremental reparsing of a large program after small
+# edits: changing a character in the middle of a line, and inserting a
+# line, which moves all the definitions below it. The incremental time
+# is split into taking in the edit and building the AST, which moves
+# the trees below the edit.
+#
+# Usage: python3 -m bench.incremental [count]
+# ----------------------------------------------------------------------
+"""
+
+import sys
+import time
+
+from compiler import error, incremental, parse
+
+
+def make_program(count):
+    """Return a program of 'count' small definitions."""
+    return "".join(
+        "let f%d a b =\n  (a + %d) * b - f (g a) x[a, b]\n" % (i, i)
+        for i in range(count)
+    )
+
+
+def timed(func, *args):
+    """Call 'func' with 'args'. Return its result and the elapsed time."""
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+
+def main():
+    """Run the benchmark."""
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    source = make_program(count)
+    middle = source.index("let f%d " % (count // 2))
+    edits = (
+        ("char", source[:middle + 4] + "g" + source[middle + 5:]),
+        ("line", source[:middle] + "let z = 0\n" + source[middle:])
+    )
+
+    parser = incremental.IncrementalParser(logger=error.LoggerMock())
+    _, elapsed = timed(parser.parse, source)
+    print("%-6s %-12s %10.2f ms" % ("", "initial", 1e3 * elapsed))
+    for name, data in edits:
+        full, full_time = timed(
+            parse.Parser(logger=error.LoggerMock()).parse,
+            data
+        )
+        parser.parse(source)
+        _, update_time = timed(parser.update, data)
+        tree, program_time = timed(parser.program)
+        print("%-6s %-12s %10.2f ms" % (name, "full", 1e3 * full_time))
+        print("%-6s %-12s %10.2f ms" % (name, "update", 1e3 * update_time))
+        print("%-6s %-12s %10.2f ms" % (name, "program", 1e3 * program_time))
+        if tree != full:
+            print("error: the trees differ")
+
+
+if __name__ == '__main__':
+    main()
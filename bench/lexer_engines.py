@@ -0,0 +1,53 @@
+"""
+# ----------------------------------------------------------------------
+# lexer_engines.py
+#
+# Compare the tokens/sec of the available lexing engines on a large
+# input made of the sample programs under tests/correct.
+#
+# Usage: python3 -m bench.lexer_engines [copies]
+# ----------------------------------------------------------------------
+"""
+
+import glob
+import os
+import sys
+import time
+
+from compiler import error, lex
+
+_SAMPLES = os.path.join(os.path.dirname(__file__), '..', 'tests', 'correct')
+
+
+def make_source(copies):
+    """Concatenate 'copies' copies of every sample program."""
+    programs = []
+    for name in sorted(glob.glob(os.path.join(_SAMPLES, '*.lla'))):
+        with open(name) as program:
+            programs.append(program.read())
+    return '\n'.join(programs) * copies
+
+
+def measure(engine, data):
+    """Return the number of tokens and the seconds taken to lex 'data'."""
+    lexer = lex.Lexer(logger=error.LoggerMock(), engine=engine)
+    lexer.input(data)
+    start = time.perf_counter()
+    count = sum(1 for _ in lexer)
+    return count, time.perf_counter() - start
+
+
+def main():
+    """Run the benchmark and print throughput per engine."""
+    copies = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    data = make_source(copies)
+    print("input: %d bytes" % len(data))
+    for engine in ('ply', 'dfa'):
+        count, elapsed = measure(engine, data)
+        print("%-4s %8d tokens %10.0f tokens/s" % (
+            engine, count, count / elapsed
+        ))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,45 @@
+"""
+# ----------------------------------------------------------------------
+# lexer_reuse.py
+#
+# Measure the per-input overhead of lexing many small snippets, with a
+# fresh Lexer per snippet versus one Lexer re-fed every snippet.
+#
+# Usage: python3 -m bench.lexer_reuse [count]
+# ----------------------------------------------------------------------
+"""
+
+import sys
+import timeit
+
+from compiler import error, lex
+
+SNIPPET = 'let rec fact n = if n <= 1 then 1 else n * fact (n - 1)\n'
+
+
+def lex_fresh(count):
+    """Lex 'count' snippets, building a new Lexer for each."""
+    for _ in range(count):
+        lexer = lex.Lexer(logger=error.LoggerMock())
+        for _ in lexer.tokenize(SNIPPET):
+            pass
+
+
+def lex_reused(count):
+    """Lex 'count' snippets with one Lexer."""
+    lexer = lex.Lexer(logger=error.LoggerMock())
+    for _ in range(count):
+        for _ in lexer.tokenize(SNIPPET):
+            pass
+
+
+def main():
+    """Run the benchmark and print per-input timings."""
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    for name, func in (("fresh", lex_fresh), ("reused", lex_reused)):
+        elapsed = min(timeit.repeat(lambda: func(count), number=1, repeat=3))
+        print("%-8s %8.1f us/input" % (name, 1e6 * elapsed / count))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,80 @@
+"""
+# ----------------------------------------------------------------------
+# parser_engines.py
+#
+# Compare the parsing engines: PLY's generic LR driver, the parser
+# module generated from the same tables and the hand-written parser,
+# on the sample programs and on expression-heavy code. The input is
+# lexed into a list of tokens beforehand, so that only parsing is timed.
+#
+# Usage: python3 -m bench.parser_engines [repeat]
+# ----------------------------------------------------------------------
+"""
+
+import itertools
+import os
+import sys
+import time
+
+from compiler import error, lex, parse
+
+
+def load_sources():
+    """Return the concatenated sample programs of the test suite."""
+    path = os.path.join(os.path.dirname(__file__), '..', 'tests', 'correct')
+    sources = []
+    for name in sorted(os.listdir(path)):
+        with open(os.path.join(path, name)) as stream:
+            sources.append(stream.read())
+    return "\n".join(sources)
+
+
+def make_expressions(count):
+    """Return a program of 'count' arithmetic and boolean definitions."""
+    return "".join(
+        "let e%d a b = (a + %d) * b - a / (b mod 7) ** 2.0 "
+        "<= -a && not (b = %d) || f (g a) x[a, b] := !x; a\n" % (i, i, i)
+        for i in range(count)
+    )
+
+
+class ListLexer:
+    """A lexer returning the tokens of a list."""
+
+    def __init__(self, tokens):
+        self.token = itertools.chain(tokens, itertools.repeat(None)).__next__
+
+
+def run(name, source, repeat):
+    """Time each engine on 'source' and print per-token timings."""
+    tokens = list(lex.tokenize_to_buffer(source))
+    count = len(tokens)
+    results = {}
+    for engine in parse.ENGINES:
+        parser = parse.Parser(logger=error.LoggerMock(), engine=engine)
+        best = float('inf')
+        for _ in range(repeat):
+            lexer = ListLexer(tokens)
+            start = time.perf_counter()
+            results[engine] = parser.parse(None, lexer)
+            best = min(best, time.perf_counter() - start)
+        print("%-12s %-10s %8d tokens %8.3f us/token" % (
+            name,
+            engine,
+            count,
+            1e6 * best / count
+        ))
+
+    if any(result != results['ply'] for result in results.values()):
+        print("error: the engines built different trees")
+
+
+def main():
+    """Run the benchmark."""
+    repeat = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    run("samples", load_sources() * 10, repeat)
+    run("expressions", make_expressions(1000), repeat)
+
+
+if __name__ == '__main__':
+    main()
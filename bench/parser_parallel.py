@@ -0,0 +1,64 @@
+"""
+# ----------------------------------------------------------------------
+# parser_parallel.py
+#
+# Measure parsing of a large generated program across a growing number
+# of worker processes, against a sequential parse. Time should scale
+# down with the number of workers, up to the number of cores, bounded
+# by the sequential lexing of the input.
+#
+# Usage: python3 -m bench.parser_parallel [count] [engine]
+# ----------------------------------------------------------------------
+"""
+
+import os
+import sys
+import time
+
+from compiler import error, parse
+
+
+def make_program(count):
+    """Return a program of 'count' small definitions."""
+    return "".join(
+        "let f%d a b =\n  let c = (a + %d) * b in f (g c) x[a, b] - c\n"
+        "type t%d = T%d of int | U%d\n" % (i, i, i, i, i)
+        for i in range(count)
+    )
+
+
+def main():
+    """Run the benchmark."""
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    engine = sys.argv[2] if len(sys.argv) > 2 else 'ply'
+    source = make_program(count)
+
+    start = time.perf_counter()
+    expected = parse.Parser(logger=error.LoggerMock(), engine=engine).parse(
+        source
+    )
+    sequential = time.perf_counter() - start
+    print("%-12s %10.2f s" % ("sequential", sequential))
+
+    workers = 1
+    while workers <= (os.cpu_count() or 1):
+        start = time.perf_counter()
+        tree = parse.parse_parallel(
+            source,
+            error.LoggerMock(),
+            workers=workers,
+            engine=engine
+        )
+        elapsed = time.perf_counter() - start
+        print("%-12s %10.2f s %8.2fx" % (
+            "%d workers" % workers,
+            elapsed,
+            sequential / elapsed
+        ))
+        if tree != expected:
+            print("error: the trees differ")
+        workers *= 2
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,56 @@
+"""
+# ----------------------------------------------------------------------
+# parser_positions.py
+#
+# Measure the throughput gained by parsing without tracking positions,
+# on each engine, over the sample programs of the test suite. The input
+# is lexed into a token buffer beforehand, so that only parsing is
+# timed.
+#
+# Usage: python3 -m bench.parser_positions [repeat]
+# ----------------------------------------------------------------------
+"""
+
+import sys
+import time
+
+from bench.parser_engines import load_sources
+from compiler import error, lex, parse
+
+
+def run(source, repeat):
+    """Time each engine with and without positions on 'source'."""
+    buf = lex.tokenize_to_buffer(source)
+    count = len(buf)
+    for engine in parse.ENGINES:
+        timings = {}
+        for track in (True, False):
+            parser = parse.Parser(
+                logger=error.LoggerMock(),
+                engine=engine,
+                track_positions=track
+            )
+            best = float('inf')
+            for _ in range(repeat):
+                start = time.perf_counter()
+                parser.parse(buf)
+                best = min(best, time.perf_counter() - start)
+            timings[track] = best
+        print("%-10s %8d tokens %10.0f %10.0f tokens/s %6.2fx" % (
+            engine,
+            count,
+            count / timings[True],
+            count / timings[False],
+            timings[True] / timings[False]
+        ))
+
+
+def main():
+    """Run the benchmark."""
+    repeat = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    print("%-10s %15s %10s %10s" % ("", "", "tracked", "untracked"))
+    run(load_sources() * 10, repeat)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,60 @@
+"""
+# ----------------------------------------------------------------------
+# parser_sequences.py
+#
+# Measure how parsing time scales with the length of sequences: many
+# top-level lets, functions with many parameters and matches with many
+# clauses. Time per item should stay flat as the sequences grow.
+#
+# Usage: python3 -m bench.parser_sequences [max_length]
+# ----------------------------------------------------------------------
+"""
+
+import sys
+import time
+
+from compiler import error, parse
+
+
+def make_lets(length):
+    """Return a program with 'length' top-level lets."""
+    return "".join("let x%d = %d\n" % (i, i) for i in range(length))
+
+
+def make_params(length):
+    """Return a program defining a function of 'length' parameters."""
+    params = " ".join("p%d" % i for i in range(length))
+    return "let f %s = p0\n" % params
+
+
+def make_clauses(length):
+    """Return a program with a match of 'length' clauses."""
+    clauses = " | ".join("%d -> %d" % (i, i) for i in range(length))
+    return "let f x = match x with %s end\n" % clauses
+
+
+def main():
+    """Run the benchmark and print per-item timings."""
+    max_length = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    parser = parse.Parser(logger=error.LoggerMock())
+    for name, make in (
+        ("lets", make_lets),
+        ("params", make_params),
+        ("clauses", make_clauses)
+    ):
+        length = max_length // 100
+        while length <= max_length:
+            source = make(length)
+            start = time.perf_counter()
+            parser.parse(source)
+            elapsed = time.perf_counter() - start
+            print("%-8s %8d items %8.2f us/item" % (
+                name,
+                length,
+                1e6 * elapsed / length
+            ))
+            length *= 10
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,38 @@
+"""
+# ----------------------------------------------------------------------
+# parser_setup.py
+#
+# Measure the cost of creating a Parser and parsing a small snippet
+# with it, as done once per request by short-lived callers.
+#
+# Usage: python3 -m bench.parser_setup [count]
+# ----------------------------------------------------------------------
+"""
+
+import sys
+import timeit
+
+from compiler import error, parse
+
+SNIPPET = 'let rec fact n = if n <= 1 then 1 else n * fact (n - 1)\n'
+
+
+def parse_fresh(count):
+    """Parse 'count' snippets, creating a new Parser for each."""
+    for _ in range(count):
+        parse.Parser(logger=error.LoggerMock()).parse(SNIPPET)
+
+
+def main():
+    """Run the benchmark and print per-snippet timings."""
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    elapsed = timeit.timeit(lambda: parse_fresh(1), number=1)
+    print("%-8s %8.1f us/snippet" % ("first", 1e6 * elapsed))
+    elapsed = min(
+        timeit.repeat(lambda: parse_fresh(count), number=1, repeat=3)
+    )
+    print("%-8s %8.1f us/snippet" % ("later", 1e6 * elapsed / count))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,66 @@
+"""
+# ----------------------------------------------------------------------
+# parser_tables.py
+#
+# Measure the cold start of the compiler on a tiny program, and the
+# memory held by the parser once its tables are loaded.
+#
+# Usage: python3 -m bench.parser_tables [runs]
+# ----------------------------------------------------------------------
+"""
+
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+TINY_PROGRAM = 'let main = print_string "hi"\n'
+
+MEMORY_PROBE = """
+import tracemalloc
+tracemalloc.start()
+from compiler import error, parse
+before = tracemalloc.get_traced_memory()[0]
+parse.Parser(logger=error.LoggerMock())
+print(tracemalloc.get_traced_memory()[0] - before)
+"""
+
+
+def startup(filename, runs):
+    """Return the best wall time of running main.py on 'filename'."""
+    best = float('inf')
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run(
+            [sys.executable, 'main.py', '-i', filename],
+            check=True,
+            stdout=subprocess.DEVNULL
+        )
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    """Run the benchmark and print its measurements."""
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    with tempfile.NamedTemporaryFile('w', suffix='.lla', delete=False) as tiny:
+        tiny.write(TINY_PROGRAM)
+    try:
+        # Let the first run build any missing tables.
+        startup(tiny.name, 1)
+        print("startup  %8.1f ms" % (1e3 * startup(tiny.name, runs)))
+    finally:
+        os.unlink(tiny.name)
+
+    held = subprocess.run(
+        [sys.executable, '-c', MEMORY_PROBE],
+        check=True,
+        stdout=subprocess.PIPE,
+        universal_newlines=True
+    ).stdout
+    print("tables   %8.1f KiB" % (int(held) / 1024))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,54 @@
+"""
+# ----------------------------------------------------------------------
+# token_buffer.py
+#
+# Compare the memory and time needed to hold all tokens of a large input
+# as a list of LexToken objects versus a TokenBuffer.
+#
+# Usage: python3 -m bench.token_buffer [copies]
+# ----------------------------------------------------------------------
+"""
+
+import sys
+import time
+import tracemalloc
+
+from bench.lexer_engines import make_source
+from compiler import error, lex
+
+
+def measure(func, data):
+    """Return the peak memory (bytes) and seconds taken by func(data)."""
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = func(data)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return peak, elapsed
+
+
+def token_list(data):
+    """Lex 'data' into a list of token objects."""
+    return list(lex.Lexer(logger=error.LoggerMock(), engine='dfa')
+                .tokenize(data))
+
+
+def token_buffer(data):
+    """Lex 'data' into a TokenBuffer."""
+    return lex.tokenize_to_buffer(data, logger=error.LoggerMock())
+
+
+def main():
+    """Run the benchmark and print memory and time per representation."""
+    copies = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    data = make_source(copies)
+    print("input: %d bytes" % len(data))
+    for name, func in (("list", token_list), ("buffer", token_buffer)):
+        peak, elapsed = measure(func, data)
+        print("%-7s %8.1f MiB peak %8.3f s" % (name, peak / 2**20, elapsed))
+
+
+if __name__ == '__main__':
+    main()
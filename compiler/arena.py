@@ -0,0 +1,405 @@
+"""
+# ----------------------------------------------------------------------
+# arena.py
+#
+# Flat encoding of Llama syntax trees
+#
+# An arena holds a tree as rows of parallel typed arrays, one row per
+# node, and refers to nodes by row index. Besides the nodes proper, a
+# list in a field (e.g. the parameters of a function) takes a row whose
+# children are its items, and an empty node field (e.g. a missing
+# 'else') takes a row of its own, so that the children of a node can be
+# matched to its fields by position.
+#
+# Rows come in preorder, the type of a node (if any) first, then its
+# children. Hence the rows of a subtree are contiguous, and a pass that
+# does not care for the shape of the tree may simply scan the arrays.
+# ----------------------------------------------------------------------
+"""
+
+import array
+import inspect
+import marshal
+import struct
+import sys
+
+from compiler import ast, lex
+
+# Python types of the values a row can stand for. The kind of a row is
+# the index of its type in this tuple.
+node_kinds = (type(None), list) + tuple(
+    cls for cls in vars(ast).values()
+    if inspect.isclass(cls) and issubclass(cls, ast.Node)
+    and not inspect.isabstract(cls)
+)
+
+# Map each type in node_kinds to its kind.
+kind_codes = {cls: code for code, cls in enumerate(node_kinds)}
+
+# Names of the types in node_kinds. Serialized arenas carry them, since
+# kinds change whenever the node classes of ast do.
+_kind_names = [cls.__name__ for cls in node_kinds]
+
+NONE_KIND = kind_codes[type(None)]
+LIST_KIND = kind_codes[list]
+
+# Fields holding a name, where it is not called 'name'.
+_name_fields = {ast.ForExpression: 'counter'}
+
+# Fields holding a small integer, with the type to convert it back to.
+_int_fields = {
+    ast.Array: ('dimensions', int),
+    ast.DimExpression: ('dimension', int),
+    ast.ForExpression: ('isDown', bool),
+    ast.LetDef: ('isRec', bool)
+}
+
+
+def _layout(cls):
+    """
+    Return where the fields of a 'cls' node are kept: the names of its
+    name, operator, type and integer fields (None for none), whether it
+    is a constant, and the names of the fields held by its children.
+    """
+    name = _name_fields.get(cls, 'name')
+    number, _ = _int_fields.get(cls, (None, None))
+    special = (name, 'operator', 'type', number, 'value')
+    return (
+        name if name in cls._fields else None,
+        'operator' if 'operator' in cls._fields else None,
+        'type' if 'type' in cls._fields else None,
+        number,
+        'value' in cls._fields,
+        tuple(field for field in cls._fields if field not in special)
+    )
+
+
+# Layout of each kind of node, by kind.
+_layouts = [None, None] + [_layout(cls) for cls in node_kinds[2:]]
+
+# Header of a serialized arena: magic, version, byte order and rows.
+_HEADER = struct.Struct('<4sBBQ')
+_MAGIC = b'LLAR'
+_VERSION = 2
+_BYTE_ORDERS = ('little', 'big')
+
+
+class Arena:
+    """
+    A syntax tree stored as parallel arrays.
+
+    The node at row i is of type node_kinds[kinds[i]]. Its first child
+    is at row firsts[i] and the next child of its parent at nexts[i] (-1
+    for none); its type, if any, is at row types[i]. Its name and
+    operator are identifiers.name(names[i]) and operators.name(ops[i])
+    (-1 for none), and its position is (linenos[i], lexposes[i]) (0 for
+    none). The flag or dimension of a node is kept in values[i]; for a
+    constant, values[i] is the index of its value in 'constants'.
+    """
+
+    _columns = (
+        ('kinds', 'B'),
+        ('firsts', 'i'),
+        ('nexts', 'i'),
+        ('types', 'i'),
+        ('names', 'i'),
+        ('ops', 'h'),
+        ('values', 'q'),
+        ('linenos', 'I'),
+        ('lexposes', 'I')
+    )
+
+    def __init__(self):
+        """Make an empty arena."""
+        for column, typecode in self._columns:
+            setattr(self, column, array.array(typecode))
+        self.identifiers = lex.NameTable()
+        self.operators = lex.NameTable()
+        self.constants = []
+
+    def __len__(self):
+        return len(self.kinds)
+
+    @classmethod
+    def from_tree(cls, tree):
+        """Encode the tree (or list of trees) 'tree' in a new arena."""
+        arena = cls()
+        arena.add(tree)
+        return arena
+
+    def add(self, tree):
+        """
+        Append the rows of the tree (or list of trees) 'tree', and
+        return the index of its root.
+        """
+        kinds, firsts, nexts, types = \
+            self.kinds, self.firsts, self.nexts, self.types
+        names, ops, values = self.names, self.ops, self.values
+        linenos, lexposes = self.linenos, self.lexposes
+        identifiers, operators = self.identifiers, self.operators
+        root = len(kinds)
+        # Last child encoded so far, per row.
+        last = {}
+
+        # Each entry holds a value, the row of its parent (-1 for none)
+        # and whether it is the type of its parent.
+        stack = [(tree, -1, False)]
+        while stack:
+            value, parent, is_type = stack.pop()
+            row = len(kinds)
+            if parent >= 0:
+                if is_type:
+                    types[parent] = row
+                elif parent in last:
+                    nexts[last[parent]] = row
+                else:
+                    firsts[parent] = row
+                if not is_type:
+                    last[parent] = row
+
+            kind = kind_codes[type(value)]
+            kinds.append(kind)
+            firsts.append(-1)
+            nexts.append(-1)
+            types.append(-1)
+            names.append(-1)
+            ops.append(-1)
+            values.append(0)
+            if kind == NONE_KIND or kind == LIST_KIND:
+                linenos.append(0)
+                lexposes.append(0)
+                if kind == LIST_KIND:
+                    stack.extend(
+                        (item, row, False) for item in reversed(value)
+                    )
+                continue
+
+            linenos.append(value.lineno or 0)
+            lexposes.append(value.lexpos or 0)
+            name, operator, type_, number, constant, fields = _layouts[kind]
+            if name is not None:
+                names[row] = identifiers.ident(
+                    identifiers.intern(getattr(value, name))
+                )
+            if operator is not None:
+                ops[row] = operators.ident(operators.intern(value.operator))
+            if number is not None:
+                values[row] = getattr(value, number)
+            elif constant:
+                values[row] = len(self.constants)
+                self.constants.append(value.value)
+            stack.extend(
+                (getattr(value, field), row, False)
+                for field in reversed(fields)
+            )
+            if type_ is not None and value.type is not None:
+                stack.append((value.type, row, True))
+        return root
+
+    def children(self, row):
+        """Iterate over the rows of the children of 'row', in order."""
+        child = self.firsts[row]
+        nexts = self.nexts
+        while child >= 0:
+            yield child
+            child = nexts[child]
+
+    def end(self, row):
+        """Return the row following the subtree of 'row'."""
+        firsts, nexts, types = self.firsts, self.nexts, self.types
+        while True:
+            child = firsts[row]
+            if child >= 0:
+                while nexts[child] >= 0:
+                    child = nexts[child]
+                row = child
+            elif types[row] >= 0:
+                row = types[row]
+            else:
+                return row + 1
+
+    def to_tree(self, root=0):
+        """Decode the subtree of 'root' as a tree of ast nodes."""
+        kinds, firsts, nexts, types = \
+            self.kinds, self.firsts, self.nexts, self.types
+        values = self.values
+        end = self.end(root)
+        # Decoded values of the rows after the current one, bottom-up.
+        decoded = [None] * (end - root)
+        for row in range(end - 1, root - 1, -1):
+            kind = kinds[row]
+            if kind == NONE_KIND:
+                continue
+            items = []
+            child = firsts[row]
+            while child >= 0:
+                items.append(decoded[child - root])
+                child = nexts[child]
+            if kind == LIST_KIND:
+                decoded[row - root] = items
+                continue
+
+            cls = node_kinds[kind]
+            name, operator, type_, number, constant, fields = _layouts[kind]
+            node = cls.__new__(cls)
+            if self.linenos[row]:
+                node.lineno = self.linenos[row]
+            if self.lexposes[row]:
+                node.lexpos = self.lexposes[row]
+            if name is not None:
+                setattr(node, name, self.identifiers.name(self.names[row]))
+            if operator is not None:
+                node.operator = self.operators.name(self.ops[row])
+            if type_ is not None:
+                typerow = types[row]
+                node.type = None if typerow < 0 else decoded[typerow - root]
+            if number is not None:
+                setattr(node, number, _int_fields[cls][1](values[row]))
+            elif constant:
+                node.value = self.constants[values[row]]
+            for field, item in zip(fields, items):
+                setattr(node, field, item)
+            decoded[row - root] = node
+        return decoded[0]
+
+    def node(self, row=0):
+        """Return a view of the node at 'row'."""
+        return NodeView(self, row)
+
+    # == SERIALIZATION ==
+
+    def to_bytes(self):
+        """Return the contents of the arena as a single buffer."""
+        parts = [_HEADER.pack(
+            _MAGIC,
+            _VERSION,
+            _BYTE_ORDERS.index(sys.byteorder),
+            len(self)
+        )]
+        parts.extend(
+            getattr(self, column).tobytes() for column, _ in self._columns
+        )
+        parts.append(marshal.dumps((
+            _kind_names,
+            _table_names(self.identifiers),
+            _table_names(self.operators),
+            self.constants
+        )))
+        return b''.join(parts)
+
+    @classmethod
+    def from_bytes(cls, data):
+        """Make an arena out of a buffer made by to_bytes."""
+        data = memoryview(data)
+        magic, version, order, count = _HEADER.unpack_from(data)
+        if magic != _MAGIC or version != _VERSION:
+            raise ValueError("Not an arena buffer")
+        arena = cls()
+        offset = _HEADER.size
+        for column, typecode in cls._columns:
+            values = array.array(typecode)
+            size = count * values.itemsize
+            values.frombytes(data[offset:offset + size])
+            if _BYTE_ORDERS[order] != sys.byteorder:
+                values.byteswap()
+            setattr(arena, column, values)
+            offset += size
+        kind_names, names, operators, arena.constants = \
+            marshal.loads(data[offset:])
+        if kind_names != _kind_names:
+            arena.kinds = _recode_kinds(arena.kinds, kind_names)
+        for name in names:
+            arena.identifiers.intern(name)
+        for operator in operators:
+            arena.operators.intern(operator)
+        return arena
+
+
+def _recode_kinds(kinds, kind_names):
+    """
+    Translate the kinds of an arena serialized with the node types named
+    in 'kind_names' into the current kinds.
+    """
+    current = {name: code for code, name in enumerate(_kind_names)}
+    try:
+        codes = [current[name] for name in kind_names]
+    except KeyError as exc:
+        raise ValueError("Unknown node type %s in arena buffer" % exc)
+    return array.array('B', [codes[kind] for kind in kinds])
+
+
+def _table_names(table):
+    """Return the names of a lex.NameTable, in order of id."""
+    return [table.name(ident) for ident in range(len(table))]
+
+
+class NodeView:
+    """
+    A node of an arena, offering the fields of the ast node it stands
+    for as attributes. Child nodes are returned as views in turn.
+    """
+
+    __slots__ = ('arena', 'row')
+
+    def __init__(self, arena, row):
+        self.arena = arena
+        self.row = row
+
+    @property
+    def kind(self):
+        """The ast class of the node."""
+        return node_kinds[self.arena.kinds[self.row]]
+
+    @property
+    def lineno(self):
+        return self.arena.linenos[self.row] or None
+
+    @property
+    def lexpos(self):
+        return self.arena.lexposes[self.row] or None
+
+    def _view(self, row):
+        """Return the value of 'row', with nodes as views."""
+        arena = self.arena
+        kind = arena.kinds[row]
+        if kind == NONE_KIND:
+            return None
+        if kind == LIST_KIND:
+            return [self._view(child) for child in arena.children(row)]
+        return NodeView(arena, row)
+
+    def __getattr__(self, field):
+        arena, row = self.arena, self.row
+        kind = arena.kinds[row]
+        if kind == NONE_KIND or kind == LIST_KIND:
+            raise AttributeError(field)
+        name, operator, type_, number, constant, fields = _layouts[kind]
+        if field == name:
+            return arena.identifiers.name(arena.names[row])
+        if field == operator:
+            return arena.operators.name(arena.ops[row])
+        if field == type_:
+            typerow = arena.types[row]
+            return None if typerow < 0 else self._view(typerow)
+        if field == number:
+            return _int_fields[node_kinds[kind]][1](arena.values[row])
+        if field == 'value' and constant:
+            return arena.constants[arena.values[row]]
+        if field in fields:
+            position = fields.index(field)
+            for index, child in enumerate(arena.children(row)):
+                if index == position:
+                    return self._view(child)
+        raise AttributeError(
+            "'%s' view has no attribute '%s'" % (self.kind.__name__, field)
+        )
+
+    def __iter__(self):
+        return iter(self.list)
+
+    def to_node(self):
+        """Decode the subtree of the node as a tree of ast nodes."""
+        return self.arena.to_tree(self.row)
+
+    def __repr__(self):
+        return "<%s view at row %d>" % (self.kind.__name__, self.row)
@@ -13,30 +13,83 @@
 
 import abc
 import collections.abc
+import contextlib
+import threading
+import weakref
 
 # pylint: disable=redefined-builtin
 # == INTERFACES OF AST NODES ==
 
+# All node classes. Membership of type(value) tells whether a value is
+# a node faster than isinstance, which is slow on abstract base classes
+# when the answer is no.
+_node_types = set()
+
 
 class Node(metaclass=abc.ABCMeta):
-    lineno = None
-    lexpos = None
+    # NOTE: Trees may hold millions of nodes, so nodes keep their fields
+    # in slots rather than in a dict. Each concrete class lists its own
+    # fields; the interfaces below declare none, as only one base class
+    # of a class may carry slots.
+    # Slots named with a leading underscore hold caches and are not
+    # fields.
+    __slots__ = ('lineno', 'lexpos')
+
+    # Names of the fields of the node, other than its position,
+    # in declaration order. Filled in for each subclass.
+    _fields = ()
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        _node_types.add(cls)
+        cls._fields = tuple(
+            field
+            for klass in reversed(cls.__mro__)
+            for field in klass.__dict__.get('__slots__', ())
+            if field not in Node.__slots__ and field[0] != '_'
+        )
 
     @abc.abstractmethod
     def __init__(self):
         pass
 
+    def __getattr__(self, name):
+        """Report an unset position as None."""
+        if name in Node.__slots__:
+            return None
+        raise AttributeError(
+            "'%s' object has no attribute '%s'" % (type(self).__name__, name)
+        )
+
+    def __getstate__(self):
+        """Pickle the fields and position of the node, but no cache."""
+        state = {field: getattr(self, field) for field in self._fields}
+        if self.lineno is not None:
+            state['lineno'] = self.lineno
+        if self.lexpos is not None:
+            state['lexpos'] = self.lexpos
+        return None, state
+
     def __eq__(self, other):
         """
         Two nodes are equal if they are of the same type
         and have all attributes equal. Override as needed.
         """
-        # pylint: disable=unidiomatic-typecheck
-        return type(self) == type(other) and all(
-            getattr(self, attr) == getattr(other, attr)
-            for attr in self.__dict__.keys()
-            if attr not in ('lineno', 'lexpos')
-        )
+        # NOTE: Nodes whose hashes are cached differ on a hash mismatch.
+        hashes = _cache.hashes
+        if hashes is not None:
+            mine, theirs = hashes.get(id(self)), hashes.get(id(other))
+            if mine is not None and theirs is not None and mine != theirs:
+                return False
+        return _equal(self, other)
+
+    def __hash__(self):
+        """
+        Hash a node by its structure. Override as needed.
+
+        Outside a cached_hashes block, this walks the whole subtree.
+        """
+        return structural_hash(self)
 
     def copy_pos(self, node):
         """Copy line info from another AST node."""
@@ -54,37 +107,21 @@ class Node(metaclass=abc.ABCMeta):
         return "%d:%d:" % (self.lineno, self.lexpos)
 
     def __repr__(self):
-        attrs = [attr for attr in dir(self) if attr[0] != '_']
-        values = [getattr(self, attr) for attr in attrs]
-        safe_values = []
-        for value in values:
-            displayable_types = (int, float, bool, str, list, Type, Expression)
-            if isinstance(value, displayable_types) or value is None:
-                safe_values.append(str(value).replace("\n", "\n\t"))
-            else:
-                safe_values.append(
-                    '(non-scalar of type %s)' % value.__class__.__name__
-                )
-        pairs = (
-            "%s = '%s'" % (attr, value)
-            for (attr, value) in zip(attrs, safe_values)
-        )
-        return "ASTNode:%s with attributes:\n\t* %s" \
-               % (self.__class__.__name__, "\n\t* ".join(pairs))
+        return _repr(self)
 
 
 class DataNode(Node):
 
     """A node to which a definite type can and should be assigned."""
 
-    type = None
+    __slots__ = ()
 
 
 class Expression(DataNode):
 
     """An expression that can be evaluated."""
 
-    pass
+    __slots__ = ()
 
 
 class NameNode(collections.abc.Hashable, Node):
@@ -96,7 +133,7 @@ class NameNode(collections.abc.Hashable, Node):
     Provides basic hashing functionality.
     """
 
-    name = None
+    __slots__ = ()
 
     def __hash__(self):
         """Simple hash. Override as needed."""
@@ -107,7 +144,7 @@ class Def(NameNode):
 
     """Definition of a new name."""
 
-    pass
+    __slots__ = ()
 
 
 class ListNode(collections.abc.Iterable, Node):
@@ -118,7 +155,7 @@ class ListNode(collections.abc.Iterable, Node):
     Supports iterating through the nodes list.
     """
 
-    list = None
+    __slots__ = ()
 
     def __iter__(self):
         return iter(self.list)
@@ -126,15 +163,51 @@ class ListNode(collections.abc.Iterable, Node):
 
 class Type(Node):
 
-    """A node representing a type."""
+    """
+    A node representing a type.
+
+    Types are compared and hashed by their structure, ignoring positions.
+    Two canonical nodes (see intern_type) are equal only if they are the
+    same node.
+    """
+
+    # NOTE: '_canonical' holds the structural hash of a canonical node,
+    # which never changes, and None for any other node. Types are few
+    # next to expressions, so it is set at creation, even for nodes made
+    # without __init__ (e.g. on unpickling).
+    __slots__ = ('_canonical', '__weakref__')
+
+    def __new__(cls, *args, **kwargs):
+        node = super().__new__(cls)
+        node._canonical = None
+        return node
+
+    def __eq__(self, other):
+        if self is other:
+            return True
+        if self._canonical is not None and \
+                getattr(other, '_canonical', None) is not None:
+            return False
+        return _equal(self, other)
+
+    def __hash__(self):
+        if self._canonical is not None:
+            return self._canonical
+        return structural_hash(self)
 
-    pass
+    def __reduce_ex__(self, protocol):
+        """Unpickle canonical nodes as canonical nodes."""
+        if self._canonical is None:
+            return super().__reduce_ex__(protocol)
+        return (_load_canonical, (type(self), _field_values(self)))
 
 
 class Builtin(Type, NameNode):
 
     """One of the builtin types."""
 
+    __slots__ = ('name',)
+
     def __init__(self):
         self.name = self.__class__.__name__.lower()
 
@@ -142,17 +215,23 @@ class Builtin(Type, NameNode):
 
 
 class Program(ListNode):
+    __slots__ = ('list',)
+
     def __init__(self, list):
         self.list = list
 
 
 class LetDef(ListNode):
+    __slots__ = ('list', 'isRec')
+
     def __init__(self, list, isRec=False):
         self.list = list
         self.isRec = isRec
 
 
 class ConstantDef(Def):
+    __slots__ = ('name', 'body', 'type')
+
     def __init__(self, name, body, type=None):
         self.name = name
         self.body = body
@@ -160,6 +239,8 @@ class ConstantDef(Def):
 
 
 class FunctionDef(Def):
+    __slots__ = ('name', 'params', 'body', 'type')
+
     def __init__(self, name, params, body, type=None):
         self.name = name
         self.params = params
@@ -168,12 +249,16 @@ class FunctionDef(Def):
 
 
 class Param(DataNode, NameNode):
+    __slots__ = ('name', 'type')
+
     def __init__(self, name, type=None):
         self.name = name
         self.type = type
 
 
 class BinaryExpression(Expression):
+    __slots__ = ('leftOperand', 'operator', 'rightOperand', 'type')
+
     def __init__(self, leftOperand, operator, rightOperand):
         self.leftOperand = leftOperand
         self.operator = operator
@@ -182,6 +267,8 @@ class BinaryExpression(Expression):
 
 
 class UnaryExpression(Expression):
+    __slots__ = ('operator', 'operand', 'type')
+
     def __init__(self, operator, operand):
         self.operator = operator
         self.operand = operand
@@ -189,6 +276,8 @@ class UnaryExpression(Expression):
 
 
 class ConstructorCallExpression(Expression, ListNode, NameNode):
+    __slots__ = ('name', 'list', 'type')
+
     def __init__(self, name, list):
         self.name = name
         self.list = list
@@ -196,6 +285,8 @@ class ConstructorCallExpression(Expression, ListNode, NameNode):
 
 
 class ArrayExpression(Expression, ListNode, NameNode):
+    __slots__ = ('name', 'list', 'type')
+
     def __init__(self, name, list):
         self.name = name
         self.list = list
@@ -203,30 +294,40 @@ class ArrayExpression(Expression, ListNode, NameNode):
 
 
 class ConstExpression(Expression):
+    __slots__ = ('value', 'type')
+
     def __init__(self, value, type):
         self.value = value
         self.type = type
 
 
 class ConidExpression(Expression, NameNode):
+    __slots__ = ('name', 'type')
+
     def __init__(self, name):
         self.name = name
         self.type = None
 
 
 class GenidExpression(Expression, NameNode):
+    __slots__ = ('name', 'type')
+
     def __init__(self, name):
         self.name = name
         self.type = None
 
 
 class DeleteExpression(Expression):
+    __slots__ = ('expr', 'type')
+
     def __init__(self, expr):
         self.expr = expr
         self.type = None
 
 
 class DimExpression(Expression, NameNode):
+    __slots__ = ('name', 'dimension', 'type')
+
     def __init__(self, name, dimension=1):
         self.name = name
         self.dimension = dimension
@@ -234,6 +335,10 @@ class DimExpression(Expression, NameNode):
 
 
 class ForExpression(Expression):
+    __slots__ = (
+        'counter', 'startExpr', 'stopExpr', 'body', 'isDown', 'type'
+    )
+
     def __init__(self, counter, startExpr, stopExpr, body, isDown=False):
         self.counter = counter
         self.startExpr = startExpr
@@ -244,6 +349,8 @@ class ForExpression(Expression):
 
 
 class FunctionCallExpression(Expression, ListNode, NameNode):
+    __slots__ = ('name', 'list', 'type')
+
     def __init__(self, name, list):
         self.name = name
         self.list = list
@@ -251,6 +358,8 @@ class FunctionCallExpression(Expression, ListNode, NameNode):
 
 
 class LetInExpression(Expression):
+    __slots__ = ('letdef', 'expr', 'type')
+
     def __init__(self, letdef, expr):
         self.letdef = letdef
         self.expr = expr
@@ -258,6 +367,8 @@ class LetInExpression(Expression):
 
 
 class IfExpression(Expression):
+    __slots__ = ('condition', 'thenExpr', 'elseExpr', 'type')
+
     def __init__(self, condition, thenExpr, elseExpr=None):
         self.condition = condition
         self.thenExpr = thenExpr
@@ -266,6 +377,8 @@ class IfExpression(Expression):
 
 
 class MatchExpression(Expression, ListNode):
+    __slots__ = ('expr', 'list', 'type')
+
     def __init__(self, expr, list):
         self.expr = expr
         self.list = list
@@ -273,28 +386,38 @@ class MatchExpression(Expression, ListNode):
 
 
 class Clause(Node):
+    __slots__ = ('pattern', 'expr')
+
     def __init__(self, pattern, expr):
         self.pattern = pattern
         self.expr = expr
 
 
 class Pattern(ListNode, NameNode):
+    __slots__ = ('name', 'list')
+
     def __init__(self, name, list=None):
         self.name = name
         self.list = list or []
 
 
 class GenidPattern(NameNode):
+    __slots__ = ('name',)
+
     def __init__(self, name):
         self.name = name
 
 
 class NewExpression(Expression):
+    __slots__ = ('type',)
+
     def __init__(self, type):
         self.type = type
 
 
 class WhileExpression(Expression):
+    __slots__ = ('condition', 'body', 'type')
+
     def __init__(self, condition, body):
         self.condition = condition
         self.body = body
@@ -302,12 +425,16 @@ class WhileExpression(Expression):
 
 
 class VariableDef(Def):
+    __slots__ = ('name', 'type')
+
     def __init__(self, name, type=None):
         self.name = name
         self.type = type
 
 
 class ArrayVariableDef(VariableDef):
+    __slots__ = ('dimensions',)
+
     def __init__(self, name, dimensions, type=None):
         self.name = name
         self.dimensions = dimensions
@@ -315,12 +442,16 @@ class ArrayVariableDef(VariableDef):
 
 
 class TDef(ListNode):
+    __slots__ = ('type', 'list')
+
     def __init__(self, type, list):
         self.type = type
         self.list = list
 
 
 class Constructor(NameNode, ListNode):
+    __slots__ = ('name', 'list')
+
     def __init__(self, name, list=None):
         self.name = name
         self.list = list or []
@@ -329,23 +460,23 @@ class Constructor(NameNode, ListNode):
 
 
 class Bool(Builtin):
-    pass
+    __slots__ = ()
 
 
 class Char(Builtin):
-    pass
+    __slots__ = ()
 
 
 class Float(Builtin):
-    pass
+    __slots__ = ()
 
 
 class Int(Builtin):
-    pass
+    __slots__ = ()
 
 
 class Unit(Builtin):
-    pass
+    __slots__ = ()
 
 
 builtin_types_map = {
@@ -361,32 +492,426 @@ class User(Type, NameNode):
 
     """A user-defined type."""
 
+    __slots__ = ('name',)
+
     def __init__(self, name):
         self.name = name
 
 
 class Ref(Type):
+    __slots__ = ('type',)
+
     def __init__(self, type):
         self.type = type
 
 
 class Array(Type):
+    __slots__ = ('type', 'dimensions')
+
     def __init__(self, type, dimensions=1):
         self.type = type
         self.dimensions = dimensions
 
 
 def String():
-    """Factory method to alias (internally) String type to Array of char."""
-    return Array(Char(), 1)
+    """
+    Factory method to alias (internally) String type to Array of char.
+    Return its canonical node.
+    """
+    return _string_type
 
 
 class Function(Type):
+    __slots__ = ('fromType', 'toType')
+
     def __init__(self, fromType, toType):
         self.fromType = fromType
         self.toType = toType
 
 
+# == TRAVERSAL ==
+# NOTE: Trees may be far deeper than the recursion limit (e.g. a long
+# chain of 'let ... in'), so they are traversed with explicit stacks.
+
+
+def iter_fields(node):
+    """
+    Iterate over the fields of 'node', other than its position,
+    as (name, value) pairs, in declaration order.
+    """
+    for field in node._fields:
+        yield field, getattr(node, field)
+
+
+def children(node):
+    """
+    Return the children of 'node', a node or a list: its fields that
+    are nodes and the items of its fields that are lists, with nested
+    lists flattened, in field order.
+    """
+    if isinstance(node, list):
+        values = node
+    else:
+        values = [getattr(node, field) for field in node._fields]
+    result = []
+    pending = []
+    for value in values:
+        if type(value) in _node_types:
+            result.append(value)
+        elif isinstance(value, list):
+            pending.append(iter(value))
+            while pending:
+                for item in pending[-1]:
+                    if type(item) in _node_types:
+                        result.append(item)
+                    elif isinstance(item, list):
+                        pending.append(iter(item))
+                        break
+                else:
+                    pending.pop()
+    return result
+
+
+def walk(root, enter, leave=None):
+    """
+    Traverse the tree under 'root' depth-first, without recursion.
+    Call 'enter' on each node visited, in pre-order; it returns the
+    children to visit next (None for none). If given, call 'leave' on
+    each node visited, in post-order, once its children are done.
+    """
+    stack = [(root, False)]
+    pop = stack.pop
+    push = stack.append
+    while stack:
+        node, done = pop()
+        if done:
+            leave(node)
+            continue
+        if leave is not None:
+            push((node, True))
+        nodes = enter(node)
+        if nodes:
+            stack.extend((child, False) for child in reversed(nodes))
+
+
+def iter_preorder(root):
+    """Iterate over the nodes of the tree under 'root', in pre-order."""
+    stack = [root]
+    while stack:
+        node = stack.pop()
+        yield node
+        stack.extend(reversed(children(node)))
+
+
+def iter_postorder(root):
+    """Iterate over the nodes of the tree under 'root', in post-order."""
+    stack = [(root, False)]
+    while stack:
+        node, done = stack.pop()
+        if done:
+            yield node
+        else:
+            stack.append((node, True))
+            stack.extend((child, False) for child in reversed(children(node)))
+
+
+def _equal(node, other):
+    """
+    Check two values, nodes or lists of them, for equality. Nodes are
+    compared field by field, ignoring positions.
+    """
+    stack = [(node, other)]
+    while stack:
+        left, right = stack.pop()
+        if left is right:
+            continue
+        if type(left) in _node_types:
+            # pylint: disable=unidiomatic-typecheck
+            if type(left) is not type(right):
+                return False
+            for field in left._fields:
+                stack.append((getattr(left, field), getattr(right, field)))
+        elif isinstance(left, list) and isinstance(right, list):
+            if len(left) != len(right):
+                return False
+            stack.extend(zip(left, right))
+        elif not left == right:
+            return False
+    return True
+
+
+# Attribute values shown in full by repr; other objects are only named.
+_displayable_types = (int, float, bool, str, list, Type, Expression)
+
+
+def _display_attrs(node):
+    """Return the (name, value) pairs of the public attributes of 'node'."""
+    return [
+        (attr, getattr(node, attr)) for attr in dir(node) if attr[0] != '_'
+    ]
+
+
+def _repr(root):
+    """
+    Return the representation of 'root', a node, listing its public
+    attributes and showing nested nodes and lists in full.
+    """
+    # Find the nodes and lists shown, then render them bottom-up.
+    texts = {}
+    order = []
+    stack = [root]
+    while stack:
+        value = stack.pop()
+        order.append(value)
+        if isinstance(value, list):
+            stack.extend(
+                item for item in value if isinstance(item, (Node, list))
+            )
+        else:
+            stack.extend(
+                item for _, item in _display_attrs(value)
+                if isinstance(item, (list, Type, Expression))
+            )
+
+    for value in reversed(order):
+        if isinstance(value, list):
+            texts[id(value)] = "[%s]" % ", ".join(
+                texts[id(item)] if isinstance(item, (Node, list))
+                else repr(item)
+                for item in value
+            )
+            continue
+
+        pairs = []
+        for attr, item in _display_attrs(value):
+            if isinstance(item, (list, Type, Expression)):
+                text = texts[id(item)].replace("\n", "\n\t")
+            elif isinstance(item, _displayable_types) or item is None:
+                text = str(item).replace("\n", "\n\t")
+            else:
+                text = '(non-scalar of type %s)' % item.__class__.__name__
+            pairs.append("%s = '%s'" % (attr, text))
+        texts[id(value)] = "ASTNode:%s with attributes:\n\t* %s" \
+            % (value.__class__.__name__, "\n\t* ".join(pairs))
+    return texts[id(root)]
+
+
+# == STRUCTURAL HASHING ==
+# NOTE: Nodes have no links to their parents, and watching every
+# assignment would slow down building trees, so a hash cached for a node
+# could not tell when the tree under it is modified. Hence hashes are
+# only cached on request, until the end of a cached_hashes block, and
+# are computed afresh elsewhere, walking the whole subtree each time.
+# Caches are not invalidated on mutation: the trees hashed in such a
+# block must not be modified before its end. Code hashing large trees
+# repeatedly (e.g. keeping them in dicts) should do so within a block.
+
+
+class _HashCache(threading.local):
+
+    """
+    The structural hashes cached by the cached_hashes blocks of a thread.
+
+    'hashes' maps node ids to hashes, and 'roots' keeps the roots of the
+    trees hashed alive, so that these ids stay valid. Both are None
+    outside blocks; 'depth' counts the blocks entered.
+    """
+
+    hashes = None
+    roots = None
+    depth = 0
+
+
+_cache = _HashCache()
+
+
+@contextlib.contextmanager
+def cached_hashes():
+    """
+    Cache the structural hashes computed within the block, so that each
+    node is hashed once and nodes with different known hashes compare
+    unequal at once. Each thread has a cache of its own, which nested
+    blocks share, and which is dropped at the end of the outermost one.
+    """
+    cache = _cache
+    if not cache.depth:
+        cache.hashes, cache.roots = {}, []
+    cache.depth += 1
+    try:
+        yield
+    finally:
+        cache.depth -= 1
+        if not cache.depth:
+            cache.hashes = cache.roots = None
+
+
+def _value_hash(value, hashes):
+    """Hash a field value, whose nodes have their hashes in 'hashes'."""
+    if type(value) in _node_types:
+        return hashes[id(value)]
+    if isinstance(value, list):
+        return hash((
+            list,
+            tuple([_value_hash(item, hashes) for item in value])
+        ))
+    return hash(value)
+
+
+def structural_hash(root):
+    """
+    Return the structural hash of the tree under 'root'. Trees that are
+    equal (i.e. alike but for positions) have equal hashes.
+    """
+    hashes = _cache.hashes
+    if hashes is None:
+        hashes = {}
+    elif id(root) in hashes:
+        return hashes[id(root)]
+    else:
+        _cache.roots.append(root)
+    node_types = _node_types
+    stack = [(root, False)]
+    pop = stack.pop
+    push = stack.append
+    while stack:
+        node, done = pop()
+        if done:
+            values = [type(node)]
+            for field in node._fields:
+                value = getattr(node, field)
+                if type(value) in node_types:
+                    values.append(hashes[id(value)])
+                elif type(value) is list:
+                    values.append(_value_hash(value, hashes))
+                else:
+                    values.append(hash(value))
+            hashes[id(node)] = hash(tuple(values))
+            continue
+        if id(node) in hashes:
+            continue
+        push((node, True))
+        for field in node._fields:
+            value = getattr(node, field)
+            if type(value) in node_types:
+                push((value, False))
+            elif type(value) is list:
+                stack.extend((child, False) for child in children(value))
+    return hashes[id(root)]
+
+
+def identical_subtrees(root):
+    """
+    Find the subtrees of the tree under 'root' that occur more than
+    once, alike but for positions. Return a list of groups of such
+    subtrees (in preorder), in the preorder of their first members.
+    """
+    # Groups of equal subtrees, by hash and in order of creation.
+    buckets = {}
+    groups = []
+    with cached_hashes():
+        structural_hash(root)
+        hashes = _cache.hashes
+        for node in iter_preorder(root):
+            bucket = buckets.setdefault(hashes[id(node)], [])
+            for group in bucket:
+                if _equal(group[0], node):
+                    group.append(node)
+                    break
+            else:
+                bucket.append([node])
+                groups.append(bucket[-1])
+    return [group for group in groups if len(group) > 1]
+
+
+# == TYPE INTERNING ==
+# NOTE: Each distinct type in use has a single canonical node, without a
+# position, which stands for every occurrence of the type that needs
+# none (e.g. the types of constants). Canonical nodes are shared, so
+# they must never be modified.
+
+# Canonical nodes, keyed by the class of the type and its fields, with
+# the ids of the canonical nodes of its component types in place of
+# these. The table holds its nodes weakly, so that it only keeps the
+# types still in use; a canonical node keeps its components alive, so
+# the ids in the keys of live entries are stable.
+_interned = weakref.WeakValueDictionary()
+
+
+def intern_type(t):
+    """Return the canonical node of the type 't'."""
+    if t._canonical is not None:
+        return t
+    if isinstance(t, NameNode):
+        # NOTE: Shortcut for builtin and user types, which are leaves.
+        return _canonical_node((type(t), t.name), type(t), [t.name])
+
+    canons = {}
+    for node in iter_postorder(t):
+        if node._canonical is not None:
+            canons[id(node)] = node
+            continue
+        values = [
+            canons[id(value)] if isinstance(value, Node) else value
+            for _, value in iter_fields(node)
+        ]
+        canons[id(node)] = _canonical_node(
+            _type_key(type(node), values), type(node), values
+        )
+    return canons[id(t)]
+
+
+def _field_values(node):
+    """Return the values of the fields of 'node', in field order."""
+    return [getattr(node, field) for field in node._fields]
+
+
+def _type_key(cls, values):
+    """Return the key of the '_interned' table for a type."""
+    return (cls,) + tuple(
+        id(value) if isinstance(value, Node) else value for value in values
+    )
+
+
+def _canonical_node(key, cls, values):
+    """
+    Return the canonical node under 'key', making a 'cls' node with the
+    given field values if there is none.
+    """
+    canon = _interned.get(key)
+    if canon is None:
+        canon = _make_node(cls, values)
+        # NOTE: As structural_hash would, but from the stored hashes of
+        # the components, which are canonical, instead of walking them.
+        canon._canonical = hash(tuple([cls] + [
+            value._canonical if isinstance(value, Type) else hash(value)
+            for value in values
+        ]))
+        _interned[key] = canon
+    return canon
+
+
+def _load_canonical(cls, values):
+    """Return the canonical 'cls' node with the given field values."""
+    return intern_type(_make_node(cls, values))
+
+
+def _make_node(cls, values):
+    """Make a 'cls' node with the given field values, in field order."""
+    node = cls.__new__(cls)
+    for field, value in zip(cls._fields, values):
+        setattr(node, field, value)
+    return node
+
+
+# Canonical nodes of the builtin types, by name.
+builtin_types = {
+    name: intern_type(typecon())
+    for name, typecon in builtin_types_map.items()
+}
+
+_string_type = intern_type(Array(Char(), 1))
+
+
 # == BASE ERROR CLASS ==
 
 class NodeError(Exception):
@@ -60,6 +60,80 @@ class LoggerMock(LoggerInterface):
     pass
 
 
+class RecordingLogger(LoggerInterface):
+
+    """
+    Logger keeping its events for later replay into another logger.
+
+    Useful when events are produced in a worker process, or must be
+    held back until their context is known.
+    """
+
+    def clear(self):
+        """Reset logger state and forget all records."""
+        super().clear()
+        self.records = []
+
+    def warning(self, fmt, *args):
+        """Record a warning."""
+        super().warning(fmt, *args)
+        self.records.append(('warning', fmt, args))
+
+    def error(self, fmt, *args):
+        """Record an error."""
+        super().error(fmt, *args)
+        self.records.append(('error', fmt, args))
+
+    def replay(self, logger):
+        """Log all recorded events, in order, to 'logger'."""
+        for level, fmt, args in self.records:
+            getattr(logger, level)(fmt, *args)
+
+
+class TooManyErrorsError(Exception):
+
+    """Exception raised when a CappedLogger reaches its error cap."""
+
+    pass
+
+
+class CappedLogger(LoggerInterface):
+
+    """
+    Logger forwarding its events to another logger, but giving up
+    after a number of errors.
+
+    The error that reaches the cap is still forwarded; then
+    TooManyErrorsError is raised, so that the producer may abort.
+    """
+
+    def __init__(self, logger, max_errors):
+        """Wrap 'logger', allowing at most 'max_errors' errors."""
+        super().__init__()
+        self.logger = logger
+        self.max_errors = max_errors
+
+    def debug(self, fmt, *args):
+        """Forward some debug info."""
+        self.logger.debug(fmt, *args)
+
+    def info(self, fmt, *args):
+        """Forward some general info."""
+        self.logger.info(fmt, *args)
+
+    def warning(self, fmt, *args):
+        """Forward a warning."""
+        super().warning(fmt, *args)
+        self.logger.warning(fmt, *args)
+
+    def error(self, fmt, *args):
+        """Forward an error. Raise TooManyErrorsError on reaching the cap."""
+        super().error(fmt, *args)
+        self.logger.error(fmt, *args)
+        if self.errors == self.max_errors:
+            raise TooManyErrorsError()
+
+
 class Logger(LoggerInterface):
 
     """
@@ -0,0 +1,288 @@
+"""
+# ----------------------------------------------------------------------
+# incremental.py
+#
+# Incremental reparsing of Llama programs
+#
+# A program is kept as a sequence of blocks, one per top-level letdef
+# or typedef, which tile the source: each runs from its first token up
+# to the first token of the next one. When a new version of the source
+# comes in, only the blocks overlapping (or touching) the changed range
+# are lexed and parsed again; the trees of the other blocks are reused.
+# Those below the change are moved by the number of lines added or
+# removed only when the AST is requested, so a run of edits moves each
+# tree at most once. Whenever lexing or parsing fails, the whole source
+# is parsed again, so that errors are reported exactly as by a full
+# parse.
+# ----------------------------------------------------------------------
+"""
+
+import bisect
+
+from compiler import ast, error, lex, parse
+
+# Length of the chunks compared at once when diffing sources.
+_CHUNK = 1 << 12
+
+
+class Block:
+    """
+    A top-level definition, with its span in the source, as offsets
+    [start, end), the (lineno, column) position of its start, and its
+    range of tokens, as indices [first, last). The positions in the
+    tree 'node' lag 'shift' lines behind.
+    """
+
+    def __init__(self, node, start, end, position, first, last):
+        self.node = node
+        self.start = start
+        self.end = end
+        self.lineno, self.column = position
+        self.first = first
+        self.last = last
+        self.shift = 0
+
+
+def _common_prefix(old, new):
+    """Return the length of the common prefix of 'old' and 'new'."""
+    limit = min(len(old), len(new))
+    pos = 0
+    while pos + _CHUNK <= limit and \
+            old[pos:pos + _CHUNK] == new[pos:pos + _CHUNK]:
+        pos += _CHUNK
+    while pos < limit and old[pos] == new[pos]:
+        pos += 1
+    return pos
+
+
+def _common_suffix(old, new, limit):
+    """
+    Return the length of the common suffix of 'old' and 'new', up to
+    'limit' characters.
+    """
+    size = 0
+    while size + _CHUNK <= limit and \
+            old[len(old) - size - _CHUNK:len(old) - size] == \
+            new[len(new) - size - _CHUNK:len(new) - size]:
+        size += _CHUNK
+    while size < limit and \
+            old[len(old) - size - 1] == new[len(new) - size - 1]:
+        size += 1
+    return size
+
+
+def _token_index(buf, lineno, column):
+    """Return the index of the first token of 'buf' at or after a position."""
+    index = bisect.bisect_left(buf.linenos, lineno)
+    while index < len(buf) and buf.linenos[index] == lineno and \
+            buf.lexposes[index] < column:
+        index += 1
+    return index
+
+
+def _offsets(text, start, position, positions):
+    """
+    Return the offsets in 'text' of the given sorted 'positions', which
+    lie past 'start', itself at 'position'. Only the lines in between
+    are scanned.
+    """
+    offsets = []
+    lineno, column = position
+    line_start = start - column + 1
+    for target, target_column in positions:
+        while lineno < target:
+            line_start = text.index('\n', line_start) + 1
+            lineno += 1
+        offsets.append(line_start + target_column - 1)
+    return offsets
+
+
+def _shift_lines(node, delta):
+    """Move all positioned nodes of the tree 'node' 'delta' lines down."""
+    stack = [node]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, list):
+            stack.extend(node)
+            continue
+        if not isinstance(node, ast.Node):
+            continue
+        if node.lineno:
+            node.lineno += delta
+        for _, value in ast.iter_fields(node):
+            if isinstance(value, (ast.Node, list)):
+                stack.append(value)
+
+
+class IncrementalParser:
+    """
+    A parser reusing the trees of unchanged top-level definitions
+    across versions of a source.
+    """
+
+    def __init__(self, logger=None):
+        """
+        Create an incremental parser. If a 'logger' is not provided,
+        create one.
+        """
+        if logger is None:
+            self.logger = error.Logger()
+        else:
+            self.logger = logger
+        self.text = ""
+        self.blocks = []
+
+        # Whether the source has errors, and the AST its full parse gave.
+        self._failed = False
+        self._erroneous = None
+
+    def program(self):
+        """Return the AST of the current source."""
+        if self._failed:
+            return self._erroneous
+        for block in self.blocks:
+            if block.shift:
+                _shift_lines(block.node, block.shift)
+                block.shift = 0
+        return ast.Program([block.node for block in self.blocks])
+
+    def parse(self, data):
+        """Parse 'data' from scratch and return its AST."""
+        self._load(data)
+        return self.program()
+
+    def reparse(self, data):
+        """
+        Parse 'data', a new version of the current source, reusing the
+        trees of the definitions outside the changed range. Return the
+        AST.
+        """
+        self.update(data)
+        return self.program()
+
+    def _load(self, data):
+        """Parse 'data' from scratch."""
+        self.text = data
+        self._failed = False
+        self._erroneous = None
+        self.blocks = self._parse_region(0, len(data), (1, 1), 0)
+        if self.blocks is None:
+            self._fail()
+
+    def _fail(self):
+        """Parse the whole source, reporting its errors."""
+        self.blocks = []
+        self._failed = True
+        self._erroneous = parse.Parser(logger=self.logger).parse(self.text)
+
+    def update(self, data):
+        """
+        Take in 'data', a new version of the current source, parsing
+        again only the definitions in the changed range. The trees of
+        those below it are moved on the next call to program().
+        """
+        old = self.text
+        if not self.blocks:
+            self._load(data)
+            return
+
+        # The changed range is [start, old_end) in the old source and
+        # [start, new_end) in the new one.
+        start = _common_prefix(old, data)
+        suffix = _common_suffix(old, data, min(len(old), len(data)) - start)
+        old_end = len(old) - suffix
+        new_end = len(data) - suffix
+        if start == old_end == new_end:
+            return
+
+        # Reparse the blocks overlapping or touching the changed range,
+        # and those starting on its last line, whose columns may change.
+        blocks = self.blocks
+        starts = [block.start for block in blocks]
+        lo = max(bisect.bisect_left(starts, start) - 1, 0)
+        hi = bisect.bisect_right(starts, old_end)
+        last_line = blocks[lo].lineno + \
+            old.count('\n', blocks[lo].start, old_end)
+        offset = len(data) - len(old)
+        while hi < len(blocks) and (
+                blocks[hi].lineno == last_line
+                or not data[blocks[hi].start + offset - 1].isspace()):
+            # NOTE: Without a blank before it, the first token of the
+            # next block might not end the region's last token.
+            hi += 1
+        region_start = blocks[lo].start
+        region_end = blocks[hi - 1].end + offset
+
+        self.text = data
+        line_delta = data.count('\n', start, new_end) - \
+            old.count('\n', start, old_end)
+        region = self._parse_region(
+            region_start,
+            region_end,
+            (blocks[lo].lineno, blocks[lo].column),
+            blocks[lo].first
+        )
+        if region is None:
+            self._fail()
+            return
+
+        token_delta = (region[-1].last if region else blocks[lo].first) - \
+            blocks[hi - 1].last
+        for block in blocks[hi:]:
+            block.start += offset
+            block.end += offset
+            block.first += token_delta
+            block.last += token_delta
+            block.lineno += line_delta
+            block.shift += line_delta
+
+        # NOTE: Keep the blocks tiling the source when the region has
+        # no definitions left.
+        if not region:
+            if lo > 0:
+                blocks[lo - 1].end = region_end
+            elif hi < len(blocks):
+                blocks[hi].start = region_start
+                blocks[hi].lineno = blocks[lo].lineno
+                blocks[hi].column = blocks[lo].column
+        self.blocks = blocks[:lo] + region + blocks[hi:]
+
+    def _parse_region(self, start, end, position, first):
+        """
+        Lex and parse the source in [start, end), which starts at
+        'position', as a sequence of definitions, whose first token is
+        the 'first' of the source. Return their blocks, or None on error.
+        """
+        lineno, column = position
+        recorder = error.RecordingLogger()
+        buf = lex.tokenize_to_buffer(
+            self.text[start:end],
+            logger=recorder,
+            lineno=lineno,
+            column=column
+        )
+        if not recorder.success:
+            return None
+        parser = parse.Parser(logger=recorder, engine='pratt')
+        definitions = list(parser.iter_definitions(buf))
+        if not recorder.success:
+            return None
+
+        positions = [first_pos for _, (first_pos, _) in definitions]
+        offsets = _offsets(self.text, start, position, positions[1:])
+        blocks = []
+        for (node, _), first_pos in zip(definitions, positions):
+            block_first = first + _token_index(buf, *first_pos)
+            if blocks:
+                block_start = offsets[len(blocks) - 1]
+                blocks[-1].end = block_start
+                blocks[-1].last = block_first
+            else:
+                block_start, first_pos = start, position
+            blocks.append(
+                Block(node, block_start, end, first_pos, block_first, None)
+            )
+        if blocks:
+            blocks[-1].last = first + len(buf)
+        recorder.replay(self.logger)
+        return blocks
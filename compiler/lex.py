@@ -14,6 +14,11 @@
 """
 
 from collections import abc
+import array
+import bisect
+import codecs
+from concurrent import futures
+import itertools
 import re
 
 from ply import lex
@@ -23,6 +28,15 @@ from compiler import error
 
 _TABLE_DIR = 'tables'
 
+# Default number of characters (or bytes) read at a time when streaming.
+_CHUNK_SIZE = 1 << 16
+
+# Default number of lines between checkpoints of an IncrementalLexer.
+_CHECKPOINT_INTERVAL = 16
+
+# Default minimum size (in characters) of a piece lexed in parallel.
+_PIECE_SIZE = 1 << 18
+
 
 # Represent reserved words as a frozenset for fast lookup
 reserved_words = frozenset('''
@@ -85,11 +99,12 @@ def unescape(string):
     return bytes(string, 'ascii').decode('unicode_escape')
 
 
-def explode(string):
-    """Unescape, null-terminate and listify string."""
-    string = list(unescape(string))
-    string.append('\0')
-    return string
+def encode_string(string):
+    """
+    Unescape string and pack its characters as bytes.
+    The terminating null byte is implicit.
+    """
+    return unescape(string).encode('latin-1')
 
 binary_operators = {
     # Integer operators
@@ -177,8 +192,131 @@ tokens = sum(
     tuple()
 )
 
+# Token types in a fixed order, and the small integer code of each type,
+# as used in TokenBuffer [exported]
+# NOTE: The order of 'tokens' varies between runs; the codes must not.
+token_types = tuple(sorted(tokens))
+token_codes = {name: code for code, name in enumerate(token_types)}
+
+
+class NameTable:
+    """
+    Interning table for the identifiers of a compilation.
+
+    Maps each distinct identifier to a canonical string and a small
+    integer id. Since every occurrence of a name shares the canonical
+    string, dictionaries keyed on names (e.g. the symbol table) compare
+    keys by identity and never rehash them.
+    """
+
+    def __init__(self):
+        """Make a new empty table."""
+        self._canon = {}
+        self._ids = {}
+        self._names = []
+
+    def __len__(self):
+        return len(self._names)
+
+    def __contains__(self, name):
+        return name in self._canon
+
+    def intern(self, name):
+        """Return the canonical string of 'name', registering it if new."""
+        canon = self._canon.get(name)
+        if canon is None:
+            canon = self._canon[name] = name
+            self._ids[name] = len(self._names)
+            self._names.append(name)
+        return canon
+
+    def ident(self, name):
+        """Return the integer id of the registered 'name'."""
+        return self._ids[name]
+
+    def name(self, ident):
+        """Return the canonical string with integer id 'ident'."""
+        return self._names[ident]
+
+
+class _ChunkReader:
+    """
+    Reader of a file object or mmap in chunks ending on a line boundary.
+
+    No Llama token spans a newline, so lexing such chunks one after the
+    other never splits a token. Multi-line block comments and the
+    recovery states of bad literals simply carry over to the next chunk.
+    """
+
+    def __init__(self, stream, chunk_size=_CHUNK_SIZE, encoding='utf-8'):
+        """
+        Wrap 'stream', which needs a read(size) method returning either
+        str or bytes. Bytes are decoded incrementally using 'encoding'.
+        """
+        self._stream = stream
+        self._chunk_size = chunk_size
+        self._decoder = codecs.getincrementaldecoder(encoding)()
+        self._rest = ''
+
+    def read(self):
+        """
+        Return the next chunk of text, or None if the stream is over.
+        A chunk outgrows 'chunk_size' only to complete a longer line.
+        """
+        parts = [self._rest]
+        while True:
+            raw = self._stream.read(self._chunk_size)
+            if isinstance(raw, str):
+                text = raw
+            else:
+                text = self._decoder.decode(raw, final=not raw)
+            if not raw:
+                self._rest = ''
+                parts.append(text)
+                return ''.join(parts) or None
+
+            cut = text.rfind('\n') + 1
+            if cut:
+                parts.append(text[:cut])
+                self._rest = text[cut:]
+                return ''.join(parts)
+            parts.append(text)
+
+
+class _ChunkedInput:
+    """
+    Mixin letting a lexer wrapper be fed chunk by chunk from a
+    _ChunkReader. Requires 'input', 'bol' and a raw 'lexer' carrying
+    the length of the current chunk.
+    """
+
+    # Source of further input chunks, if streaming.
+    _reader = None
+
+    def input_stream(self, reader):
+        """Feed the lexer with the chunks of 'reader'."""
+        self._reader = reader
+        self.input(reader.read() or '')
+
+    def _next_chunk(self):
+        """
+        Replace exhausted input with the next chunk, if any.
+        Return whether more input is available.
+        """
+        if self._reader is None:
+            return False
+        data = self._reader.read()
+        if data is None:
+            self._reader = None
+            return False
+
+        # Keep tracking columns relative to the new chunk.
+        self.bol -= self.lexer.lexlen
+        self.input(data)
+        return True
+
 
-class _LexerFactory:
+class _LexerFactory(_ChunkedInput):
     """
     Implementation of a Llama lexer
 
@@ -211,13 +349,20 @@ class _LexerFactory:
     # Logger used for recording events. Possibly shared with other modules.
     logger = None
 
-    def __init__(self, logger, verbose=False):
+    # Interning tables of identifiers and string constants.
+    # Possibly shared with other lexers.
+    names = None
+    constants = None
+
+    def __init__(self, logger, verbose=False, names=None, constants=None):
         """
         Initialize wrapper object of PLY lexer. To get a working lexer,
         invoke build() on the returned object.
         """
         self.logger = logger
         self.verbose = verbose
+        self.names = NameTable() if names is None else names
+        self.constants = ConstantPool() if constants is None else constants
 
     # == REQUIRED METHODS ==
 
@@ -237,6 +382,8 @@ class _LexerFactory:
         Signal abnormal cases.
         """
         tok = self.lexer.token()
+        while tok is None and self._next_chunk():
+            tok = self.lexer.token()
         if tok is None:
             # Check for abnormal EOF
             state = self.lexer.current_state()
@@ -273,10 +420,46 @@ class _LexerFactory:
         """Feed the lexer with input."""
         self.lexer.input(lexdata)
 
+    def reset(self):
+        """
+        Restore the initial lexing state (line, column, comment nesting
+        and lexer state) so that the built lexer can be fed new input.
+        """
+        self.bol = -1
+        self.level = 0
+        self.lexer.lineno = 1
+        self.lexer.begin('INITIAL')
+        self._reader = None
+
+    def clone(self):
+        """
+        Return a copy of the wrapper object sharing the built PLY tables
+        but owning independent lexing state. The copy is left reset.
+        """
+        new = _LexerFactory(
+            logger=self.logger,
+            verbose=self.verbose,
+            names=self.names,
+            constants=self.constants
+        )
+        new.lexer = self.lexer.clone(new)
+        new.reset()
+        return new
+
     def skip(self, value=1):
         """Skip 'value' characters in the input string."""
         self.lexer.skip(value)
 
+    def fill(self, buf):
+        """Append all remaining tokens to TokenBuffer 'buf'."""
+        for tok in iter(self.token, None):
+            buf.append(
+                token_codes[tok.type],
+                tok.value,
+                tok.lineno,
+                tok.lexpos
+            )
+
     # == LEXING OF NON-TOKENS ==
 
     # Ignored characters
@@ -369,7 +552,10 @@ class _LexerFactory:
     # == LEXING OF VALUE-TOKENS ==
 
     # Constructor identifiers
-    t_CONID     = r'[A-Z][A-Za-z0-9_]*'
+    def t_CONID(self, tok):
+        r'[A-Z][A-Za-z0-9_]*'
+        tok.value = self.names.intern(tok.value)
+        return tok
 
     # Generic identifiers, reserved words, boolean constants
     def t_GENID(self, tok):
@@ -380,7 +566,10 @@ class _LexerFactory:
             'TRUE': True,
             'FALSE': False
         }
-        tok.value = str_to_bool_map.get(tok.type, tok.value)
+        if tok.type == 'GENID':
+            tok.value = self.names.intern(tok.value)
+        else:
+            tok.value = str_to_bool_map.get(tok.type, tok.value)
 
         return tok
 
@@ -457,7 +646,7 @@ class _LexerFactory:
     # Proper string literal
     @lex.TOKEN(proper_string)
     def t_INITIAL_SCONST(self, tok):
-        tok.value = explode(tok.value[1:-1])
+        tok.value = self.constants.intern(encode_string(tok.value[1:-1]))
         # NOTE: Empty string is valid and is just the null byte.
         return tok
 
@@ -480,7 +669,7 @@ class _LexerFactory:
     def t_string_RSTRING(self, tok):
         r'"'
         tok.type = 'SCONST'
-        tok.value = explode('')
+        tok.value = b''
         self.lexer.begin('INITIAL')
         return tok
 
@@ -488,17 +677,676 @@ class _LexerFactory:
     def t_ANY_error(self, tok):
         state = self.lexer.current_state()
         state_msg = (" while inside %s" % state) if state != 'INITIAL' else ""
-        self.logger.error(
-            "%d:%d: error: Illegal character '%s'%s.",
+        end = _illegal_run(tok.value, 0)
+        _report_illegal(
+            self.logger,
             tok.lineno,
             tok.lexpos - self.bol,
-            tok.value[0],
+            tok.value[:end],
             state_msg
         )
-        self.lexer.skip(1)
+        self.lexer.skip(end)
         self.lexer.begin('INITIAL')
 
 
+# == TABLE-DRIVEN LEXER ENGINE ==
+
+# Action codes of the start-state transition table.
+# pylint: disable=bad-whitespace
+_A_ERROR    = 0
+_A_BLANK    = 1
+_A_NEWLINE  = 2
+_A_GENID    = 3
+_A_CONID    = 4
+_A_NUMBER   = 5
+_A_OPERATOR = 6
+_A_LPAREN   = 7
+_A_CHAR     = 8
+_A_STRING   = 9
+# pylint: enable=bad-whitespace
+
+
+def _literal_tokens():
+    """
+    Collect the fixed-spelling tokens (operators and delimiters) from
+    the rules of _LexerFactory, as a map from spelling to token type.
+    """
+    literals = {}
+    for name in tokens:
+        rule = getattr(_LexerFactory, 't_' + name, None)
+        if isinstance(rule, str) and name != 'CONID':
+            literals[re.sub(r'\\(.)', r'\1', rule)] = name
+    return literals
+
+
+def _build_start_table(literals):
+    """
+    Map every character that may begin a token in the INITIAL state
+    to the action taken on it. Characters missing from the table are
+    illegal.
+    """
+    table = {}
+    for char in _LexerFactory.t_INITIAL_comment_ignore:
+        table[char] = _A_BLANK
+    table['\n'] = _A_NEWLINE
+    for char in 'abcdefghijklmnopqrstuvwxyz':
+        table[char] = _A_GENID
+    for char in 'ABCDEFGHIJKLMNOPQRSTUVWXYZ':
+        table[char] = _A_CONID
+    for char in '0123456789':
+        table[char] = _A_NUMBER
+    for spelling in literals:
+        table[spelling[0]] = _A_OPERATOR
+
+    # A block comment opener shadows the left parenthesis.
+    # NOTE: Single-line comments are caught among the operators.
+    table['('] = _A_LPAREN
+
+    table["'"] = _A_CHAR
+    table['"'] = _A_STRING
+    return table
+
+
+_dfa_literals = _literal_tokens()
+_dfa_start_table = _build_start_table(_dfa_literals)
+
+# Characters that cannot begin any token.
+_illegal_chars_re = re.compile(
+    '[^%s]*' % re.escape(''.join(_dfa_start_table))
+)
+
+
+def _illegal_run(data, pos):
+    """
+    Return the end of the run of illegal characters starting with the
+    (illegal) character at 'pos'.
+    """
+    return _illegal_chars_re.match(data, pos + 1).end()
+
+
+def _report_illegal(logger, lineno, column, run, state_msg):
+    """Report a run of illegal characters with a single diagnostic."""
+    if len(run) == 1:
+        logger.error(
+            "%d:%d: error: Illegal character '%s'%s.",
+            lineno,
+            column,
+            run,
+            state_msg
+        )
+    else:
+        logger.error(
+            "%d:%d-%d: error: %d illegal characters, starting with '%s'%s.",
+            lineno,
+            column,
+            column + len(run) - 1,
+            len(run),
+            run[0],
+            state_msg
+        )
+
+
+_dfa_genid_re = re.compile(_LexerFactory.t_GENID.__doc__, re.ASCII)
+_dfa_conid_re = re.compile(_LexerFactory.t_CONID.__doc__, re.ASCII)
+_dfa_number_re = re.compile(r'\d+(\.\d+([eE][+\-]?\d+)?)?', re.ASCII)
+_dfa_blank_re = re.compile(
+    '[%s]+' % re.escape(_LexerFactory.t_INITIAL_comment_ignore)
+)
+_dfa_newline_re = re.compile(_LexerFactory.t_ANY_newline.__doc__)
+_dfa_scomment_re = re.compile(_LexerFactory.t_SCOMMENT.__doc__)
+_dfa_char_re = re.compile(
+    "'(%s)?'" % _LexerFactory.char_content,
+    re.ASCII
+)
+_dfa_string_re = re.compile(_LexerFactory.proper_string, re.ASCII)
+
+# Runs of characters that need no attention inside the exclusive states.
+_dfa_comment_run_re = re.compile(r'[^\n(*]*')
+_dfa_char_run_re = re.compile(r"[^'\n]*")
+_dfa_string_run_re = re.compile(r'[^"\n]*')
+
+# Reserved words and booleans, as (token type, token value) pairs.
+_dfa_words = {word: (type_, word) for word, type_ in reserved_tokens.items()}
+_dfa_words.update({
+    'true': ('TRUE', True),
+    'false': ('FALSE', False)
+})
+
+
+class _DFALexerFactory(_ChunkedInput):
+    """
+    Table-driven implementation of a Llama lexer.
+
+    Produces the same tokens and diagnostics as the PLY-based
+    _LexerFactory, but does not try the token patterns one after another.
+    The first character of a token selects, through a transition table,
+    the one sub-automaton that can match it; keyword, boolean and
+    operator recognition are plain dictionary lookups.
+    """
+
+    # If 'verbose' is True, each token will be stored as a DEBUG event.
+    verbose = False
+
+    # Logger used for recording events. Possibly shared with other modules.
+    logger = None
+
+    def __init__(self, logger, verbose=False, names=None, constants=None):
+        """Initialize the lexer. The tables are shared and prebuilt."""
+        self.logger = logger
+        self.verbose = verbose
+        self.names = NameTable() if names is None else names
+        self.constants = ConstantPool() if constants is None else constants
+        self.lexdata = ''
+        self.lexlen = 0
+        self.lexpos = 0
+        self.lineno = 1
+        self.bol = -1
+        self.level = 0
+        self.state = 'INITIAL'
+
+        # Value and position of the most recently scanned token.
+        self.value = None
+        self.start = 0
+
+        # If not None, a list receiving a checkpoint of the lexer state
+        # at the start of every 'checkpoint_interval'-th line.
+        self.checkpoints = None
+        self.checkpoint_interval = 1
+        self.checkpoint_line = 1
+
+        # The raw lexer. Unlike the PLY wrapper, this class is its own raw
+        # lexer, so it carries the 'lexpos' and 'lineno' positions itself.
+        self.lexer = self
+
+    def build(self, **_):
+        """Provided for interface parity; there is nothing to build."""
+        pass
+
+    def input(self, lexdata):
+        """Feed the lexer with input."""
+        self.lexdata = lexdata
+        self.lexlen = len(lexdata)
+        self.lexpos = 0
+
+    def reset(self):
+        """Restore the initial lexing state."""
+        self.lineno = 1
+        self.bol = -1
+        self.level = 0
+        self.state = 'INITIAL'
+        self._reader = None
+
+    def clone(self):
+        """Return a reset copy of the lexer."""
+        return _DFALexerFactory(
+            logger=self.logger,
+            verbose=self.verbose,
+            names=self.names,
+            constants=self.constants
+        )
+
+    def skip(self, value=1):
+        """Skip 'value' characters in the input string."""
+        self.lexpos += value
+
+    def current_state(self):
+        """Return the name of the current lexer state."""
+        return self.state
+
+    def _newline(self, pos):
+        """Consume a run of newlines starting at 'pos'."""
+        end = _dfa_newline_re.match(self.lexdata, pos).end()
+        self.lineno += end - pos
+        self.bol = end - 1
+        if self.checkpoints is not None and \
+                self.lineno >= self.checkpoint_line:
+            self.checkpoints.append(self.checkpoint())
+            self.checkpoint_line = self.lineno + self.checkpoint_interval
+        return end
+
+    def checkpoint(self):
+        """
+        Return the lexing state at the start of the current line as an
+        (offset, lineno, bol, state, level) tuple, from which lexing can
+        later be restarted.
+        """
+        return (self.bol + 1, self.lineno, self.bol, self.state, self.level)
+
+    def restore(self, checkpoint):
+        """Restart lexing of the current input from 'checkpoint'."""
+        (self.lexpos, self.lineno, self.bol,
+         self.state, self.level) = checkpoint
+
+    def _scan_comment(self, pos):
+        """Advance through a block comment; never produces a token."""
+        data = self.lexdata
+        pos = _dfa_comment_run_re.match(data, pos).end()
+        if pos < self.lexlen:
+            char = data[pos]
+            if char == '\n':
+                return self._newline(pos), None, None
+            if char == '(' and data.startswith('*', pos + 1):
+                self.level += 1
+                return pos + 2, None, None
+            if char == '*' and data.startswith(')', pos + 1):
+                if self.level > 1:
+                    self.level -= 1
+                else:
+                    self.level = 0
+                    self.state = 'INITIAL'
+                return pos + 2, None, None
+            return pos + 1, None, None
+        return pos, None, None
+
+    def _scan_recovery(self, pos, run_re, type_, value):
+        """
+        Advance through a malformed literal. On reaching the closing
+        quote, leave recovery and return a 'type_' token carrying 'value'.
+        """
+        data = self.lexdata
+        pos = run_re.match(data, pos).end()
+        if pos < self.lexlen:
+            if data[pos] == '\n':
+                return self._newline(pos), None, None
+            self.state = 'INITIAL'
+            return pos + 1, type_, value
+        return pos, None, None
+
+    def _scan_char(self, pos):
+        """Advance through a malformed char literal."""
+        return self._scan_recovery(pos, _dfa_char_run_re, 'CCONST', '\0')
+
+    def _scan_string(self, pos):
+        """Advance through a malformed string literal."""
+        return self._scan_recovery(pos, _dfa_string_run_re, 'SCONST', b'')
+
+    _state_scanners = {
+        'comment': _scan_comment,
+        'char': _scan_char,
+        'string': _scan_string
+    }
+
+    def _scan_number(self, pos):
+        """Recognize an integer or floating-point constant."""
+        match = _dfa_number_re.match(self.lexdata, pos)
+        if match.group(1) is None:
+            return match.end(), 'ICONST', int(match.group())
+        try:
+            value = float(match.group())
+        except OverflowError:
+            self.logger.error(
+                "%d:%d: error: Floating-point constant is irrepresentable.",
+                self.lineno,
+                pos - self.bol
+            )
+            value = 0.0
+        return match.end(), 'FCONST', value
+
+    def _scan_char_literal(self, pos):
+        """Recognize a char literal, or enter recovery for a bad one."""
+        match = _dfa_char_re.match(self.lexdata, pos)
+        if match is None:
+            self.logger.error(
+                "%d:%d: error: Bad character literal.",
+                self.lineno,
+                pos - self.bol
+            )
+            self.state = 'char'
+            return pos + 1, None, None
+
+        value = match.group()[1:-1]
+        if value:
+            value = unescape(value)[0]
+        else:  # Illegal empty char
+            self.logger.error(
+                "%d:%d: error: Empty character literal not allowed.",
+                self.lineno,
+                pos - self.bol
+            )
+            value = '\0'
+        return match.end(), 'CCONST', value
+
+    def _scan_string_literal(self, pos):
+        """Recognize a string literal, or enter recovery for a bad one."""
+        match = _dfa_string_re.match(self.lexdata, pos)
+        if match is None:
+            self.logger.error(
+                "%d:%d: error: Bad string literal.",
+                self.lineno,
+                pos - self.bol
+            )
+            self.state = 'string'
+            return pos + 1, None, None
+
+        value = encode_string(match.group()[1:-1])
+        return match.end(), 'SCONST', self.constants.intern(value)
+
+    def _illegal(self, pos):
+        """Report the illegal characters from 'pos' on and skip them."""
+        end = _illegal_run(self.lexdata, pos)
+        _report_illegal(
+            self.logger,
+            self.lineno,
+            pos - self.bol,
+            self.lexdata[pos:end],
+            ""
+        )
+        return end
+
+    def _eof(self, pos):
+        """Signal abnormal cases at <EOF>."""
+        # Like PLY, step past the end of input.
+        self.lexpos = pos + 1
+        if self.state == "comment":
+            self.logger.error(
+                "%d: error: Unclosed comment reaching end of file.",
+                self.lineno
+            )
+        elif self.state == "string":
+            self.logger.error(
+                "%d: error: Unclosed string reaching end of file.",
+                self.lineno
+            )
+        elif self.state == "char":
+            self.logger.error(
+                "%d: error: Unclosed character literal at end of file.",
+                self.lineno
+            )
+
+    def _scan(self):
+        """
+        Scan the next token. Return its type, leaving its value and
+        starting position in 'value' and 'start'. Return None on <EOF>,
+        after signalling abnormal cases.
+        """
+        # NOTE: This is the hot loop of the lexer. The frequent cases
+        # (blanks, names and operators) are handled inline.
+        table = _dfa_start_table
+        literals = _dfa_literals
+        intern = self.names.intern
+        while True:
+            data = self.lexdata
+            pos = self.lexpos
+            end = self.lexlen
+            type_ = None
+            while pos < end:
+                if self.state != 'INITIAL':
+                    pos, type_, value = self._state_scanners[self.state](
+                        self,
+                        pos
+                    )
+                    if type_ is not None:
+                        start = pos - 1
+                        break
+                    continue
+
+                char = data[pos]
+                action = table.get(char, _A_ERROR)
+                start = pos
+
+                if action == _A_BLANK:
+                    pos = _dfa_blank_re.match(data, pos).end()
+                elif action == _A_GENID:
+                    match = _dfa_genid_re.match(data, pos)
+                    pos = match.end()
+                    type_, value = _dfa_words.get(match.group(), (None, None))
+                    if type_ is None:
+                        type_, value = 'GENID', intern(match.group())
+                    break
+                elif action == _A_OPERATOR:
+                    value = data[pos:pos + 2]
+                    type_ = literals.get(value)
+                    if type_ is None:
+                        if value == '--':
+                            pos = _dfa_scomment_re.match(data, pos).end()
+                            continue
+                        value = char
+                        type_ = literals.get(char)
+                        if type_ is None:
+                            pos = self._illegal(pos)
+                            continue
+                    pos += len(value)
+                    break
+                elif action == _A_NEWLINE:
+                    pos = self._newline(pos)
+                elif action == _A_CONID:
+                    match = _dfa_conid_re.match(data, pos)
+                    pos = match.end()
+                    type_, value = 'CONID', intern(match.group())
+                    break
+                elif action == _A_NUMBER:
+                    pos, type_, value = self._scan_number(pos)
+                    break
+                elif action == _A_LPAREN:
+                    if data.startswith('*', pos + 1):
+                        self.level += 1
+                        self.state = 'comment'
+                        pos += 2
+                        continue
+                    pos += 1
+                    type_, value = 'LPAREN', char
+                    break
+                elif action == _A_CHAR:
+                    pos, type_, value = self._scan_char_literal(pos)
+                    if type_ is not None:
+                        break
+                elif action == _A_STRING:
+                    pos, type_, value = self._scan_string_literal(pos)
+                    if type_ is not None:
+                        break
+                else:
+                    pos = self._illegal(pos)
+
+            if type_ is not None:
+                break
+
+            # Exhausted input; move on to the next chunk if streaming.
+            self.lexpos = pos
+            if not self._next_chunk():
+                self._eof(pos)
+                return None
+
+        self.lexpos = pos
+        self.value = value
+        self.start = start
+        return type_
+
+    def token(self):
+        """
+        Return a token to caller. Detect when <EOF> has been reached.
+        Signal abnormal cases.
+        """
+        type_ = self._scan()
+        if type_ is None:
+            return None
+
+        tok = lex.LexToken()
+        tok.type = type_
+        tok.value = self.value
+        tok.lineno = self.lineno
+        tok.lexpos = self.start - self.bol
+        if self.verbose:
+            self.logger.debug(
+                "%d:%d\t%s\t%s",
+                tok.lineno,
+                tok.lexpos,
+                tok.type,
+                tok.value
+            )
+        return tok
+
+    def fill(self, buf):
+        """Append all remaining tokens to TokenBuffer 'buf'."""
+        scan = self._scan
+        append = buf.append
+        codes = token_codes
+        type_ = scan()
+        while type_ is not None:
+            append(
+                codes[type_], self.value, self.lineno, self.start - self.bol
+            )
+            type_ = scan()
+
+
+# Available lexing engines, by name.
+_engines = {
+    'ply': _LexerFactory,
+    'dfa': _DFALexerFactory
+}
+
+
+class ConstantPool(NameTable):
+    """
+    Interning table for the string constants of a compilation.
+
+    Literals with identical content share a single bytes object.
+    """
+
+    pass
+
+
+class TokenBuffer:
+    """
+    The tokens of an input, stored compactly as parallel arrays.
+
+    The i-th token has type token_types[kinds[i]], line linenos[i] and column
+    lexposes[i]. Values implied by the token type (reserved words,
+    booleans, operators and delimiters) are not stored; the rest are kept
+    in 'values', in token order, along with the token index they belong
+    to in 'valued'.
+
+    A buffer may be made of pieces appended whole, as when merging the
+    buffers of parallel lexers. So that appending one only concatenates
+    arrays, the indices in 'valued' count from the start of the piece
+    they are in.
+    """
+
+    def __init__(self):
+        """Make an empty buffer."""
+        self.kinds = array.array('B')
+        self.linenos = array.array('I')
+        self.lexposes = array.array('I')
+        self.values = []
+        self.valued = array.array('I')
+
+        # The first token and the first value of each piece
+        self._bases = array.array('I', [0])
+        self._value_bases = array.array('I', [0])
+
+    def append(self, kind, value, lineno, lexpos):
+        """Append a token, given the code of its type."""
+        if kind in _stored_value_codes:
+            self.valued.append(len(self.kinds) - self._bases[-1])
+            self.values.append(value)
+        self.kinds.append(kind)
+        self.linenos.append(lineno)
+        self.lexposes.append(lexpos)
+
+    def extend(self, other):
+        """Append the tokens of buffer 'other', as one or more pieces."""
+        base = len(self.kinds)
+        value_base = len(self.values)
+        self.kinds.extend(other.kinds)
+        self.linenos.extend(other.linenos)
+        self.lexposes.extend(other.lexposes)
+        self.valued.extend(other.valued)
+        self.values.extend(other.values)
+        self._bases.extend(array.array(
+            'I', [index + base for index in other._bases]
+        ))
+        self._value_bases.extend(array.array(
+            'I', [index + value_base for index in other._value_bases]
+        ))
+
+    def _piece_values(self, piece):
+        """Return the range of the values in the given piece."""
+        if piece + 1 < len(self._value_bases):
+            return self._value_bases[piece], self._value_bases[piece + 1]
+        return self._value_bases[piece], len(self.values)
+
+    def __len__(self):
+        return len(self.kinds)
+
+    def slice(self, start, stop):
+        """Return a new buffer holding the tokens in [start, stop)."""
+        buf = TokenBuffer()
+        buf.kinds = self.kinds[start:stop]
+        buf.linenos = self.linenos[start:stop]
+        buf.lexposes = self.lexposes[start:stop]
+        for piece, base in enumerate(self._bases):
+            lo, hi = self._piece_values(piece)
+            first = bisect.bisect_left(self.valued, start - base, lo, hi)
+            last = bisect.bisect_left(self.valued, stop - base, lo, hi)
+            buf.values.extend(self.values[first:last])
+            buf.valued.extend(
+                index + base - start for index in self.valued[first:last]
+            )
+        return buf
+
+    def value(self, index):
+        """Return the value of the token at 'index'."""
+        kind = self.kinds[index]
+        if kind in _stored_value_codes:
+            piece = bisect.bisect_right(self._bases, index) - 1
+            lo, hi = self._piece_values(piece)
+            return self.values[bisect.bisect_left(
+                self.valued,
+                index - self._bases[piece],
+                lo,
+                hi
+            )]
+        return _implied_values[kind]
+
+    def __iter__(self):
+        """Iterate over the buffered tokens, materialized one at a time."""
+        values = iter(self.values)
+        stored = _stored_value_codes
+        for kind, lineno, lexpos in zip(
+                self.kinds, self.linenos, self.lexposes):
+            tok = lex.LexToken()
+            tok.type = token_types[kind]
+            if kind in stored:
+                tok.value = next(values)
+            else:
+                tok.value = _implied_values[kind]
+            tok.lineno = lineno
+            tok.lexpos = lexpos
+            yield tok
+
+    def reader(self):
+        """Return a lexer-like object handing out the buffered tokens."""
+        return _BufferReader(self)
+
+
+class _BufferReader:
+    """Minimal lexer interface over a TokenBuffer, as needed by a parser."""
+
+    def __init__(self, buf):
+        self._tokens = iter(buf)
+
+    def token(self):
+        """Return the next buffered token, or None when exhausted."""
+        return next(self._tokens, None)
+
+
+def _implied_token_values():
+    """Map each token code to the value implied by the token type."""
+    values = [None] * len(tokens)
+    for word, type_ in reserved_tokens.items():
+        values[token_codes[type_]] = _dfa_words[word][1]
+    for spelling, type_ in _dfa_literals.items():
+        values[token_codes[type_]] = spelling
+    return values
+
+
+_implied_values = _implied_token_values()
+
+# Codes of the token types whose values must be stored.
+_stored_value_codes = frozenset(
+    token_codes[type_] for type_ in other_tokens
+)
+
+
 class Lexer(abc.Iterator):
     """ A Llama lexer"""
 
@@ -508,7 +1356,8 @@ class Lexer(abc.Iterator):
     # Logger used for logging events. Possibly shared with other modules.
     logger = None
 
-    def __init__(self, debug=False, optimize=True, logger=None, verbose=False):
+    def __init__(self, debug=False, optimize=True, logger=None, verbose=False,
+                 engine='ply', names=None, constants=None, max_errors=None):
         """
         Create a new lexer.
 
@@ -517,7 +1366,15 @@ class Lexer(abc.Iterator):
         If a 'logger' is not provided, create one.
         For detailed reporting on regex construction, enable 'debug'.
         For echoing matched tokens to stdout, enable 'verbose'.
+        For the table-driven lexing engine, set 'engine' to "dfa".
+        Identifiers and string constants are interned in the NameTable
+        'names' and the ConstantPool 'constants'; those not provided
+        are made anew for every input.
+        To abort lexing after some number of errors, set 'max_errors'.
         """
+        if engine not in _engines:
+            raise ValueError("Unknown lexing engine: %s" % engine)
+        self.engine = engine
         self.debug = debug
         self.optimize = optimize
         if logger is None:
@@ -525,17 +1382,58 @@ class Lexer(abc.Iterator):
         else:
             self.logger = logger
         self.verbose = verbose
+        self._own_names = names is None
+        self._own_constants = constants is None
+        self.names = NameTable() if names is None else names
+        self.constants = ConstantPool() if constants is None else constants
+        self.max_errors = max_errors
+
+        # The inner lexer reports errors through a capped logger, if any.
+        if max_errors is None:
+            self._inner_logger = self.logger
+        else:
+            self._inner_logger = error.CappedLogger(self.logger, max_errors)
 
     def _setup_inner_lexer(self):
-        """Create a new inner lexer and bind it to the Lexer object."""
-
-        self._lexer = _LexerFactory(logger=self.logger, verbose=self.verbose)
-        self._lexer.build(
-            debug=self.debug,
-            optimize=self.optimize,
-            outputdir=_TABLE_DIR,
-            reflags=re.ASCII
+        """
+        Bind an inner lexer to the Lexer object. The PLY lexer is only
+        built the first time; afterwards it is merely reset, and the
+        interning tables not provided by the caller are replaced, so
+        that a reused Lexer does not hold on to the names and string
+        constants of all the inputs it has seen.
+        """
+        if self._own_names:
+            self.names = NameTable()
+        if self._own_constants:
+            self.constants = ConstantPool()
+        if self._lexer is None:
+            self._lexer = _engines[self.engine](
+                logger=self._inner_logger,
+                verbose=self.verbose,
+                names=self.names,
+                constants=self.constants
+            )
+            self._lexer.build(
+                debug=self.debug,
+                optimize=self.optimize,
+                outputdir=_TABLE_DIR,
+                reflags=re.ASCII
+            )
+        else:
+            self._lexer.reset()
+            self._lexer.names = self.names
+            self._lexer.constants = self.constants
+        if self.max_errors is not None:
+            self._inner_logger.clear()
+
+    def _abort(self):
+        """Give up lexing the rest of the input after too many errors."""
+        self.logger.error(
+            "%d: error: Too many errors; aborting lexing.",
+            self.lineno
         )
+        self._lexer.reset()
+        self._lexer.input('')
 
     # == ITERATOR INTERFACE ==
 
@@ -552,6 +1450,35 @@ class Lexer(abc.Iterator):
         self._setup_inner_lexer()
         self._lexer.input(data)
 
+    def input_stream(self, stream, chunk_size=_CHUNK_SIZE, encoding='utf-8'):
+        """
+        Feed the lexer with a file object or an mmap and prepare for
+        tokenizing. The input is read lazily, 'chunk_size' characters
+        (or bytes) at a time; binary input is decoded using 'encoding'.
+        """
+        self._setup_inner_lexer()
+        self._lexer.input_stream(_ChunkReader(stream, chunk_size, encoding))
+
+    def clone(self):
+        """
+        Return a new Lexer with the same settings and interning tables,
+        sharing the built inner lexer (if any) instead of rebuilding it.
+        """
+        new = Lexer(
+            debug=self.debug,
+            optimize=self.optimize,
+            logger=self.logger,
+            verbose=self.verbose,
+            engine=self.engine,
+            names=self.names,
+            constants=self.constants,
+            max_errors=self.max_errors
+        )
+        if self._lexer is not None:
+            new._lexer = self._lexer.clone()
+            new._lexer.logger = new._inner_logger
+        return new
+
     def skip(self, amount):
         """Skip the lexer 'amount' characters forward."""
         if self._lexer is None:
@@ -562,7 +1489,11 @@ class Lexer(abc.Iterator):
         """Skip the lexer 'amount' characters forward."""
         if self._lexer is None:
             raise Exception("Cannot tokenize from empty data.")
-        return self._lexer.token()
+        try:
+            return self._lexer.token()
+        except error.TooManyErrorsError:
+            self._abort()
+            return None
 
     def tokenize(self, data):
         """
@@ -571,6 +1502,31 @@ class Lexer(abc.Iterator):
         self.input(data)
         return self
 
+    def tokenize_to_buffer(self, data, lineno=1, column=1):
+        """
+        Lex the given string at once and return its tokens in a
+        TokenBuffer. The string starts at line 'lineno' and column
+        'column' of the source it was taken from.
+        """
+        self.input(data)
+        self._lexer.lexer.lineno = lineno
+        self._lexer.bol = -column
+        buf = TokenBuffer()
+        try:
+            self._lexer.fill(buf)
+        except error.TooManyErrorsError:
+            self._abort()
+        return buf
+
+    def tokenize_stream(self, stream, chunk_size=_CHUNK_SIZE,
+                        encoding='utf-8'):
+        """
+        Lex the given file object or mmap in chunks and return an
+        iterator over its tokens.
+        """
+        self.input_stream(stream, chunk_size, encoding)
+        return self
+
     # == EXPORT POSITION ATTRIBUTES ==
 
     @property
@@ -584,6 +1540,295 @@ class Lexer(abc.Iterator):
         return self._lexer.lexer.lineno
 
 
+class _Segment:
+    """
+    The source between two consecutive checkpoints of an IncrementalLexer,
+    along with the tokens starting in it. The tokens were numbered from
+    line 'lineno', which is where the segment started when it was lexed.
+    """
+
+    def __init__(self, text, lineno, state, tokens):
+        self.text = text
+        self.lineno = lineno
+        self.state = state
+        self.tokens = tokens
+
+    def move_to(self, lineno):
+        """Renumber the tokens for the segment to start at 'lineno'."""
+        delta = lineno - self.lineno
+        if delta:
+            for tok in self.tokens:
+                tok.lineno += delta
+            self.lineno = lineno
+
+
+class IncrementalLexer:
+    """
+    Lexer for sources that are repeatedly edited, as in an editor.
+
+    Keeps the source cut into segments at checkpoints of the lexer state
+    taken every few lines, along with the tokens of each segment. After
+    an edit, lexing resumes from the last checkpoint before the edit and
+    stops at the first line start past it where the old source had a
+    checkpoint in the same state; from there on, the old segments are
+    reused. Their tokens are renumbered for the lines added or removed
+    only when requested, so an edit costs no more than the segments it
+    touches.
+    """
+
+    def __init__(self, data, logger=None, interval=_CHECKPOINT_INTERVAL):
+        """
+        Lex 'data' in full. Take a checkpoint every 'interval' lines.
+        If a 'logger' is not provided, create one.
+        """
+        if logger is None:
+            self.logger = error.Logger()
+        else:
+            self.logger = logger
+        self.interval = interval
+        self._lexer = _DFALexerFactory(logger=self.logger)
+
+        initial = (0, 1, -1, 'INITIAL', 0)
+        tokens, checkpoints, indices, _ = self._lex_from(data, initial)
+        self._segments = []
+        self._lengths = array.array('I')
+        self._lines = array.array('I')
+        self._counts = array.array('I')
+        self._splice(0, 0, self._cut(
+            data, initial, tokens, checkpoints, indices
+        ))
+
+    @property
+    def data(self):
+        """The current source."""
+        return "".join(segment.text for segment in self._segments)
+
+    @property
+    def tokens(self):
+        """The tokens of the current source."""
+        tokens = []
+        lineno = 1
+        for segment, lines in zip(self._segments, self._lines):
+            segment.move_to(lineno)
+            tokens.extend(segment.tokens)
+            lineno += lines
+        return tokens
+
+    def _lex_from(self, data, checkpoint, is_sync=None):
+        """
+        Lex 'data' from 'checkpoint'.
+
+        If given, 'is_sync' is asked about every line start reached,
+        and lexing stops at the first one it accepts.
+        Return the tokens read, the checkpoints taken and the index of
+        the token following each, and the accepted checkpoint (None if
+        lexing reached <EOF>).
+        """
+        lexer = self._lexer
+        lexer.input(data)
+        lexer.restore(checkpoint)
+        lexer.checkpoints = taken = []
+        lexer.checkpoint_interval = self.interval if is_sync is None else 1
+        lexer.checkpoint_line = checkpoint[1] + lexer.checkpoint_interval
+
+        tokens = []
+        indices = []
+        while True:
+            tok = lexer.token()
+            while len(indices) < len(taken):
+                new_checkpoint = taken[len(indices)]
+                if is_sync is not None and is_sync(new_checkpoint):
+                    del taken[len(indices):]
+                    return tokens, taken, indices, new_checkpoint
+                indices.append(len(tokens))
+            if tok is None:
+                return tokens, taken, indices, None
+            tokens.append(tok)
+
+    @staticmethod
+    def _cut(data, first, tokens, checkpoints, indices):
+        """
+        Cut 'data', lexed from checkpoint 'first', into segments at the
+        given checkpoints and token indices.
+        """
+        starts = [first] + checkpoints
+        bounds = [0] + indices + [len(tokens)]
+        ends = [checkpoint[0] for checkpoint in checkpoints] + [len(data)]
+        return [
+            _Segment(
+                data[checkpoint[0]:end],
+                checkpoint[1],
+                checkpoint[3:],
+                tokens[bounds[index]:bounds[index + 1]]
+            )
+            for index, (checkpoint, end) in enumerate(zip(starts, ends))
+        ]
+
+    def _splice(self, lo, hi, segments):
+        """Replace the segments in [lo, hi) with 'segments'."""
+        self._segments[lo:hi] = segments
+        self._lengths[lo:hi] = array.array(
+            'I', [len(segment.text) for segment in segments]
+        )
+        self._lines[lo:hi] = array.array(
+            'I', [segment.text.count('\n') for segment in segments]
+        )
+        self._counts[lo:hi] = array.array(
+            'I', [len(segment.tokens) for segment in segments]
+        )
+
+    def edit(self, start, end, text):
+        """
+        Replace the source characters in [start, end) with 'text' and
+        re-lex the affected part.
+
+        Return a (first, stop, new_tokens) splice: the old tokens in
+        range(first, stop) have been replaced with 'new_tokens'.
+        """
+        segments = self._segments
+        starts = list(itertools.accumulate(self._lengths, initial=0))
+        resume = min(bisect.bisect_right(starts, start), len(segments)) - 1
+        origin = starts[resume]
+        first = sum(self._counts[:resume])
+        checkpoint = (
+            0,
+            1 + sum(self._lines[:resume]),
+            -1
+        ) + segments[resume].state
+        delta = len(text) - (end - start)
+
+        # Old checkpoints past the edit, by offset in the window below.
+        syncs = {}
+
+        def is_sync(new_checkpoint):
+            """Check for an old checkpoint in the same state, past the edit."""
+            index = syncs.get(new_checkpoint[0])
+            return index is not None and \
+                segments[index].state == new_checkpoint[3:]
+
+        # Lex a window of segments from the resume point, widening it
+        # until lexing syncs with an old checkpoint or reaches <EOF>.
+        lo = max(bisect.bisect_left(starts, end), resume)
+        hi = min(bisect.bisect_right(starts, end) + 1, len(segments))
+        while True:
+            old = "".join(segment.text for segment in segments[resume:hi])
+            window = old[:start - origin] + text + old[end - origin:]
+            for index in range(lo, min(hi + 1, len(segments))):
+                syncs[starts[index] - origin + delta] = index
+            lo = hi + 1
+
+            recorder = error.RecordingLogger()
+            self._lexer.logger = recorder
+            tokens, checkpoints, indices, sync = self._lex_from(
+                window,
+                checkpoint,
+                is_sync
+            )
+            if sync is not None:
+                tail = syncs[sync[0]]
+                window = window[:sync[0]]
+                break
+            if hi == len(segments):
+                tail = hi
+                break
+            hi = min(2 * hi - resume, len(segments))
+        self._lexer.logger = self.logger
+        recorder.replay(self.logger)
+
+        # Thin out the checkpoints of the re-lexed part.
+        kept_checkpoints = []
+        kept_indices = []
+        next_line = checkpoint[1] + self.interval
+        for new_checkpoint, index in zip(checkpoints, indices):
+            if new_checkpoint[1] >= next_line:
+                kept_checkpoints.append(new_checkpoint)
+                kept_indices.append(index)
+                next_line = new_checkpoint[1] + self.interval
+
+        stop = first + sum(self._counts[resume:tail])
+        self._splice(resume, tail, self._cut(
+            window, checkpoint, tokens, kept_checkpoints, kept_indices
+        ))
+        return first, stop, tokens
+
+
+def _lex_piece(piece, lineno=1, state='INITIAL', level=0):
+    """
+    Lex a piece of input that starts at the start of line 'lineno', in
+    the given lexer state. Return the tokens, the lexer state at the end
+    and the record of the events logged.
+    """
+    logger = error.RecordingLogger()
+    lexer = _DFALexerFactory(logger=logger)
+    lexer.input(piece)
+    lexer.restore((0, lineno, -1, state, level))
+    buf = TokenBuffer()
+    lexer.fill(buf)
+    return buf, (lexer.state, lexer.level), logger
+
+
+def _split_lines(data, piece_size):
+    """
+    Split 'data' into pieces of about 'piece_size' characters, each
+    ending right after a newline (except possibly the last).
+    """
+    pieces = []
+    start = 0
+    while len(data) - start > piece_size:
+        cut = data.find('\n', start + piece_size) + 1
+        if not cut:
+            break
+        pieces.append(data[start:cut])
+        start = cut
+    pieces.append(data[start:])
+    return pieces
+
+
+def tokenize_parallel(data, logger=None, workers=None,
+                      piece_size=_PIECE_SIZE):
+    """
+    Lex the given string in pieces, across a pool of 'workers' processes.
+    Return the tokens in a TokenBuffer, exactly as sequential lexing
+    would, and log the same events to 'logger' (if one is provided).
+
+    Pieces are cut at newlines and speculatively lexed as if starting
+    outside any comment or bad literal. While merging, each piece's
+    assumed starting state is validated against the state the previous
+    piece ended in; a piece that guessed wrong is lexed again from the
+    right state. Each piece is numbered from its own first line by its
+    worker, so that merging only concatenates the pieces' arrays.
+    """
+    if logger is None:
+        logger = error.Logger()
+
+    pieces = _split_lines(data, piece_size)
+    linenos = list(itertools.accumulate(
+        (piece.count('\n') for piece in pieces[:-1]),
+        initial=1
+    ))
+    if len(pieces) > 1:
+        with futures.ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(_lex_piece, pieces, linenos))
+    else:
+        results = [_lex_piece(data)]
+
+    merged = TokenBuffer()
+    state = ('INITIAL', 0)
+    for index, piece in enumerate(pieces):
+        buf, end_state, events = results[index]
+        if state != ('INITIAL', 0):
+            buf, end_state, events = _lex_piece(piece, linenos[index], *state)
+        state = end_state
+
+        # Unless at <EOF>, an unclosed comment or literal is not an error.
+        if index < len(pieces) - 1 and state != ('INITIAL', 0):
+            events.records.pop()
+
+        merged.extend(buf)
+        events.replay(logger)
+    return merged
+
+
 def tokenize(data, logger=None):
     """
     Lex the given string using the default Lexer.
@@ -593,6 +1838,15 @@ def tokenize(data, logger=None):
     return lexer.tokenize(data)
 
 
+def tokenize_to_buffer(data, logger=None, lineno=1, column=1):
+    """
+    Lex the given string, which starts at 'lineno' and 'column', using
+    the table-driven engine. Return the tokens in a TokenBuffer.
+    """
+    lexer = Lexer(logger=logger, engine='dfa')
+    return lexer.tokenize_to_buffer(data, lineno, column)
+
+
 def quiet_tokenize(data):
     """
     Lex the given string using the default Lexer.
@@ -0,0 +1,275 @@
+"""
+# ----------------------------------------------------------------------
+# lrgen.py
+#
+# Generator of table-driven LR parser modules
+#
+# Turns the tables of a PLY parser into a standalone Python module: the
+# action rows, default reductions and per-production gotos are emitted
+# as literals, next to a copy of a generic driver that runs them. The
+# tables are not compiled into code. What the module saves over PLY is
+# in the driver: it keeps plain value and state stacks, hands each
+# semantic action a plain Production list instead of PLY's
+# YaccProduction and YaccSymbol objects, and leaves out debugging and
+# position tracking support.
+# ----------------------------------------------------------------------
+"""
+
+import hashlib
+import importlib.util
+import os
+import pprint
+
+# The parts of a generated module that do not depend on the grammar.
+_DRIVER = '''
+
+# Errors to skip before reporting again, after a syntax error.
+_ERROR_COUNT = 3
+
+
+class _Symbol:
+    """A grammar symbol made up by the parser: <EOF> or error."""
+
+    def __init__(self, type_, value=None):
+        self.type = type_
+        self.value = value
+
+
+# The end of input, as a lookahead.
+_END = _Symbol('$end')
+
+
+class Production(list):
+    """
+    The values of a production being reduced: 'p[0]' receives the
+    result, 'p[1:]' hold the values of the right-hand side.
+    """
+
+    __slots__ = ('syms', 'base')
+
+    def lineno(self, n):
+        """Return the line of the n-th symbol, or 0 for nonterminals."""
+        return getattr(self.syms[self.base + n], 'lineno', 0)
+
+    def lexpos(self, n):
+        """Return the position of the n-th symbol, or 0 for nonterminals."""
+        return getattr(self.syms[self.base + n], 'lexpos', 0)
+
+
+def parse(get_token, callables, errorfunc, tables=None):
+    """
+    Parse the tokens returned by 'get_token' (None at <EOF>) and return
+    the value of the start symbol. Reduce production i by calling
+    callables[i] with its Production. Report syntax errors to
+    'errorfunc' and recover from them like PLY does.
+    To run on other action, default reduction and goto tables than the
+    module's own (see lrgen.entry_tables), pass them as 'tables'.
+    """
+    if tables is None:
+        actions, defaulted, gotos = ACTIONS, DEFAULTED, GOTOS
+    else:
+        actions, defaulted, gotos = tables
+    lengths = LENGTHS
+
+    # NOTE: 'syms' holds the token of each terminal, for its position,
+    # and None for each nonterminal.
+    states = [0]
+    vals = [None]
+    syms = [_END]
+    state = 0
+    lookahead = None
+    lookaheads = []
+    errorcount = 0
+
+    while True:
+        if state in defaulted:
+            t = defaulted[state]
+        else:
+            if lookahead is None:
+                if lookaheads:
+                    lookahead = lookaheads.pop()
+                else:
+                    lookahead = get_token() or _END
+            t = actions[state].get(lookahead.type)
+
+        if t is None:
+            if errorcount == 0:
+                errorfunc(None if lookahead is _END else lookahead)
+            errorcount = _ERROR_COUNT
+
+            if len(states) <= 1 and lookahead is not _END:
+                # Nothing to unwind; drop the lookahead and restart.
+                lookahead = None
+                state = 0
+                del lookaheads[:]
+            elif lookahead is _END:
+                return None
+            elif lookahead.type != 'error':
+                if syms[-1] is not None and syms[-1].type == 'error':
+                    lookahead = None
+                    continue
+                error = _Symbol('error', lookahead)
+                if hasattr(lookahead, 'lineno'):
+                    error.lineno = lookahead.lineno
+                if hasattr(lookahead, 'lexpos'):
+                    error.lexpos = lookahead.lexpos
+                lookaheads.append(lookahead)
+                lookahead = error
+            else:
+                states.pop()
+                vals.pop()
+                syms.pop()
+                state = states[-1]
+        elif t > 0:
+            states.append(t)
+            vals.append(lookahead.value)
+            syms.append(lookahead)
+            state = t
+            lookahead = None
+            if errorcount:
+                errorcount -= 1
+        elif t < 0:
+            length = lengths[-t]
+            p = Production(vals[len(vals) - length - 1:])
+            p[0] = None
+            p.syms = syms
+            p.base = len(syms) - length - 1
+            callables[-t](p)
+            if length:
+                del states[-length:]
+                del vals[-length:]
+                del syms[-length:]
+            state = gotos[-t][states[-1]]
+            states.append(state)
+            vals.append(p[0])
+            syms.append(None)
+        else:
+            return vals[-1]
+'''
+
+
+def generate(automaton, filename, digest):
+    """
+    Write a parser module for the tables of PLY LRParser 'automaton'
+    to 'filename', tagged with the grammar fingerprint 'digest'.
+    """
+    states = len(automaton.action)
+    productions = automaton.productions
+
+    # Gotos are only ever taken on the left-hand side of a reduction.
+    gotos = {}
+    for state in range(states):
+        try:
+            row = automaton.goto[state]
+        except KeyError:
+            continue
+        for name, target in row.items():
+            gotos.setdefault(name, {})[state] = target
+    symbols = sorted(gotos)
+
+    def literal(value):
+        return pprint.pformat(value, indent=4, width=79, compact=True)
+
+    parts = [
+        '"""\n%s\n"""\n' % (
+            "Parser module generated by compiler/lrgen.py. Do not edit."
+        ),
+        '# pylint: skip-file\n',
+        'FINGERPRINT = %r\n' % _fingerprint(digest),
+        '\n# Semantic action of each production.',
+        'FUNCS = %s\n' % literal(tuple(prod.func for prod in productions)),
+        '# Number of right-hand side symbols of each production.',
+        'LENGTHS = %s\n' % literal(tuple(prod.len for prod in productions)),
+        '# States reducing regardless of the lookahead.',
+        'DEFAULTED = %s\n' % literal(dict(automaton.defaulted_states)),
+        '# Action row of each state.',
+        'ACTIONS = (',
+    ]
+    for state in range(states):
+        parts.append('    %s,' % literal(automaton.action[state]))
+    parts.append(')\n')
+
+    parts.append('# Target state from each state, per nonterminal.')
+    for index, name in enumerate(symbols):
+        parts.append(
+            '_goto%d = %s  # %s' % (index, literal(gotos[name]), name)
+        )
+    parts.append('\n# Goto table of the left-hand side of each production.')
+    parts.append('GOTOS = (')
+    for prod in productions:
+        if prod.name in gotos:
+            parts.append('    _goto%d,' % symbols.index(prod.name))
+        else:
+            parts.append('    None,')
+    parts.append(')')
+    parts.append(_DRIVER)
+
+    tmpname = '%s.%d.tmp' % (filename, os.getpid())
+    with open(tmpname, 'w') as out:
+        out.write('\n'.join(parts))
+    os.replace(tmpname, filename)
+
+
+def load(filename, digest):
+    """
+    Import the parser module at 'filename'. Return None if it is missing
+    or was not generated for a grammar with fingerprint 'digest'.
+    """
+    if not os.path.exists(filename):
+        return None
+    spec = importlib.util.spec_from_file_location('_llama_parser', filename)
+    module = importlib.util.module_from_spec(spec)
+    try:
+        spec.loader.exec_module(module)
+    except (SyntaxError, ImportError):
+        return None
+    if getattr(module, 'FINGERPRINT', None) != _fingerprint(digest):
+        return None
+    return module
+
+
+def _fingerprint(digest):
+    """
+    Return the fingerprint of a module generated for the grammar with
+    fingerprint 'digest', which also covers the driver.
+    """
+    return hashlib.sha256(digest + _DRIVER.encode('utf-8')).hexdigest()
+
+
+def entry_tables(module, token, production):
+    """
+    Return the tables of parser 'module', to be passed to its 'parse',
+    for parsing from the left-hand side of 'production' (an index) as
+    if it were the start symbol. It must be reached from the initial
+    state on 'token', and followed by <EOF> only.
+
+    The initial state takes the place of the state reached on 'token',
+    and the state reached on the symbol from there accepts. Thus error
+    recovery, which may restart from the initial state, never parses
+    anything but that symbol. The initial state does not reduce by
+    default, lest recovery reduce an empty symbol over and over.
+    """
+    entry = module.ACTIONS[0][token]
+    final = module.GOTOS[production][entry]
+
+    actions = list(module.ACTIONS)
+    actions[0] = actions[entry]
+    actions[final] = {
+        name: 0 if act is not None and act < 0 else act
+        for name, act in actions[final].items()
+    }
+    defaulted = dict(module.DEFAULTED)
+    defaulted.pop(0, None)
+    defaulted.pop(final, None)
+
+    # Gotos from the initial state are those of the entry state.
+    replaced = {}
+    gotos = []
+    for row in module.GOTOS:
+        if row is not None and entry in row:
+            if id(row) not in replaced:
+                replaced[id(row)] = dict(row)
+                replaced[id(row)][0] = row[entry]
+            row = replaced[id(row)]
+        gotos.append(row)
+    return tuple(actions), defaulted, tuple(gotos)
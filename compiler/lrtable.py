@@ -0,0 +1,230 @@
+"""
+# ----------------------------------------------------------------------
+# lrtable.py
+#
+# Compact binary storage of LR parsing tables
+#
+# The action and goto tables of a PLY parser are sparse matrices, with
+# states as rows and grammar symbols as columns. Each is packed into a
+# comb vector (row displacement): every row is slid over the others
+# until its entries fall into free slots. A slot then holds its value
+# and the row owning it. The vectors are stored as raw machine arrays,
+# so loading them is a copy rather than the unmarshalling of a large
+# dict-of-dicts; rows are only unpacked when the parser first visits
+# their state.
+# ----------------------------------------------------------------------
+"""
+
+import array
+import hashlib
+import marshal
+import os
+
+from ply import yacc
+
+# Leading bytes and version of the table file format.
+_MAGIC = b'LLPT'
+_VERSION = 1
+
+# Length of the grammar fingerprint, in bytes.
+_FINGERPRINT_SIZE = 32
+
+# Stored in place of None, which marks explicit errors (as caused by
+# nonassociative operators) in the action table.
+_NONE = -0x80000000
+
+
+def fingerprint(module, start):
+    """
+    Return a digest of the grammar specification in 'module' (its
+    tokens, precedence and rule docstrings) and its 'start' symbol.
+    """
+    digest = hashlib.sha256()
+    spec = (
+        _VERSION,
+        sorted(module.tokens),
+        tuple(getattr(module, 'precedence', ())),
+        start
+    )
+    digest.update(repr(spec).encode('utf-8'))
+    for name in sorted(dir(module)):
+        if name.startswith('p_'):
+            doc = getattr(module, name).__doc__ or ''
+            digest.update(('%s\0%s\0' % (name, doc)).encode('utf-8'))
+    return digest.digest()
+
+
+def _pack(rows, columns):
+    """
+    Pack 'rows', a list of dicts from column to value, into a comb
+    vector. Return the arrays (base, check, value).
+    """
+    index = {column: i for i, column in enumerate(columns)}
+    base = array.array('i', bytes(4 * len(rows)))
+    check = array.array('i')
+    value = array.array('i')
+
+    # First fit, placing the densest rows first.
+    order = sorted(range(len(rows)), key=lambda row: -len(rows[row]))
+    for row in order:
+        entries = sorted((index[col], val) for col, val in rows[row].items())
+        if not entries:
+            continue
+        offset = -entries[0][0]
+        while any(
+            offset + col < len(check) and check[offset + col] != -1
+            for col, _ in entries
+        ):
+            offset += 1
+
+        size = offset + entries[-1][0] + 1
+        if size > len(check):
+            check.extend([-1] * (size - len(check)))
+            value.extend([0] * (size - len(value)))
+        base[row] = offset
+        for col, val in entries:
+            check[offset + col] = row
+            value[offset + col] = _NONE if val is None else val
+    return base, check, value
+
+
+class _LazyRows(dict):
+    """
+    Rows of a comb vector, as a dict from row to a dict from column to
+    value. A row is unpacked on first access, then kept.
+    """
+
+    def __init__(self, columns, base, check, value):
+        super().__init__()
+        self._columns = columns
+        self._base = base
+        self._check = check
+        self._value = value
+
+    def __len__(self):
+        """Return the number of rows, whether unpacked or not."""
+        return len(self._base)
+
+    def __missing__(self, row):
+        if not 0 <= row < len(self._base):
+            raise KeyError(row)
+        offset = self._base[row]
+        first = max(offset, 0)
+        check = self._check[first:offset + len(self._columns)]
+        entries = {}
+        for pos, owner in enumerate(check, first):
+            if owner == row:
+                val = self._value[pos]
+                entries[self._columns[pos - offset]] = \
+                    None if val == _NONE else val
+        self[row] = entries
+        return entries
+
+
+class BinaryTable:
+    """
+    LR tables as loaded from a table file. Provides the attributes
+    of a PLY LRTable, so that a PLY LRParser can be built on top.
+    """
+
+    lr_method = 'LALR'
+
+    def __init__(self, productions, action, goto, defaulted_states):
+        self.lr_productions = productions
+        self.lr_action = action
+        self.lr_goto = goto
+        self.defaulted_states = defaulted_states
+
+    def parser(self):
+        """
+        Return a PLY LRParser running on the tables. The callables of
+        the productions are left unbound.
+        """
+        parser = yacc.LRParser(self, None)
+        # NOTE: The default reductions are stored, not recomputed,
+        # so that no row is unpacked in advance.
+        parser.defaulted_states = dict(self.defaulted_states)
+        return parser
+
+
+def dump(parser, filename, digest):
+    """
+    Write the tables of PLY LRParser 'parser' to 'filename', tagged
+    with the grammar fingerprint 'digest'.
+    """
+    states = len(parser.action)
+    action_rows = [parser.action[state] for state in range(states)]
+    goto_rows = [parser.goto.get(state, {}) for state in range(states)]
+    terminals = sorted({col for row in action_rows for col in row})
+    nonterminals = sorted({col for row in goto_rows for col in row})
+
+    header = (
+        terminals,
+        nonterminals,
+        [
+            (prod.str, prod.name, prod.len, prod.func, prod.file, prod.line)
+            for prod in parser.productions
+        ],
+        parser.defaulted_states
+    )
+    vectors = _pack(action_rows, terminals) + _pack(goto_rows, nonterminals)
+
+    # Write to a temporary file first, so that readers never see a
+    # partially written table.
+    tmpname = '%s.%d.tmp' % (filename, os.getpid())
+    with open(tmpname, 'wb') as out:
+        out.write(_MAGIC)
+        out.write(digest)
+        out.write(marshal.dumps((
+            _VERSION,
+            header,
+            [(vector.typecode, len(vector)) for vector in vectors]
+        )))
+        for vector in vectors:
+            vector.tofile(out)
+    os.replace(tmpname, filename)
+
+
+def load(filename, digest):
+    """
+    Load the tables stored in 'filename' as a BinaryTable. Return None
+    if the file is missing, malformed, or was not built for a grammar
+    with fingerprint 'digest'.
+    """
+    try:
+        with open(filename, 'rb') as stream:
+            data = stream.read()
+    except OSError:
+        return None
+
+    start = len(_MAGIC) + _FINGERPRINT_SIZE
+    if data[:len(_MAGIC)] != _MAGIC or data[len(_MAGIC):start] != digest:
+        return None
+    try:
+        version, header, layout = marshal.loads(memoryview(data)[start:])
+        if version != _VERSION:
+            return None
+        terminals, nonterminals, productions, defaulted_states = header
+
+        # The vectors follow the marshalled header.
+        offset = len(data)
+        for typecode, length in layout:
+            offset -= length * array.array(typecode).itemsize
+        vectors = []
+        for typecode, length in layout:
+            vector = array.array(typecode)
+            end = offset + length * vector.itemsize
+            vector.frombytes(data[offset:end])
+            vectors.append(vector)
+            offset = end
+        action_base, action_check, action_value = vectors[:3]
+        goto_base, goto_check, goto_value = vectors[3:]
+    except (EOFError, TypeError, ValueError):
+        return None
+
+    return BinaryTable(
+        [yacc.MiniProduction(*prod) for prod in productions],
+        _LazyRows(terminals, action_base, action_check, action_value),
+        _LazyRows(nonterminals, goto_base, goto_check, goto_value),
+        defaulted_states
+    )
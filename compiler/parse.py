@@ -11,13 +11,60 @@
 # ----------------------------------------------------------------------
 """
 
+import copy
+from concurrent import futures
+import gc
+import itertools
+import os
+
 from ply import yacc
 
-from compiler import ast, error, lex
+from compiler import ast, error, lex, lrgen, lrtable, pratt
 
 
 _TABLE_DIR = 'tables'
 
+# Compact binary tables, read instead of the PLY table module.
+_TABLE_FILE = os.path.join(_TABLE_DIR, 'parsetab.bin')
+
+# Parser module generated from the tables, for the 'generated' engine.
+_GENERATED_FILE = os.path.join(_TABLE_DIR, 'parser_generated.py')
+
+# Parsing engines a Parser can run on.
+ENGINES = ('ply', 'generated', 'pratt')
+
+# Registry of LR automata built so far, by debug flag.
+# Shared by all Parser objects of the process.
+_automata = {}
+
+# Registry of generated parser modules loaded so far, by file name.
+_generated = {}
+
+# Registry of the tables for parsing from each start symbol other than
+# 'program', by engine, debug flag and start symbol.
+_entry_views = {}
+
+# Default minimum size (in tokens) of a piece parsed in parallel.
+_PIECE_SIZE = 1 << 15
+
+# Token types that may end a definition. A 'let' or 'type' right after
+# one of them starts a top-level definition, since it cannot continue an
+# expression or a type.
+_def_end_types = frozenset((
+    'GENID', 'CONID', 'ICONST', 'FCONST', 'CCONST', 'SCONST', 'TRUE',
+    'FALSE', 'RPAREN', 'RBRACKET', 'END', 'DONE', 'UNIT', 'INT', 'CHAR',
+    'BOOL', 'FLOAT', 'REF'
+))
+
+# Token types starting a definition.
+_def_start_types = frozenset(('LET', 'TYPE'))
+
+# The same, as token codes.
+_def_end_codes = frozenset(lex.token_codes[name] for name in _def_end_types)
+_def_start_codes = frozenset(
+    lex.token_codes[name] for name in _def_start_types
+)
+
 
 def _track(p):
     """Add position to root of reduced grammar rule."""
@@ -30,6 +77,11 @@ def _track(p):
         node.lexpos = p.lexpos(1)
 
 
+def _skip_track(_):
+    """Leave the root of a reduced grammar rule without a position."""
+    pass
+
+
 class Parser:
     """A parser for the Llama language"""
     precedence = (
@@ -61,13 +113,21 @@ class Parser:
     #                separated by tokens of type B.
     # In cases where B is absent, whitespace may be assumed as separator.
 
+    # The real start symbol. By default it derives a program. Any other
+    # nonterminal is derived after a synthetic entry token, so that the
+    # automaton has a state in which to start parsing it; see
+    # _entry_tables. The entry tokens are never actually read.
+    # NOTE: The rules are filled in by _add_entry_rules.
+    def p_entry(self, p):
+        p[0] = p[len(p) - 1]
+
     def p_program(self, p):
         """program : def_list"""
         p[0] = ast.Program(p[1])
 
     def p_def_list(self, p):
-        """def_list : letdef def_list
-                    | typedef def_list
+        """def_list : def_list letdef
+                    | def_list typedef
                     | empty"""
         self._expand_list(p)
 
@@ -78,10 +138,10 @@ class Parser:
             p[0] = ast.LetDef(p[3], isRec=True)
         else:
             p[0] = ast.LetDef(p[2])
-        _track(p)
+        self._track(p)
 
     def p_def_seq(self, p):
-        """def_seq : def AND def_seq
+        """def_seq : def_seq AND def
                    | def"""
         self._expand_seq(p)
 
@@ -90,7 +150,7 @@ class Parser:
                | function_def
                | var_def"""
         p[0] = p[1]
-        _track(p)
+        self._track(p)
 
     def p_constant_def(self, p):
         """constant_def : GENID COLON type EQ expr
@@ -99,7 +159,7 @@ class Parser:
             p[0] = ast.ConstantDef(p[1], p[5], p[3])
         else:
             p[0] = ast.ConstantDef(p[1], p[3])
-        _track(p)
+        self._track(p)
 
     def p_function_def(self, p):
         """function_def : GENID param_seq COLON type EQ expr
@@ -108,12 +168,12 @@ class Parser:
             p[0] = ast.FunctionDef(p[1], p[2], p[6], p[4])
         else:
             p[0] = ast.FunctionDef(p[1], p[2], p[4])
-        _track(p)
+        self._track(p)
 
     def p_param_seq(self, p):
-        """param_seq : param param_seq
+        """param_seq : param_seq param
                      | param"""
-        self._expand_seq(p, 1, 2)
+        self._expand_seq(p)
 
     def p_param(self, p):
         """param : LPAREN GENID COLON type RPAREN
@@ -122,7 +182,7 @@ class Parser:
             p[0] = ast.Param(p[2], p[4])
         else:
             p[0] = ast.Param(p[1])
-        _track(p)
+        self._track(p)
 
     def p_type(self, p):
         """type : LPAREN type RPAREN
@@ -132,7 +192,7 @@ class Parser:
             p[0] = p[2]
         else:
             p[0] = p[1]
-        _track(p)
+        self._track(p)
 
     def p_builtin_type(self, p):
         """builtin_type : BOOL
@@ -140,8 +200,12 @@ class Parser:
                         | FLOAT
                         | INT
                         | UNIT"""
-        p[0] = ast.builtin_types_map[p[1]]()
-        _track(p)
+        if self.track_positions:
+            p[0] = ast.builtin_types_map[p[1]]()
+            self._track(p)
+        else:
+            # Without positions, all occurrences can share a node.
+            p[0] = ast.builtin_types[p[1]]
 
     def p_derived_type(self, p):
         """derived_type : array_type
@@ -149,7 +213,7 @@ class Parser:
                         | ref_type
                         | user_type"""
         p[0] = p[1]
-        _track(p)
+        self._track(p)
 
     def p_array_type(self, p):
         """array_type : ARRAY LBRACKET star_comma_seq RBRACKET OF type
@@ -158,31 +222,31 @@ class Parser:
             p[0] = ast.Array(p[6], p[3])
         else:
             p[0] = ast.Array(p[3])
-        _track(p)
+        self._track(p)
 
     def p_star_comma_seq(self, p):
-        """star_comma_seq : TIMES COMMA star_comma_seq
+        """star_comma_seq : star_comma_seq COMMA TIMES
                           | TIMES"""
         # We 'll be counting stars :)
         if len(p) == 4:
-            p[0] = p[3] + 1
+            p[0] = p[1] + 1
         else:
             p[0] = 1
 
     def p_function_type(self, p):
         """function_type : type ARROW type"""
         p[0] = ast.Function(p[1], p[3])
-        _track(p)
+        self._track(p)
 
     def p_ref_type(self, p):
         """ref_type : type REF"""
         p[0] = ast.Ref(p[1])
-        _track(p)
+        self._track(p)
 
     def p_user_type(self, p):
         """user_type : GENID"""
         p[0] = ast.User(p[1])
-        _track(p)
+        self._track(p)
 
     def p_empty(self, _):
         """empty :"""
@@ -233,22 +297,22 @@ class Parser:
             p[0] = ast.UnaryExpression(p[1], p[2])
         else:
             p[0] = p[1]
-        _track(p)
+        self._track(p)
 
     def p_begin_end_expr(self, p):
         """begin_end_expr : BEGIN expr END"""
         p[0] = p[2]
-        _track(p)
+        self._track(p)
 
     def p_constructor_call_expr(self, p):
         """constructor_call_expr : CONID simple_expr_seq"""
         p[0] = ast.ConstructorCallExpression(p[1], p[2])
-        _track(p)
+        self._track(p)
 
     def p_simple_expr_seq(self, p):
-        """simple_expr_seq : simple_expr simple_expr_seq
+        """simple_expr_seq : simple_expr_seq simple_expr
                            | simple_expr"""
-        self._expand_seq(p, 1, 2)
+        self._expand_seq(p)
 
     def p_simple_expr(self, p):
         """simple_expr : array_simple_expr
@@ -264,68 +328,68 @@ class Parser:
                        | sconst_simple_expr
                        | uconst_simple_expr"""
         p[0] = p[1]
-        _track(p)
+        self._track(p)
 
     def p_array_simple_expr(self, p):
         """array_simple_expr : GENID LBRACKET expr_comma_seq RBRACKET"""
         p[0] = ast.ArrayExpression(p[1], p[3])
-        _track(p)
+        self._track(p)
 
     def p_paren_simple_expr(self, p):
         """paren_simple_expr : LPAREN expr RPAREN"""
         p[0] = p[2]
-        _track(p)
+        self._track(p)
 
     def p_bang_simple_expr(self, p):
         """bang_simple_expr : BANG simple_expr"""
         p[0] = ast.UnaryExpression(p[1], p[2])
-        _track(p)
+        self._track(p)
 
     def p_bconst_simple_expr(self, p):
         """bconst_simple_expr : TRUE
                               | FALSE"""
-        p[0] = ast.ConstExpression(p[1], ast.Bool())
-        _track(p)
+        p[0] = ast.ConstExpression(p[1], ast.builtin_types['bool'])
+        self._track(p)
 
     def p_cconst_simple_expr(self, p):
         """cconst_simple_expr : CCONST"""
-        p[0] = ast.ConstExpression(p[1], ast.Char())
-        _track(p)
+        p[0] = ast.ConstExpression(p[1], ast.builtin_types['char'])
+        self._track(p)
 
     def p_conid_simple_expr(self, p):
         """conid_simple_expr : CONID"""
         p[0] = ast.ConidExpression(p[1])
-        _track(p)
+        self._track(p)
 
     def p_iconst_simple_expr(self, p):
         """iconst_simple_expr : ICONST"""
-        p[0] = ast.ConstExpression(p[1], ast.Int())
-        _track(p)
+        p[0] = ast.ConstExpression(p[1], ast.builtin_types['int'])
+        self._track(p)
 
     def p_fconst_simple_expr(self, p):
         """fconst_simple_expr : FCONST"""
-        p[0] = ast.ConstExpression(p[1], ast.Float())
-        _track(p)
+        p[0] = ast.ConstExpression(p[1], ast.builtin_types['float'])
+        self._track(p)
 
     def p_genid_simple_expr(self, p):
         """genid_simple_expr : GENID"""
         p[0] = ast.GenidExpression(p[1])
-        _track(p)
+        self._track(p)
 
     def p_sconst_simple_expr(self, p):
         """sconst_simple_expr : SCONST"""
         p[0] = ast.ConstExpression(p[1], ast.String())
-        _track(p)
+        self._track(p)
 
     def p_uconst_simple_expr(self, p):
         """uconst_simple_expr : LPAREN RPAREN"""
-        p[0] = ast.ConstExpression(None, ast.Unit())
-        _track(p)
+        p[0] = ast.ConstExpression(None, ast.builtin_types['unit'])
+        self._track(p)
 
     def p_delete_expr(self, p):
         """delete_expr : DELETE expr"""
         p[0] = ast.DeleteExpression(p[2])
-        _track(p)
+        self._track(p)
 
     def p_dim_expr(self, p):
         """dim_expr : DIM ICONST GENID
@@ -334,33 +398,33 @@ class Parser:
             p[0] = ast.DimExpression(p[3], p[2])
         else:
             p[0] = ast.DimExpression(p[2])
-        _track(p)
+        self._track(p)
 
     def p_for_expr(self, p):
         """for_expr : for_to_expr
                     | for_downto_expr"""
         p[0] = p[1]
-        _track(p)
+        self._track(p)
 
     def p_for_to_expr(self, p):
         """for_to_expr : FOR GENID EQ expr TO expr DO expr DONE"""
         p[0] = ast.ForExpression(p[2], p[4], p[6], p[8])
-        _track(p)
+        self._track(p)
 
     def p_for_downto_expr(self, p):
         """for_downto_expr : FOR GENID EQ expr DOWNTO expr DO expr DONE"""
         p[0] = ast.ForExpression(p[2], p[4], p[6], p[8], isDown=True)
-        _track(p)
+        self._track(p)
 
     def p_function_call_expr(self, p):
         """function_call_expr : GENID simple_expr_seq"""
         p[0] = ast.FunctionCallExpression(p[1], p[2])
-        _track(p)
+        self._track(p)
 
     def p_in_expr(self, p):
         """in_expr : letdef IN expr"""
         p[0] = ast.LetInExpression(p[1], p[3])
-        _track(p)
+        self._track(p)
 
     def p_if_expr(self, p):
         # WARNING: Changing order of clauses produces Syntax Errors,
@@ -371,38 +435,38 @@ class Parser:
             p[0] = ast.IfExpression(p[2], p[4], p[6])
         else:
             p[0] = ast.IfExpression(p[2], p[4])
-        _track(p)
+        self._track(p)
 
     def p_match_expr(self, p):
         """match_expr : MATCH expr WITH clause_seq END"""
         p[0] = ast.MatchExpression(p[2], p[4])
-        _track(p)
+        self._track(p)
 
     def p_clause_seq(self, p):
-        """clause_seq : clause PIPE clause_seq
+        """clause_seq : clause_seq PIPE clause
                       | clause"""
         self._expand_seq(p)
 
     def p_clause(self, p):
         """clause : pattern ARROW expr"""
         p[0] = ast.Clause(p[1], p[3])
-        _track(p)
+        self._track(p)
 
     def p_pattern(self, p):
         """pattern : complex_pattern
                    | simple_pattern"""
         p[0] = p[1]
-        _track(p)
+        self._track(p)
 
     def p_complex_pattern(self, p):
         """complex_pattern : CONID simple_pattern_seq"""
         p[0] = ast.Pattern(p[1], p[2])
-        _track(p)
+        self._track(p)
 
     def p_simple_pattern_seq(self, p):
-        """simple_pattern_seq : simple_pattern simple_pattern_seq
+        """simple_pattern_seq : simple_pattern_seq simple_pattern
                               | simple_pattern"""
-        self._expand_seq(p, list_idx=2)
+        self._expand_seq(p)
 
     def p_simple_pattern(self, p):
         """simple_pattern : LPAREN pattern RPAREN
@@ -420,74 +484,74 @@ class Parser:
             p[0] = p[2]
         else:
             p[0] = p[1]
-        _track(p)
+        self._track(p)
 
     def p_conid_simple_pattern(self, p):
         """conid_simple_pattern : CONID"""
         p[0] = ast.Pattern(p[1])
-        _track(p)
+        self._track(p)
 
     def p_genid_simple_pattern(self, p):
         """genid_simple_pattern : GENID"""
         p[0] = ast.GenidPattern(p[1])
-        _track(p)
+        self._track(p)
 
     def p_mfconst_simple_pattern(self, p):
         """mfconst_simple_pattern : FMINUS FCONST"""
-        p[0] = ast.ConstExpression(-p[2], ast.Float())
-        _track(p)
+        p[0] = ast.ConstExpression(-p[2], ast.builtin_types['float'])
+        self._track(p)
 
     def p_pfconst_simple_pattern(self, p):
         """pfconst_simple_pattern : FPLUS FCONST"""
-        p[0] = ast.ConstExpression(p[2], ast.Float())
-        _track(p)
+        p[0] = ast.ConstExpression(p[2], ast.builtin_types['float'])
+        self._track(p)
 
     def p_miconst_simple_pattern(self, p):
         """miconst_simple_pattern : MINUS ICONST"""
-        p[0] = ast.ConstExpression(-p[2], ast.Int())
-        _track(p)
+        p[0] = ast.ConstExpression(-p[2], ast.builtin_types['int'])
+        self._track(p)
 
     def p_piconst_simple_pattern(self, p):
         """piconst_simple_pattern : PLUS ICONST"""
-        p[0] = ast.ConstExpression(p[2], ast.Int())
-        _track(p)
+        p[0] = ast.ConstExpression(p[2], ast.builtin_types['int'])
+        self._track(p)
 
     def p_new_expr(self, p):
         """new_expr : NEW type"""
         p[0] = ast.NewExpression(p[2])
-        _track(p)
+        self._track(p)
 
     def p_while_expr(self, p):
         """while_expr : WHILE expr DO expr DONE"""
         p[0] = ast.WhileExpression(p[2], p[4])
-        _track(p)
+        self._track(p)
 
     def p_var_def(self, p):
         """var_def : array_var_def
                    | simple_var_def"""
         p[0] = p[1]
-        _track(p)
+        self._track(p)
 
     def p_array_var_def(self, p):
         """array_var_def : array_var_def_typed
                          | array_var_def_untyped"""
         p[0] = p[1]
-        _track(p)
+        self._track(p)
 
     def p_array_var_def_typed(self, p):
         """array_var_def_typed : MUTABLE GENID LBRACKET expr_comma_seq RBRACKET COLON type"""
         item_type = p[7]
         arr_type = ast.Array(item_type, len(p[4]))
         p[0] = ast.ArrayVariableDef(p[2], p[4], arr_type)
-        _track(p)
+        self._track(p)
 
     def p_array_var_def_untyped(self, p):
         """array_var_def_untyped : MUTABLE GENID LBRACKET expr_comma_seq RBRACKET"""
         p[0] = ast.ArrayVariableDef(p[2], p[4])
-        _track(p)
+        self._track(p)
 
     def p_expr_comma_seq(self, p):
-        """expr_comma_seq : expr COMMA expr_comma_seq
+        """expr_comma_seq : expr_comma_seq COMMA expr
                           | expr"""
         self._expand_seq(p)
 
@@ -500,14 +564,14 @@ class Parser:
             p[0] = ast.VariableDef(p[2], vartype)
         else:
             p[0] = ast.VariableDef(p[2])
-        _track(p)
+        self._track(p)
 
     def p_typedef(self, p):
         """typedef : TYPE tdef_and_seq"""
         p[0] = p[2]
 
     def p_tdef_and_seq(self, p):
-        """tdef_and_seq : tdef AND tdef_and_seq
+        """tdef_and_seq : tdef_and_seq AND tdef
                         | tdef"""
         self._expand_seq(p)
 
@@ -516,10 +580,10 @@ class Parser:
                 | builtin_type EQ constr_pipe_seq"""
         # NOTE: Flag redefinition of builtin_types during semantic analysis.
         p[0] = ast.TDef(p[1], p[3])
-        _track(p)
+        self._track(p)
 
     def p_constr_pipe_seq(self, p):
-        """constr_pipe_seq : constr PIPE constr_pipe_seq
+        """constr_pipe_seq : constr_pipe_seq PIPE constr
                            | constr"""
         self._expand_seq(p)
 
@@ -530,12 +594,12 @@ class Parser:
             p[0] = ast.Constructor(p[1], p[3])
         else:
             p[0] = ast.Constructor(p[1])
-        _track(p)
+        self._track(p)
 
     def p_type_seq(self, p):
-        """type_seq : type type_seq
+        """type_seq : type_seq type
                     | type"""
-        self._expand_seq(p, list_idx=2)
+        self._expand_seq(p)
 
     def p_error(self, p):
         """Signal syntax error"""
@@ -550,28 +614,41 @@ class Parser:
         else:
             self.logger.error("Syntax error in unknown token")
 
-    def _expand_seq(self, p, last_idx=1, list_idx=3):
-        if len(p) == last_idx + 1:
-            p[0] = [p[last_idx]]
+    # NOTE: Sequences and lists are left-recursive, so that each item is
+    # reduced as soon as it is parsed. The list is then built by appending
+    # in linear time and the LR stack does not grow with its length.
+
+    def _expand_seq(self, p):
+        if len(p) == 2:
+            p[0] = [p[1]]
         else:
-            p[list_idx].insert(0, p[last_idx])
-            p[0] = p[list_idx]
+            p[1].append(p[len(p) - 1])
+            p[0] = p[1]
 
     def _expand_list(self, p):
-        if p[1] is None:
-            # end of list
+        if len(p) == 2:
+            # start of list
             p[0] = []
         else:
-            p[2].insert(0, p[1])
-            p[0] = p[2]
+            p[1].append(p[2])
+            p[0] = p[1]
 
     parser = None
     tokens = lex.tokens
     logger = None
     verbose = False
+    engine = 'ply'
+    module = None
+    callables = None
+    pratt = None
+    track_positions = True
+
+    # Position bookkeeping of reductions; see _set_tracking.
+    _track = staticmethod(_track)
 
     def __init__(self, debug=False, logger=None, optimize=True,
-                 start='program', verbose=False):
+                 start='program', verbose=False, engine='ply',
+                 track_positions=True):
         """
         Create a parser.
 
@@ -582,35 +659,56 @@ class Parser:
         'debug' and check the 'parser.out' file.
         For manually specifying the initial state, modify 'start'.
         For echoing LR stack to stdout while parsing, enable 'verbose'.
+        For running the tables through a parser module generated from
+        them, instead of PLY, set 'engine' to 'generated'. For parsing
+        with the hand-written parser, and only falling back to PLY to
+        report syntax errors, set 'engine' to 'pratt'. Verbose parsers
+        always run on PLY.
+        For building nodes without positions, which is faster, disable
+        'track_positions'. Input with errors is then parsed again with
+        positions, so that the tree and the diagnostics are as usual.
+        Input that cannot be read twice, i.e. that of a lexer already
+        fed with it, is always parsed with positions.
+        The hand-written parser takes positions straight from tokens at
+        no extra cost, so it always tracks them.
         """
+        if start != 'program' and start not in _entry_tokens:
+            raise ValueError("Unknown start symbol: %s" % start)
+        if engine not in ENGINES:
+            raise ValueError("Unknown parsing engine: %s" % engine)
+        self.start = start
         self.verbose = verbose
+        self.debug = debug
         if logger is None:
             self.logger = error.Logger()
         else:
             self.logger = logger
 
-        if start == 'program':
-            errorlog = None
-            yaccfile = 'parsetab'
-        else:
-            # Explicitly silence warnings about unused rules when
-            # starting from a state other than the default. In addition,
-            # send parser cache to a special file, to avoid conflicts and
-            # make cleaning easy
-            errorlog = yacc.NullLogger()
-            yaccfile = "%s_%s" % ('aux', start)
-
-        tabmodule = '%s.%s' % (_TABLE_DIR, yaccfile)
-
-        self.parser = yacc.yacc(
-            module=self,
-            errorlog=errorlog,
-            debug=debug,
-            optimize=optimize,
-            start=start,
-            tabmodule=tabmodule,
-            outputdir=_TABLE_DIR
-        )
+        # All start symbols share one set of tables.
+        automaton = _automata.get(debug)
+        if automaton is None:
+            automaton = self._build_automaton(debug, optimize)
+            _automata[debug] = automaton
+        self.parser = self._bind(automaton)
+        self._entry_parsers = {}
+
+        if engine == 'generated' and not verbose:
+            module = _generated.get(_GENERATED_FILE)
+            if module is None:
+                module = self._load_generated(automaton)
+            if module is not None:
+                _generated[_GENERATED_FILE] = module
+                self.engine = engine
+                self.module = module
+                self.callables = [
+                    getattr(self, name) if name else None
+                    for name in module.FUNCS
+                ]
+        elif engine == 'pratt' and not verbose:
+            self.engine = engine
+            self.pratt = pratt.PrattParser(self.precedence)
+        if not track_positions:
+            self._set_tracking(False)
 
         if verbose:
             self.logger.info(
@@ -620,14 +718,389 @@ class Parser:
                 'parser ready'
             )
 
-    def parse(self, data, lexer=None):
+    def _build_automaton(self, debug, optimize):
+        """
+        Return the LR automaton of the grammar. If optimizing, load its
+        tables from the table file, unless that is stale; otherwise
+        generate them with PLY and store them in the table file.
+        """
+        digest = lrtable.fingerprint(type(self), 'entry')
+        if optimize and not debug:
+            table = lrtable.load(_TABLE_FILE, digest)
+            if table is not None:
+                return table.parser()
+
+        # NOTE: Without optimize, PLY checks the signature of any table
+        # module left over from an older grammar and ignores it if stale;
+        # with it, such tables would be stored in the table file.
+        automaton = yacc.yacc(
+            module=self,
+            debug=debug,
+            optimize=False,
+            start='entry',
+            write_tables=False,
+            tabmodule='%s.%s' % (_TABLE_DIR, 'parsetab'),
+            outputdir=_TABLE_DIR
+        )
+        try:
+            lrtable.dump(automaton, _TABLE_FILE, digest)
+        except OSError as exc:
+            self.logger.warning("Could not write %s: %s", _TABLE_FILE, exc)
+        return automaton
+
+    def _load_generated(self, automaton):
+        """
+        Return the parser module generated from the tables of LR
+        'automaton'. Regenerate it if it is missing or stale. Return
+        None if it cannot be written, so that PLY is used instead.
+        """
+        digest = lrtable.fingerprint(type(self), 'entry')
+        module = lrgen.load(_GENERATED_FILE, digest)
+        if module is None:
+            try:
+                lrgen.generate(automaton, _GENERATED_FILE, digest)
+            except OSError as exc:
+                self.logger.warning(
+                    "Could not write %s: %s", _GENERATED_FILE, exc
+                )
+                return None
+            module = lrgen.load(_GENERATED_FILE, digest)
+        return module
+
+    def _bind(self, automaton):
+        """
+        Return a handle to the shared LR 'automaton' which reduces
+        rules and reports errors through the methods of this object.
+        The parsing tables are shared, not copied.
+        """
+        parser = copy.copy(automaton)
+        parser.productions = []
+        for prod in automaton.productions:
+            bound = yacc.MiniProduction(
+                prod.str,
+                prod.name,
+                prod.len,
+                prod.func,
+                prod.file,
+                prod.line
+            )
+            if prod.func:
+                bound.callable = getattr(self, prod.func)
+            parser.productions.append(bound)
+        parser.errorfunc = self.p_error
+        return parser
+
+    def _set_tracking(self, track):
+        """Turn the tracking of node positions on or off."""
+        self.track_positions = track
+        self._track = _track if track else _skip_track
+
+    def parse(self, data, lexer=None, start=None):
         """
         Parse the input and return the AST. If a lexer is not provided,
-        create one on the fly.
+        create one on the fly. The input may also be an already lexed
+        lex.TokenBuffer, in which case no lexer is used.
+        To parse from another start symbol than the parser's, set 'start'.
+        """
+        if self.track_positions:
+            return self._parse(data, lexer, start)
+        if _can_relex(data, lexer):
+            return self._parse_untracked(data, lexer, start)
+        return self._parse_tracked(data, lexer, start)
+
+    def _parse_untracked(self, data, lexer, start):
         """
-        if lexer is None:
+        Parse without tracking positions, holding back the events
+        logged. On error, parse the input again with positions, logging
+        to the parser's logger. A given lexer is only fed the input
+        once; it is lexed again by a silent twin of that lexer, so that
+        no token is kept for the second parse.
+        """
+        logger = self.logger
+        self.logger = recorder = error.RecordingLogger()
+        try:
+            tree = self._parse(data, lexer, start)
+        finally:
+            self.logger = logger
+        if recorder.success:
+            recorder.replay(logger)
+            return tree
+
+        if lexer is not None and not isinstance(data, lex.TokenBuffer):
+            lexer = lex.Lexer(
+                logger=error.LoggerMock(),
+                engine=lexer.engine,
+                max_errors=lexer.max_errors
+            )
+        return self._parse_tracked(data, lexer, start)
+
+    def _parse_tracked(self, data, lexer, start):
+        """Parse with positions, even if the parser does not track them."""
+        self._set_tracking(True)
+        try:
+            return self._parse(data, lexer, start)
+        finally:
+            self._set_tracking(False)
+
+    def _parse(self, data, lexer, start):
+        """Parse the input as described in parse."""
+        if isinstance(data, lex.TokenBuffer):
+            data, lexer = None, data.reader()
+        elif lexer is None:
             lexer = lex.Lexer(logger=self.logger)
-        return self.parser.parse(data, lexer, debug=self.verbose)
+
+        if start is None:
+            start = self.start
+        if self.engine == 'pratt' and start in pratt.PrattParser.starts:
+            if data is not None:
+                lexer.input(data)
+            try:
+                return self.pratt.parse(lexer.token, start)
+            except pratt.ParseError:
+                # Re-parse the tokens read so far, then the rest, with
+                # PLY, which reports the error and recovers from it. Its
+                # stack is a list, so it also takes input nested too
+                # deeply for the hand-written parser.
+                data, lexer = None, _Replay(self.pratt.replay)
+        if self.engine == 'generated':
+            if data is not None:
+                lexer.input(data)
+            return self.module.parse(
+                lexer.token,
+                self.callables,
+                self.p_error,
+                self._entry_module_tables(start)
+            )
+        return self._entry_parser(start).parse(
+            data,
+            lexer,
+            debug=self.verbose
+        )
+
+    def _entry_parser(self, start):
+        """
+        Return a handle to the LR automaton parsing from the 'start'
+        symbol, as an automaton built for that symbol alone would.
+        """
+        if start == 'program':
+            return self.parser
+        parser = self._entry_parsers.get(start)
+        if parser is None:
+            key = ('ply', self.debug, start)
+            tables = _entry_views.get(key)
+            if tables is None:
+                tables = _entry_views[key] = _entry_tables(
+                    self.parser.action,
+                    self.parser.goto,
+                    self.parser.defaulted_states,
+                    start
+                )
+            parser = copy.copy(self.parser)
+            parser.action, parser.goto, parser.defaulted_states = tables
+            self._entry_parsers[start] = parser
+        return parser
+
+    def _entry_module_tables(self, start):
+        """
+        Return the tables of the generated parser module for parsing
+        from the 'start' symbol, or None for its own tables.
+        """
+        if start == 'program':
+            return None
+        key = ('generated', self.debug, start)
+        tables = _entry_views.get(key)
+        if tables is None:
+            production = next(
+                index for index, prod in enumerate(self.parser.productions)
+                if prod.name == start
+            )
+            tables = _entry_views[key] = lrgen.entry_tables(
+                self.module,
+                _entry_tokens[start],
+                production
+            )
+        return tables
+
+    def iter_definitions(self, data, lexer=None, spans=True):
+        """
+        Parse the input as a program and yield each of its definitions
+        (a LetDef, or the list of TDefs of a typedef) as soon as it is
+        parsed, along with its span: the (line, column) positions of its
+        first token and of the token following it, or None at <EOF>.
+        If 'spans' is false, yield the definitions alone, e.g. to feed
+        them to sem.Analyzer.analyze as they come.
+        The input is given as for 'parse'; the tokens of a definition
+        are released once it is yielded.
+        Definitions are parsed by the hand-written parser. After a syntax
+        error, PLY reports errors in the rest of the input as 'parse'
+        would, but no more definitions are yielded. From a definition
+        too deep for the hand-written parser on, PLY parses the rest.
+        """
+        if not spans:
+            for node, _ in self.iter_definitions(data, lexer):
+                yield node
+            return
+
+        if isinstance(data, lex.TokenBuffer):
+            data, lexer = None, data.reader()
+        elif lexer is None:
+            lexer = lex.Lexer(logger=self.logger)
+        if data is not None:
+            lexer.input(data)
+
+        parser = self.pratt or pratt.PrattParser(self.precedence)
+        definitions = parser.iter_def_list(lexer.token)
+        while True:
+            try:
+                node, first, after = next(definitions)
+            except StopIteration:
+                return
+            except pratt.NestingError:
+                break
+            except pratt.ParseError:
+                self.parser.parse(
+                    None,
+                    _Replay(parser.replay),
+                    debug=self.verbose
+                )
+                return
+            yield node, _span(first, after)
+
+        yield from self._iter_definitions_ply(list(parser.replay))
+
+    def _iter_definitions_ply(self, tokens):
+        """
+        Parse 'tokens' with PLY, one definition at a time, and yield
+        the definitions as 'iter_definitions' does. After a syntax
+        error, report errors in the rest of the tokens as 'parse' would.
+        """
+        cuts = [0]
+        for index in range(1, len(tokens)):
+            if tokens[index].type in _def_start_types and \
+                    tokens[index - 1].type in _def_end_types:
+                cuts.append(index)
+        cuts.append(len(tokens))
+
+        for start, stop in zip(cuts, cuts[1:]):
+            logger = self.logger
+            self.logger = recorder = error.RecordingLogger()
+            try:
+                definitions = self._entry_parser('def_list').parse(
+                    None,
+                    _Replay(tokens[start:stop]),
+                    debug=self.verbose
+                )
+            finally:
+                self.logger = logger
+            if not recorder.success:
+                self.parser.parse(
+                    None,
+                    _Replay(tokens[start:]),
+                    debug=self.verbose
+                )
+                return
+            after = tokens[stop] if stop < len(tokens) else None
+            for node in definitions:
+                yield node, _span(tokens[start], after)
+
+
+def _add_entry_rules(parser_class):
+    """
+    Let the 'entry' rule of 'parser_class' derive every nonterminal
+    of the grammar, each after its own synthetic entry token.
+    Return a map from each nonterminal to its entry token type.
+    """
+    symbols = set()
+    for name in dir(parser_class):
+        if name.startswith('p_') and name not in ('p_entry', 'p_error'):
+            doc = getattr(parser_class, name).__doc__
+            symbols.add(doc.split(':')[0].strip())
+    symbols.discard('program')
+
+    entry_tokens = {
+        symbol: 'START_' + symbol.upper() for symbol in sorted(symbols)
+    }
+    parser_class.tokens = lex.tokens + tuple(entry_tokens.values())
+    parser_class.p_entry.__doc__ = 'entry : program\n' + ''.join(
+        '      | %s %s\n' % (token, symbol)
+        for symbol, token in entry_tokens.items()
+    )
+    return entry_tokens
+
+
+_entry_tokens = _add_entry_rules(Parser)
+
+
+class _Overlay(dict):
+    """
+    The rows of an LR table, some of them replaced. The other rows are
+    looked up in the underlying table on first access, then kept.
+    """
+
+    def __init__(self, table, rows):
+        super().__init__(rows)
+        self._table = table
+
+    def __missing__(self, state):
+        row = self[state] = self._table[state]
+        return row
+
+
+def _entry_tables(action, goto, defaulted_states, start):
+    """
+    Return the action, goto and default reduction tables of the LR
+    automaton with tables 'action', 'goto' and 'defaulted_states', set
+    up to parse from the 'start' symbol as if it were the start symbol
+    of the grammar.
+
+    The initial state takes the place of the state reached on the entry
+    token of 'start', and the state reached on 'start' from there
+    accepts at <EOF>. Thus the entry token needs not be read, and error
+    recovery, which may unwind the stack down to the initial state and
+    restart from it, parses a 'start' again rather than a program.
+    The initial state never reduces by default: were it to reduce an
+    empty 'start', recovery would unwind to it and reduce again forever.
+    """
+    entry = action[0][_entry_tokens[start]]
+    final = goto[entry][start]
+    accept = {
+        token: 0 if act is not None and act < 0 else act
+        for token, act in action[final].items()
+    }
+    defaulted = dict(defaulted_states)
+    defaulted.pop(0, None)
+    defaulted.pop(final, None)
+    return (
+        _Overlay(action, {0: action[entry], final: accept}),
+        _Overlay(goto, {0: goto[entry]}),
+        defaulted
+    )
+
+
+def _can_relex(data, lexer):
+    """
+    Check whether the input of 'parse' can be lexed a second time: it
+    is lexed by the parser, or it is given as data to a Lexer.
+    """
+    return lexer is None or isinstance(data, lex.TokenBuffer) or \
+        data is not None and isinstance(lexer, lex.Lexer)
+
+
+class _Replay:
+    """A lexer returning the tokens of an iterator."""
+
+    def __init__(self, tokens):
+        self.token = itertools.chain(tokens, itertools.repeat(None)).__next__
+
+
+def _span(first, after):
+    """
+    Return the span of a definition, given its first token and the
+    token following it (None at <EOF>).
+    """
+    if after is None:
+        return ((first.lineno, first.lexpos), None)
+    return ((first.lineno, first.lexpos), (after.lineno, after.lexpos))
 
 
 def parse(data, start='program', logger=None):
@@ -647,3 +1120,94 @@ def quiet_parse(data, start='program'):
     Explicitly silence errors/warnings.
     """
     return parse(data, start=start, logger=error.LoggerMock())
+
+
+def _split_definitions(buf, piece_size):
+    """
+    Return the token indices cutting 'buf' into pieces of at least
+    'piece_size' tokens (except possibly the last), each starting at a
+    top-level definition.
+    """
+    kinds = buf.kinds
+    cuts = [0]
+    index = piece_size
+    while index < len(kinds):
+        if kinds[index] in _def_start_codes and \
+                kinds[index - 1] in _def_end_codes:
+            cuts.append(index)
+            index += piece_size
+        else:
+            index += 1
+    cuts.append(len(kinds))
+    return cuts
+
+
+def _parse_piece(buf, engine):
+    """
+    Parse a piece of a program, given as a TokenBuffer. Return its
+    definitions (None on error) and the record of the events logged.
+    """
+    logger = error.RecordingLogger()
+    parser = Parser(logger=logger, engine=engine)
+    tree = parser.parse(buf)
+    if not logger.success:
+        return None, logger
+    return tree.list, logger
+
+
+def parse_parallel(data, logger=None, workers=None, engine='ply',
+                   piece_size=_PIECE_SIZE):
+    """
+    Parse the given string in pieces of top-level definitions, across a
+    pool of 'workers' processes. Return the AST, exactly as sequential
+    parsing would, and log the same events to 'logger' (if one is
+    provided).
+
+    The input is lexed up front and cut before 'let' and 'type' tokens
+    that cannot be part of the preceding definition. If lexing or any
+    piece fails, the whole input is parsed again sequentially, so that
+    errors and their recovery are reported as usual.
+    """
+    if logger is None:
+        logger = error.Logger()
+
+    recorder = error.RecordingLogger()
+    buf = lex.tokenize_to_buffer(data, logger=recorder)
+    if recorder.success:
+        cuts = _split_definitions(buf, piece_size)
+        pieces = [
+            buf.slice(start, stop) for start, stop in zip(cuts, cuts[1:])
+        ]
+        if len(pieces) > 1:
+            # NOTE: Unpickling the trees allocates many objects at once,
+            # each allocation burst triggering a collection of the whole
+            # heap; no cycles are created, so collecting is pointless.
+            enabled = gc.isenabled()
+            gc.disable()
+            try:
+                with futures.ProcessPoolExecutor(max_workers=workers) as pool:
+                    results = list(pool.map(
+                        _parse_piece,
+                        pieces,
+                        itertools.repeat(engine)
+                    ))
+            except RecursionError:
+                # A tree too deep to be pickled.
+                results = [(None, None)]
+            finally:
+                if enabled:
+                    gc.enable()
+        else:
+            results = [_parse_piece(buf, engine)]
+
+        if all(events is not None and events.success
+               for _, events in results):
+            recorder.replay(logger)
+            definitions = []
+            for piece_definitions, events in results:
+                definitions.extend(piece_definitions)
+                events.replay(logger)
+            return ast.Program(definitions)
+
+    parser = Parser(logger=logger, engine=engine)
+    return parser.parse(data)
@@ -0,0 +1,641 @@
+"""
+# ----------------------------------------------------------------------
+# pratt.py
+#
+# Hand-written parser for the Llama language
+#
+# Expressions and types are parsed by precedence climbing (Pratt
+# parsing), using the precedence and associativity table of the LR
+# grammar; the rest of the grammar, which nests into expressions through
+# let-in and match, is parsed by recursive descent. The trees, including
+# node positions, are those the LR parser builds. The parser does not
+# recover from errors: it stops at the first one, so that the caller can
+# re-parse with the LR parser, which reports and recovers from it. It
+# also gives up on input nested too deeply for the recursion limit.
+# ----------------------------------------------------------------------
+"""
+
+import itertools
+import sys
+
+from compiler import ast
+
+# Tokens of the binary operators of expressions.
+_BINARY_OPERATORS = frozenset((
+    'PLUS', 'MINUS', 'TIMES', 'DIVIDE',
+    'FPLUS', 'FMINUS', 'FTIMES', 'FDIVIDE', 'MOD', 'FPOW',
+    'EQ', 'NEQ', 'NATEQ', 'NATNEQ', 'LT', 'LE', 'GT', 'GE',
+    'BOR', 'BAND', 'SEMICOLON', 'ASSIGN'
+))
+
+# Tokens of the sign operators, which are also binary operators.
+_SIGN_OPERATORS = frozenset(('PLUS', 'MINUS', 'FPLUS', 'FMINUS'))
+
+# Tokens which may start a simple expression.
+_SIMPLE_EXPR_FIRST = frozenset((
+    'GENID', 'LPAREN', 'BANG', 'NEW', 'TRUE', 'FALSE',
+    'CCONST', 'CONID', 'FCONST', 'ICONST', 'SCONST'
+))
+
+# Tokens which may start a simple pattern.
+_SIMPLE_PATTERN_FIRST = frozenset((
+    'LPAREN', 'TRUE', 'FALSE', 'CCONST', 'CONID', 'FCONST', 'ICONST',
+    'GENID', 'FMINUS', 'FPLUS', 'MINUS', 'PLUS'
+))
+
+# Tokens of the builtin types.
+_BUILTIN_TYPES = frozenset(('BOOL', 'CHAR', 'FLOAT', 'INT', 'UNIT'))
+
+# Tokens which may start a type.
+_TYPE_FIRST = _BUILTIN_TYPES | {'LPAREN', 'ARRAY', 'GENID'}
+
+# Most stack frames taken by one level of nesting, and frames left for
+# the lexer and the caller when giving up on deeply nested input.
+_FRAMES_PER_LEVEL = 8
+_SPARE_FRAMES = 100
+
+# Types of the constant tokens of simple expressions and patterns.
+_CONSTANT_TYPES = {
+    'TRUE': ast.builtin_types['bool'],
+    'FALSE': ast.builtin_types['bool'],
+    'CCONST': ast.builtin_types['char'],
+    'FCONST': ast.builtin_types['float'],
+    'ICONST': ast.builtin_types['int'],
+    'SCONST': ast.String()
+}
+
+
+class ParseError(Exception):
+    """Raised on the first syntax error. Carries the offending token."""
+
+    def __init__(self, token):
+        super().__init__(token)
+        self.token = token
+
+
+class NestingError(ParseError):
+    """
+    Raised on input nested too deeply to be parsed without exceeding
+    the recursion limit. Carries the token reached.
+    """
+
+    pass
+
+
+class _End:
+    """The end of input, as a token."""
+
+    type = '$end'
+    value = None
+    lineno = 0
+    lexpos = 0
+
+
+_END = _End()
+
+
+def _max_depth():
+    """Return how many levels of nesting fit on the current stack."""
+    frames = 0
+    frame = sys._getframe()
+    while frame is not None:
+        frames += 1
+        frame = frame.f_back
+    spare = sys.getrecursionlimit() - frames - _SPARE_FRAMES
+    return max(spare // _FRAMES_PER_LEVEL, 0)
+
+
+def _at(node, tok):
+    """Place 'node' at the position of token 'tok' and return it."""
+    node.lineno = tok.lineno
+    node.lexpos = tok.lexpos
+    return node
+
+
+class PrattParser:
+    """
+    A parser for the Llama language, with the operator precedence
+    given as a PLY precedence table.
+    """
+
+    # Nonterminals which can be used as start symbols.
+    starts = (
+        'program', 'def_list', 'letdef', 'typedef', 'def', 'expr',
+        'simple_expr', 'type', 'pattern', 'clause'
+    )
+
+    def __init__(self, precedence):
+        """
+        Create a parser. 'precedence' lists (associativity, *tokens)
+        tuples, from lowest to highest precedence.
+        """
+        levels = {}
+        assoc = {0: 'left'}
+        for level, (associativity, *names) in enumerate(precedence, 1):
+            assoc[level] = associativity
+            for name in names:
+                levels[name] = level
+
+        # Binding power of each binary operator and of each precedence
+        # level, when it is the one being parsed at.
+        self._binary = {
+            name: levels[name] for name in _BINARY_OPERATORS
+        }
+        self._assoc = assoc
+        self._sign = levels['SIGN']
+        self._in = levels['IN']
+        self._then = levels['THEN']
+        self._else = levels['ELSE']
+        self._arrow = levels['ARROW']
+        self._of = levels['OF']
+        self._ref = levels['REF']
+
+        self._next_token = None
+        self.tok = _END
+        self.replay = iter(())
+        self._depth = 0
+        self._max_depth = 0
+
+    # == TOKEN STREAM ==
+
+    def parse(self, get_token, start='program'):
+        """
+        Parse the tokens returned by 'get_token' (None at <EOF>) as
+        a 'start' and return its AST. Raise ParseError on a syntax
+        error, or NestingError on too deeply nested input; 'replay'
+        then iterates over all the tokens again, from the first one.
+        """
+        # NOTE: The tee keeps the tokens read, until 'replay' is
+        # advanced or dropped.
+        tokens, self.replay = itertools.tee(iter(get_token, None))
+        self._next_token = itertools.chain(
+            tokens,
+            itertools.repeat(_END)
+        ).__next__
+        self.tok = self._next_token()
+        self._depth = 0
+        self._max_depth = _max_depth()
+        node = getattr(self, '_parse_' + start)()
+        if self.tok is not _END:
+            raise ParseError(self.tok)
+        self.replay = iter(())
+        return node
+
+    def iter_def_list(self, get_token):
+        """
+        Parse the tokens returned by 'get_token' (None at <EOF>) as a
+        def_list and yield each letdef or typedef as soon as it is
+        parsed, along with its first token and the token following it
+        (None at <EOF>). Raise ParseError on a syntax error, or
+        NestingError on a too deeply nested definition; 'replay' then
+        iterates over the tokens from the first one of the definition
+        being parsed.
+        """
+        source = iter(get_token, None)
+        tok = next(source, _END)
+        while tok is not _END:
+            # NOTE: Each definition gets its own tee, so that only the
+            # tokens of the definition being parsed are kept.
+            tokens, rest = itertools.tee(source)
+            self.replay = itertools.chain((tok,), rest)
+            self._next_token = itertools.chain(
+                tokens,
+                itertools.repeat(_END)
+            ).__next__
+            self.tok = tok
+            self._depth = 0
+            self._max_depth = _max_depth()
+            if tok.type == 'LET':
+                node = self._parse_letdef()
+            elif tok.type == 'TYPE':
+                node = self._parse_typedef()
+            else:
+                raise ParseError(tok)
+            after = self.tok
+            yield node, tok, (None if after is _END else after)
+            tok = after
+        self.replay = iter(())
+
+    def _advance(self):
+        """Move to the next token and return the previous one."""
+        tok = self.tok
+        self.tok = self._next_token()
+        return tok
+
+    def _expect(self, type_):
+        """Consume a token of type 'type_' and return it."""
+        tok = self.tok
+        if tok.type != type_:
+            raise ParseError(tok)
+        self._advance()
+        return tok
+
+    # == DEFINITIONS ==
+
+    def _parse_program(self):
+        return ast.Program(self._parse_def_list())
+
+    def _parse_def_list(self):
+        defs = []
+        while True:
+            type_ = self.tok.type
+            if type_ == 'LET':
+                defs.append(self._parse_letdef())
+            elif type_ == 'TYPE':
+                defs.append(self._parse_typedef())
+            else:
+                return defs
+
+    def _parse_letdef(self):
+        let = self._expect('LET')
+        if self.tok.type == 'REC':
+            self._advance()
+            return _at(ast.LetDef(self._parse_def_seq(), isRec=True), let)
+        return _at(ast.LetDef(self._parse_def_seq()), let)
+
+    def _parse_def_seq(self):
+        defs = [self._parse_def()]
+        while self.tok.type == 'AND':
+            self._advance()
+            defs.append(self._parse_def())
+        return defs
+
+    def _parse_def(self):
+        if self.tok.type == 'MUTABLE':
+            return self._parse_var_def()
+        name = self._expect('GENID')
+        params = []
+        while self.tok.type in ('GENID', 'LPAREN'):
+            params.append(self._parse_param())
+
+        type_ = None
+        if self.tok.type == 'COLON':
+            self._advance()
+            type_ = self._parse_type()
+        self._expect('EQ')
+        body = self._parse_expr()
+        if not params:
+            if type_ is None:
+                return _at(ast.ConstantDef(name.value, body), name)
+            return _at(ast.ConstantDef(name.value, body, type_), name)
+        if type_ is None:
+            return _at(ast.FunctionDef(name.value, params, body), name)
+        return _at(ast.FunctionDef(name.value, params, body, type_), name)
+
+    def _parse_param(self):
+        tok = self._advance()
+        if tok.type == 'GENID':
+            return _at(ast.Param(tok.value), tok)
+        name = self._expect('GENID')
+        self._expect('COLON')
+        type_ = self._parse_type()
+        self._expect('RPAREN')
+        return _at(ast.Param(name.value, type_), tok)
+
+    def _parse_var_def(self):
+        mutable = self._expect('MUTABLE')
+        name = self._expect('GENID').value
+        if self.tok.type == 'LBRACKET':
+            self._advance()
+            dims = self._parse_expr_comma_seq()
+            self._expect('RBRACKET')
+            if self.tok.type != 'COLON':
+                return _at(ast.ArrayVariableDef(name, dims), mutable)
+            self._advance()
+            arr_type = ast.Array(self._parse_type(), len(dims))
+            return _at(ast.ArrayVariableDef(name, dims, arr_type), mutable)
+
+        if self.tok.type != 'COLON':
+            return _at(ast.VariableDef(name), mutable)
+        self._advance()
+        type_ = self._parse_type()
+        vartype = ast.Ref(type_)
+        vartype.copy_pos(type_)
+        return _at(ast.VariableDef(name, vartype), mutable)
+
+    def _parse_typedef(self):
+        self._expect('TYPE')
+        tdefs = [self._parse_tdef()]
+        while self.tok.type == 'AND':
+            self._advance()
+            tdefs.append(self._parse_tdef())
+        return tdefs
+
+    def _parse_tdef(self):
+        tok = self._advance()
+        if tok.type == 'GENID':
+            type_ = _at(ast.User(tok.value), tok)
+        elif tok.type in _BUILTIN_TYPES:
+            type_ = _at(ast.builtin_types_map[tok.value](), tok)
+        else:
+            raise ParseError(tok)
+        self._expect('EQ')
+        constrs = [self._parse_constr()]
+        while self.tok.type == 'PIPE':
+            self._advance()
+            constrs.append(self._parse_constr())
+        tdef = ast.TDef(type_, constrs)
+        tdef.copy_pos(type_)
+        return tdef
+
+    def _parse_constr(self):
+        name = self._expect('CONID')
+        if self.tok.type != 'OF':
+            return _at(ast.Constructor(name.value), name)
+        self._advance()
+        types = [self._parse_type()]
+        while self.tok.type in _TYPE_FIRST:
+            types.append(self._parse_type())
+        return _at(ast.Constructor(name.value, types), name)
+
+    # == TYPES ==
+
+    def _parse_type(self, rbp=0):
+        """Parse a type, binding operators of precedence above 'rbp'."""
+        self._depth += 1
+        if self._depth > self._max_depth:
+            raise NestingError(self.tok)
+        tok = self._advance()
+        type_ = tok.type
+        if type_ in _BUILTIN_TYPES:
+            left = _at(ast.builtin_types_map[tok.value](), tok)
+        elif type_ == 'GENID':
+            left = _at(ast.User(tok.value), tok)
+        elif type_ == 'LPAREN':
+            left = _at(self._parse_type(), tok)
+            self._expect('RPAREN')
+        elif type_ == 'ARRAY':
+            if self.tok.type == 'LBRACKET':
+                self._advance()
+                dims = 1
+                self._expect('TIMES')
+                while self.tok.type == 'COMMA':
+                    self._advance()
+                    self._expect('TIMES')
+                    dims += 1
+                self._expect('RBRACKET')
+                self._expect('OF')
+                left = _at(ast.Array(self._parse_type(self._of), dims), tok)
+            else:
+                self._expect('OF')
+                left = _at(ast.Array(self._parse_type(self._of)), tok)
+        else:
+            raise ParseError(tok)
+
+        # NOTE: '->' is right-associative and binds looser than 'ref',
+        # which binds tighter than the element type of 'array of'.
+        while True:
+            type_ = self.tok.type
+            if type_ == 'REF' and self._ref > rbp:
+                self._advance()
+                node = ast.Ref(left)
+            elif type_ == 'ARROW' and self._arrow >= rbp:
+                self._advance()
+                node = ast.Function(left, self._parse_type(self._arrow))
+            else:
+                self._depth -= 1
+                return left
+            node.copy_pos(left)
+            left = node
+
+    # == EXPRESSIONS ==
+
+    def _parse_expr(self, rbp=0):
+        """
+        Parse an expression, binding operators of precedence above
+        'rbp', or equal to it if right-associative.
+        """
+        # NOTE: Every way to nest constructs goes through this method,
+        # _parse_type or the counted calls below, so that the depth of
+        # nesting bounds the depth of recursion.
+        self._depth += 1
+        if self._depth > self._max_depth:
+            raise NestingError(self.tok)
+        left = self._parse_prefix()
+        binary = self._binary
+        while True:
+            tok = self.tok
+            level = binary.get(tok.type)
+            if level is None or level < rbp:
+                self._depth -= 1
+                return left
+            if level == rbp:
+                assoc = self._assoc[level]
+                if assoc == 'left':
+                    self._depth -= 1
+                    return left
+                if assoc == 'nonassoc':
+                    raise ParseError(tok)
+            self.tok = self._next_token()
+            node = ast.BinaryExpression(
+                left,
+                tok.value,
+                self._parse_expr(level)
+            )
+            node.lineno = left.lineno
+            node.lexpos = left.lexpos
+            left = node
+
+    def _parse_prefix(self):
+        """Parse an expression up to its first binary operator."""
+        tok = self.tok
+        type_ = tok.type
+        if type_ in _CONSTANT_TYPES:
+            self.tok = self._next_token()
+            return _at(
+                ast.ConstExpression(tok.value, _CONSTANT_TYPES[type_]),
+                tok
+            )
+        if type_ == 'GENID':
+            self.tok = self._next_token()
+            if self.tok.type in _SIMPLE_EXPR_FIRST:
+                args = self._parse_simple_expr_seq()
+                return _at(ast.FunctionCallExpression(tok.value, args), tok)
+            if self.tok.type == 'LBRACKET':
+                return self._parse_array_expr(tok)
+            return _at(ast.GenidExpression(tok.value), tok)
+        if type_ == 'CONID':
+            self._advance()
+            if self.tok.type in _SIMPLE_EXPR_FIRST:
+                args = self._parse_simple_expr_seq()
+                return _at(
+                    ast.ConstructorCallExpression(tok.value, args),
+                    tok
+                )
+            return _at(ast.ConidExpression(tok.value), tok)
+        if type_ in _SIMPLE_EXPR_FIRST:
+            return self._parse_simple_expr()
+        if type_ == 'LET':
+            letdef = self._parse_letdef()
+            self._expect('IN')
+            node = ast.LetInExpression(letdef, self._parse_expr(self._in))
+            node.copy_pos(letdef)
+            return node
+
+        self._advance()
+        if type_ in _SIGN_OPERATORS or type_ == 'NOT':
+            operand = self._parse_expr(self._sign)
+            return _at(ast.UnaryExpression(tok.value, operand), tok)
+        if type_ == 'IF':
+            cond = self._parse_expr()
+            self._expect('THEN')
+            then = self._parse_expr(self._then)
+            if self.tok.type != 'ELSE':
+                return _at(ast.IfExpression(cond, then), tok)
+            self._advance()
+            other = self._parse_expr(self._else)
+            return _at(ast.IfExpression(cond, then, other), tok)
+        if type_ == 'MATCH':
+            expr = self._parse_expr()
+            self._expect('WITH')
+            clauses = [self._parse_clause()]
+            while self.tok.type == 'PIPE':
+                self._advance()
+                clauses.append(self._parse_clause())
+            self._expect('END')
+            return _at(ast.MatchExpression(expr, clauses), tok)
+        if type_ == 'BEGIN':
+            expr = _at(self._parse_expr(), tok)
+            self._expect('END')
+            return expr
+        if type_ == 'WHILE':
+            cond = self._parse_expr()
+            self._expect('DO')
+            body = self._parse_expr()
+            self._expect('DONE')
+            return _at(ast.WhileExpression(cond, body), tok)
+        if type_ == 'FOR':
+            counter = self._expect('GENID').value
+            self._expect('EQ')
+            start = self._parse_expr()
+            is_down = self.tok.type == 'DOWNTO'
+            if not is_down:
+                self._expect('TO')
+            else:
+                self._advance()
+            stop = self._parse_expr()
+            self._expect('DO')
+            body = self._parse_expr()
+            self._expect('DONE')
+            if is_down:
+                return _at(
+                    ast.ForExpression(counter, start, stop, body, isDown=True),
+                    tok
+                )
+            return _at(ast.ForExpression(counter, start, stop, body), tok)
+        if type_ == 'DELETE':
+            operand = self._parse_expr(self._sign)
+            return _at(ast.DeleteExpression(operand), tok)
+        if type_ == 'DIM':
+            if self.tok.type == 'ICONST':
+                dim = self._advance().value
+                name = self._expect('GENID').value
+                return _at(ast.DimExpression(name, dim), tok)
+            name = self._expect('GENID').value
+            return _at(ast.DimExpression(name), tok)
+        raise ParseError(tok)
+
+    def _parse_simple_expr_seq(self):
+        args = [self._parse_simple_expr()]
+        while self.tok.type in _SIMPLE_EXPR_FIRST:
+            args.append(self._parse_simple_expr())
+        return args
+
+    def _parse_simple_expr(self):
+        tok = self.tok
+        self.tok = self._next_token()
+        type_ = tok.type
+        if type_ == 'GENID':
+            if self.tok.type == 'LBRACKET':
+                return self._parse_array_expr(tok)
+            return _at(ast.GenidExpression(tok.value), tok)
+        if type_ in _CONSTANT_TYPES:
+            node = ast.ConstExpression(tok.value, _CONSTANT_TYPES[type_])
+            return _at(node, tok)
+        if type_ == 'LPAREN':
+            if self.tok.type == 'RPAREN':
+                self._advance()
+                unit = ast.ConstExpression(None, ast.builtin_types['unit'])
+                return _at(unit, tok)
+            expr = _at(self._parse_expr(), tok)
+            self._expect('RPAREN')
+            return expr
+        if type_ == 'CONID':
+            return _at(ast.ConidExpression(tok.value), tok)
+        if type_ == 'BANG':
+            self._depth += 1
+            if self._depth > self._max_depth:
+                raise NestingError(self.tok)
+            operand = self._parse_simple_expr()
+            self._depth -= 1
+            return _at(ast.UnaryExpression(tok.value, operand), tok)
+        if type_ == 'NEW':
+            return _at(ast.NewExpression(self._parse_type()), tok)
+        raise ParseError(tok)
+
+    def _parse_array_expr(self, name):
+        """Parse the indices of array 'name', at its LBRACKET."""
+        self._advance()
+        indices = self._parse_expr_comma_seq()
+        self._expect('RBRACKET')
+        return _at(ast.ArrayExpression(name.value, indices), name)
+
+    def _parse_expr_comma_seq(self):
+        exprs = [self._parse_expr()]
+        while self.tok.type == 'COMMA':
+            self._advance()
+            exprs.append(self._parse_expr())
+        return exprs
+
+    # == PATTERNS ==
+
+    def _parse_clause(self):
+        pattern = self._parse_pattern()
+        self._expect('ARROW')
+        clause = ast.Clause(pattern, self._parse_expr())
+        clause.copy_pos(pattern)
+        return clause
+
+    def _parse_pattern(self):
+        tok = self.tok
+        if tok.type != 'CONID':
+            return self._parse_simple_pattern()
+        self._advance()
+        if self.tok.type not in _SIMPLE_PATTERN_FIRST:
+            return _at(ast.Pattern(tok.value), tok)
+        args = [self._parse_simple_pattern()]
+        while self.tok.type in _SIMPLE_PATTERN_FIRST:
+            args.append(self._parse_simple_pattern())
+        return _at(ast.Pattern(tok.value, args), tok)
+
+    def _parse_simple_pattern(self):
+        tok = self._advance()
+        type_ = tok.type
+        if type_ == 'GENID':
+            return _at(ast.GenidPattern(tok.value), tok)
+        if type_ in _CONSTANT_TYPES and type_ != 'SCONST':
+            node = ast.ConstExpression(tok.value, _CONSTANT_TYPES[type_])
+            return _at(node, tok)
+        if type_ == 'CONID':
+            return _at(ast.Pattern(tok.value), tok)
+        if type_ == 'LPAREN':
+            self._depth += 1
+            if self._depth > self._max_depth:
+                raise NestingError(self.tok)
+            pattern = _at(self._parse_pattern(), tok)
+            self._depth -= 1
+            self._expect('RPAREN')
+            return pattern
+        if type_ in ('MINUS', 'PLUS'):
+            value = self._expect('ICONST').value
+            if type_ == 'MINUS':
+                value = -value
+            node = ast.ConstExpression(value, ast.builtin_types['int'])
+            return _at(node, tok)
+        if type_ in ('FMINUS', 'FPLUS'):
+            value = self._expect('FCONST').value
+            if type_ == 'FMINUS':
+                value = -value
+            node = ast.ConstExpression(value, ast.builtin_types['float'])
+            return _at(node, tok)
+        raise ParseError(tok)
@@ -24,8 +24,10 @@ class Analyzer:
         else:
             self.logger = logger
 
+        # Analysis of each node on entry. Each analysis returns the
+        # children to analyze next (None for none).
         self._dispatcher = {
-            ast.Program: self.analyze,
+            ast.Program: self.analyze_program,
             ast.LetDef: self.analyze_letdef,
             ast.ConstantDef: self.analyze_constant_def,
             ast.FunctionDef: self.analyze_function_def,
@@ -60,6 +62,12 @@ class Analyzer:
             # well as type declarations.
         }
 
+        # Analysis of some nodes on exit, after their children.
+        self._leave_dispatcher = {
+            ast.LetDef: self.leave_letdef,
+            ast.FunctionDef: self.leave_function_def
+        }
+
         self._unop_dispatcher = {
             "!": self.analyze_bang_expression,
 
@@ -73,7 +81,17 @@ class Analyzer:
         }
 
     def _dispatch(self, node):
-        self._dispatcher[type(node)](node)
+        # NOTE: Walk the tree with an explicit stack, as it may be far
+        # deeper than the recursion limit.
+        ast.walk(node, self._enter, self._leave)
+
+    def _enter(self, node):
+        return self._dispatcher[type(node)](node)
+
+    def _leave(self, node):
+        handler = self._leave_dispatcher.get(type(node))
+        if handler is not None:
+            handler(node)
 
     def _insert_symbol(self, sym):
         try:
@@ -86,8 +104,14 @@ class Analyzer:
             self._insert_symbol(sym)
 
     def analyze(self, program):
-        for definition in program:
-            self._dispatch(definition)
+        if isinstance(program, ast.Program):
+            self._dispatch(program)
+        else:
+            for definition in program:
+                self._dispatch(definition)
+
+    def analyze_program(self, program):
+        return program.list
 
     def analyze_letdef(self, letdef):
         scope = self.symbol_table.open_scope()
@@ -96,12 +120,11 @@ class Analyzer:
             self._insert_symbols(letdef)
         else:
             scope.visible = False
+        return letdef.list
 
-        for definition in letdef:
-            self._dispatch(definition)
-
+    def leave_letdef(self, letdef):
         if not letdef.isRec:
-            scope.visible = True
+            self.symbol_table.cur_scope.visible = True
             self._insert_symbols(letdef)
 
     def analyze_typedef(self, typedef):
@@ -117,11 +140,9 @@ class Analyzer:
         scope = self.symbol_table.open_scope()
         assert scope.visible, "New scope is invisible."
         self._insert_symbols(definition.params)
+        return definition.params + [definition.body]
 
-        for param in definition.params:
-            self._dispatch(param)
-
-        self._dispatch(definition.body)
+    def leave_function_def(self, definition):
         self.symbol_table.close_scope()
 
     def analyze_variable_def(self, definition):
@@ -135,7 +156,7 @@ class Analyzer:
 
     def analyze_unary_expression(self, expression):
         self._unop_dispatcher[expression.operator](expression)
-        self._dispatch(expression.operand)
+        return (expression.operand,)
 
     def analyze_bang_expression(self, expression):
         pass
@@ -94,6 +94,8 @@ class Table:
 
     # Each hashtable entry is a list containing symbols with
     # the same identifier, appearing at increasing scope depth.
+    # Identifiers are interned by the lexer (see lex.NameTable), so keys
+    # are mostly compared by identity.
     _hash_table = defaultdict(list)
 
     def __init__(self):
@@ -99,9 +99,8 @@ class Table:
         # Keys  : names of types
         # Values: (definition node, constructors list)
         self._known_types = dict()
-        for typecon in ast.builtin_types_map.values():
-            type_instance = typecon()
-            self._known_types[type_instance.name] = (type_instance, [])
+        for name, type_instance in ast.builtin_types.items():
+            self._known_types[name] = (type_instance, [])
 
         # Dictionary of constructors encountered so far.
         # Keys : Name of constructor
@@ -127,7 +126,7 @@ class Table:
         basetype = t.type
         if is_array(basetype):
             raise ArrayOfArrayError(t)
-        self.validate(basetype)
+        return (basetype,)
 
     def _validate_builtin(self, _):
         """A builtin type is always valid."""
@@ -141,27 +140,33 @@ class Table:
         t1, t2 = t.fromType, t.toType
         if is_array(t2):
             raise ArrayReturnError(t)
-        self.validate(t1)
-        self.validate(t2)
+        return (t1, t2)
 
     def _validate_ref(self, t):
         """A 'ref T' type is valid iff T is a valid, non-array type."""
         basetype = t.type
         if is_array(basetype):
             raise RefOfArrayError(t)
-        self.validate(basetype)
+        return (basetype,)
 
     def _validate_user(self, t):
         """A user-defined type is valid, unless referencing an unknown type."""
         if t.name not in self._known_types:
             raise UndefTypeError(t)
 
+    def _validate_node(self, t):
+        """
+        Check a type node, but not the types it is made of. Return
+        those, to be validated next.
+        """
+        return self._dispatcher[type(t)](t)
+
     def validate(self, t):
         """
         Verify that a type is a valid type, i.e. ensures type structure
         and semantics follow language spec.
         """
-        return self._dispatcher[type(t)](t)
+        ast.walk(t, self._validate_node)
 
     def _insert_new_type(self, new_type):
         """
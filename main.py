@@ -70,6 +70,16 @@ def mk_cli_parser():
         default=False
     )
 
+    cli_parser.add_argument(
+        "-lme",
+        "--lexer_max_errors",
+        help="""\
+            Abort lexing after this many errors (default: 100).\
+            """,
+        type=int,
+        default=100
+    )
+
     cli_parser.add_argument(
         "-pv",
         "--parser_verbose",
@@ -93,27 +103,24 @@ def mk_cli_parser():
     return cli_parser
 
 
-def read_program(input_file):
+def open_program(input_file):
     """
-    Read input from file or stdin (if a file is not provided).
+    Open input file or stdin (if a file is not provided).
 
-    Return read program as a single string.
+    Return the program as a file object, to be read lazily.
     """
     if input_file == "<stdin>":
         sys.stdout.write("Reading from stdin (type <EOF> to end):\n")
         sys.stdout.flush()
-        data = sys.stdin.read()
-    else:
-        try:
-            file = open(input_file)
-            data = file.read()
-            file.close()
-        except IOError:
-            sys.exit(
-                "Could not open file %s for reading. Aborting."
-                % input_file
-            )
-    return data
+        return sys.stdin
+
+    try:
+        return open(input_file)
+    except IOError:
+        sys.exit(
+            "Could not open file %s for reading. Aborting."
+            % input_file
+        )
 
 
 def main():
@@ -126,12 +133,14 @@ def main():
     OPTS["output"] = args.output
     OPTS["prepare"] = args.prepare
     OPTS["lexer_verbose"] = args.lexer_verbose
+    OPTS["lexer_max_errors"] = args.lexer_max_errors
     OPTS["parser_verbose"] = args.parser_verbose
     OPTS["parser_debug"] = args.parser_debug
 
     lexer = lex.Lexer(
         logger=error.Logger(inputfile=OPTS["input"], level=logging.DEBUG),
-        verbose=OPTS["lexer_verbose"]
+        verbose=OPTS["lexer_verbose"],
+        max_errors=OPTS["lexer_max_errors"]
     )
 
     parser = parse.Parser(
@@ -145,11 +154,14 @@ def main():
         print("Finished generating lexer and parser tables. Exiting...")
         return
 
-    # Get some input.
-    data = read_program(OPTS["input"])
+    # Get some input; it is lexed in chunks as parsing proceeds.
+    program = open_program(OPTS["input"])
+    lexer.input_stream(program)
 
     # Lex, parse and construct the AST.
-    ast = parser.parse(data=data, lexer=lexer)
+    ast = parser.parse(data=None, lexer=lexer)
+    if program is not sys.stdin:
+        program.close()
 
     # On lexing/parsing error, abort further compilation.
     if not (lexer.logger.success and parser.logger.success):
@@ -0,0 +1,17 @@
+"""Helpers shared by the test modules."""
+
+from compiler import ast
+
+
+def positions(tree):
+    """
+    Return the positions of all nodes of 'tree' (a node, a list of them
+    or None), in preorder.
+    """
+    if tree is None:
+        return []
+    return [
+        (type(node).__name__, node.lineno, node.lexpos)
+        for node in ast.iter_preorder(tree)
+        if isinstance(node, ast.Node)
+    ]
@@ -0,0 +1,148 @@
+import array
+import marshal
+import os
+import unittest
+
+from compiler import arena, ast, error, parse
+from tests import helpers
+
+# pylint: disable=no-member
+
+
+class TestArena(unittest.TestCase):
+    """Test the flat encoding of trees."""
+
+    SOURCE = "\n".join((
+        "let rec f x (y : int) = if x then y else -y",
+        "type t = A | B of int ref | C of array [*, *] of t",
+        "let g = for i = 10 downto 1 do dim 2 a done; new int",
+        "let mutable a [3, 4] : float",
+        "let h = match B 1 with A -> 'c' | B z -> \"s\" end",
+        "let k = let l = 1.5 in !l; ()"
+    ))
+
+    def setUp(self):
+        self.tree = parse.quiet_parse(self.SOURCE)
+
+    def test_round_trip(self):
+        flat = arena.Arena.from_tree(self.tree)
+        tree = flat.to_tree()
+        tree.should.equal(self.tree)
+        helpers.positions(tree).should.equal(helpers.positions(self.tree))
+        flat.end(0).should.equal(len(flat))
+
+        copy = arena.Arena.from_bytes(flat.to_bytes())
+        copy.to_tree().should.equal(self.tree)
+        helpers.positions(copy.to_tree()).should.equal(
+            helpers.positions(self.tree)
+        )
+
+    def test_correct_programs(self):
+        path = os.path.join(os.path.dirname(__file__), "correct")
+        for name in sorted(os.listdir(path)):
+            with open(os.path.join(path, name)) as source:
+                tree = parse.Parser(logger=error.LoggerMock()).parse(
+                    source.read()
+                )
+            flat = arena.Arena.from_bytes(
+                arena.Arena.from_tree(tree).to_bytes()
+            )
+            flat.to_tree().should.equal(tree)
+
+    def test_rows(self):
+        flat = arena.Arena.from_tree(self.tree)
+        kinds = [
+            arena.node_kinds[kind] for kind in flat.kinds
+            if kind not in (arena.NONE_KIND, arena.LIST_KIND)
+        ]
+        sorted(kind.__name__ for kind in kinds).should.equal(sorted(
+            type(node).__name__ for node in ast.iter_preorder(self.tree)
+        ))
+
+        # Subtrees are contiguous and can be decoded on their own.
+        for row in range(len(flat)):
+            end = flat.end(row)
+            end.should.be.greater_than(row)
+            for child in flat.children(row):
+                child.should.be.greater_than(row)
+                flat.end(child).should.be.lower_than_or_equal_to(end)
+        letdef = self.tree.list[0]
+        row = next(flat.children(next(flat.children(0))))
+        flat.to_tree(row).should.equal(letdef)
+
+        # Many trees can share an arena.
+        row = flat.add(letdef)
+        flat.to_tree(row).should.equal(letdef)
+        flat.to_tree(0).should.equal(self.tree)
+
+    def test_view(self):
+        flat = arena.Arena.from_tree(self.tree)
+        program = flat.node()
+        program.kind.should.be(ast.Program)
+        letdef = program.list[0]
+        letdef.isRec.should.be.true
+        func = next(iter(letdef))
+        func.name.should.equal("f")
+        func.lineno.should.equal(1)
+        func.type.should.be.none
+        func.params[1].type.kind.should.be(ast.Int)
+        func.body.elseExpr.operator.should.equal("-")
+        func.body.elseExpr.to_node().should.equal(
+            self.tree.list[0].list[0].body.elseExpr
+        )
+
+        loop = program.list[2].list[0].body.leftOperand
+        loop.counter.should.equal("i")
+        loop.isDown.should.be.true
+        loop.body.dimension.should.equal(2)
+        program.list[4].list[0].body.list[1].expr.value.should.equal(b"s")
+        getattr.when.called_with(func, "operator").should.throw(
+            AttributeError
+        )
+
+    def test_deep(self):
+        node = ast.GenidExpression("x")
+        for _ in range(5000):
+            node = ast.UnaryExpression("!", node)
+        flat = arena.Arena.from_tree(node)
+        len(flat).should.equal(5001)
+        (flat.to_tree() == node).should.be.true
+
+    def test_large_dimension(self):
+        tree = parse.quiet_parse("let f a = dim 3000000000 a")
+        flat = arena.Arena.from_bytes(arena.Arena.from_tree(tree).to_bytes())
+        flat.to_tree().should.equal(tree)
+
+    def test_kind_names(self):
+        flat = arena.Arena.from_tree(self.tree)
+        data = flat.to_bytes()
+        start = arena._HEADER.size
+        end = start + sum(
+            len(flat) * array.array(typecode).itemsize
+            for _, typecode in arena.Arena._columns
+        )
+        kind_names, names, operators, constants = marshal.loads(data[end:])
+
+        # A buffer written when the node types came in another order.
+        last = len(kind_names) - 1
+        kinds = bytes(last - kind for kind in data[start:start + len(flat)])
+        old = b"".join((
+            data[:start],
+            kinds,
+            data[start + len(flat):end],
+            marshal.dumps((kind_names[::-1], names, operators, constants))
+        ))
+        arena.Arena.from_bytes(old).to_tree().should.equal(self.tree)
+
+        kind_names[-1] = "Removed"
+        unknown = data[:end] + marshal.dumps(
+            (kind_names, names, operators, constants)
+        )
+        arena.Arena.from_bytes.when.called_with(unknown).should.throw(
+            ValueError
+        )
+
+    def test_bad_buffer(self):
+        arena.Arena.from_bytes.when.called_with(
+            b"LLAM" + bytes(20)
+        ).should.throw(ValueError)
@@ -1,5 +1,10 @@
+import gc
 import itertools
+import pickle
+import sys
+import threading
 import unittest
+import weakref
 
 from compiler import ast, parse
 
@@ -85,3 +90,262 @@ class TestAST(unittest.TestCase):
         i2float.shouldnt.equal(ast.User("foo"))
         i2float.shouldnt.equal(ast.Ref(ast.Int()))
         i2float.shouldnt.equal(ast.Array(ast.Int()))
+
+    def test_slots(self):
+        tree = parse.quiet_parse("let f x = x + 1\ntype t = T of int ref")
+        for node in ast.iter_preorder(tree):
+            node.shouldnt.have.property("__dict__")
+        func = tree.list[0].list[0]
+        list(ast.iter_fields(func)).should.equal([
+            ("name", "f"),
+            ("params", func.params),
+            ("body", func.body),
+            ("type", None)
+        ])
+        ast.ArrayVariableDef._fields.should.equal(
+            ("name", "type", "dimensions")
+        )
+        setattr.when.called_with(func, "extra", 1).should.throw(
+            AttributeError
+        )
+        getattr.when.called_with(func, "extra").should.throw(AttributeError)
+
+    def test_unset_position(self):
+        node = ast.GenidExpression("x")
+        node.lineno.should.be.none
+        node.lexpos.should.be.none
+        ast.Int().copy_pos(node)
+        pickle.loads(pickle.dumps(node)).should.equal(node)
+
+    def test_intern_type(self):
+        for name, typecon in ast.builtin_types_map.items():
+            canon = ast.intern_type(typecon())
+            canon.should.be(ast.builtin_types[name])
+            canon.lineno.should.be.none
+        ast.String().should.be(ast.intern_type(ast.Array(ast.Char())))
+
+        func = ast.Function(ast.Ref(ast.User("foo")), ast.Array(ast.Int(), 2))
+        func.lineno = 1
+        canon = ast.intern_type(func)
+        canon.shouldnt.be(func)
+        canon.lineno.should.be.none
+        canon.fromType.should.be(ast.intern_type(ast.Ref(ast.User("foo"))))
+        ast.intern_type(canon).should.be(canon)
+        ast.intern_type(
+            ast.Function(ast.Ref(ast.User("foo")), ast.Array(ast.Int(), 2))
+        ).should.be(canon)
+        ast.intern_type(
+            ast.Function(ast.Ref(ast.User("foo")), ast.Array(ast.Int(), 1))
+        ).shouldnt.be(canon)
+
+    def test_type_hash(self):
+        types = [
+            ast.Ref(ast.Int()),
+            ast.Array(ast.Ref(ast.Int()), 3),
+            ast.Function(ast.Int(), ast.Function(ast.Bool(), ast.Unit()))
+        ]
+        for typ in types:
+            copy = pickle.loads(pickle.dumps(typ))
+            copy.should.equal(typ)
+            hash(copy).should.equal(hash(typ))
+        canons = [ast.intern_type(typ) for typ in types]
+        len(set(types + canons)).should.equal(3)
+
+        canon = pickle.loads(pickle.dumps(ast.intern_type(types[1])))
+        canon.should.be(ast.intern_type(types[1]))
+        canon.should.equal(types[1])
+        canon.shouldnt.equal(canons[0])
+        canon.shouldnt.equal(ast.Array(ast.Ref(ast.Int()), 2))
+
+    def test_intern_deep_type(self):
+        # Deeper than the recursion limit, and interned in linear time.
+        typ = ast.Int()
+        for depth in range(5000):
+            if depth % 2:
+                typ = ast.Ref(typ)
+            else:
+                typ = ast.Function(ast.Bool(), typ)
+        canon = ast.intern_type(typ)
+        hash(canon).should.equal(ast.structural_hash(typ))
+        hash(canon.type).should.equal(ast.structural_hash(typ.type))
+        (canon == typ).should.be.true
+
+    def test_intern_table(self):
+        # Canonical nodes only live as long as they are in use.
+        canon = ast.intern_type(ast.Ref(ast.User("unused")))
+        ref = weakref.ref(canon)
+        del canon
+        gc.collect()
+        ref().should.be.none
+        ast.intern_type(ast.Ref(ast.User("unused"))).should.equal(
+            ast.Ref(ast.User("unused"))
+        )
+
+
+class TestTraversal(unittest.TestCase):
+    """Test the non-recursive traversal of trees."""
+
+    # Deeper than the recursion limit.
+    DEPTH = 5000
+
+    def setUp(self):
+        self.tree = parse.quiet_parse(
+            "let f x = (x + 1) * 2\ntype t = T of int ref"
+        )
+
+    def _deep_tree(self):
+        node = ast.GenidExpression("x")
+        for _ in range(self.DEPTH):
+            node = ast.UnaryExpression("!", node)
+        return node
+
+    def test_children(self):
+        letdef, typedef = self.tree.list
+        ast.children(self.tree).should.equal(
+            [letdef] + typedef
+        )
+        func = letdef.list[0]
+        ast.children(func).should.equal(func.params + [func.body])
+        ast.children([[func], [[func.body]]]).should.equal(
+            [func, func.body]
+        )
+        ast.children(ast.Int()).should.equal([])
+
+    def test_orders(self):
+        nodes = list(ast.iter_preorder(self.tree))
+        nodes[0].should.be(self.tree)
+        nodes[1].should.be(self.tree.list[0])
+        post = list(ast.iter_postorder(self.tree))
+        post[-1].should.be(self.tree)
+        len(post).should.equal(len(nodes))
+        for node in nodes:
+            for child in ast.children(node):
+                post.index(child).should.be.lower_than(post.index(node))
+
+    def test_walk(self):
+        events = []
+
+        def enter(node):
+            events.append(('enter', type(node).__name__))
+            if isinstance(node, ast.BinaryExpression):
+                return [node.leftOperand]
+            return ast.children(node)
+
+        def leave(node):
+            events.append(('leave', type(node).__name__))
+
+        expr = parse.quiet_parse("(a + b) * c", "expr")
+        ast.walk(expr, enter, leave)
+        events.should.equal([
+            ('enter', 'BinaryExpression'),
+            ('enter', 'BinaryExpression'),
+            ('enter', 'GenidExpression'),
+            ('leave', 'GenidExpression'),
+            ('leave', 'BinaryExpression'),
+            ('leave', 'BinaryExpression')
+        ])
+
+    def test_deep(self):
+        tree1, tree2 = self._deep_tree(), self._deep_tree()
+        (tree1 == tree2).should.be.true
+        tree2.operand.operand = ast.GenidExpression("y")
+        (tree1 == tree2).should.be.false
+        len(list(ast.iter_preorder(tree1))).should.equal(self.DEPTH + 1)
+        len(list(ast.iter_postorder(tree1))).should.equal(self.DEPTH + 1)
+
+    def test_deep_repr(self):
+        # NOTE: Each level used to take two frames; the text grows with
+        # the square of the depth, so do not go much deeper.
+        node = ast.GenidExpression("x")
+        for _ in range(sys.getrecursionlimit() // 2 + 100):
+            node = ast.UnaryExpression("!", node)
+        ("* name = 'x'" in repr(node)).should.be.true
+
+    def test_repr(self):
+        text = repr(parse.quiet_parse("f (g x) \"s\"", "expr"))
+        text.should.contain("ASTNode:FunctionCallExpression")
+        text.should.contain("\t\t\t* name = 'x'")
+
+
+class TestStructuralHash(unittest.TestCase):
+    """Test structural hashing and the search for identical subtrees."""
+
+    def test_hash(self):
+        tree1 = parse.quiet_parse("let f x = x + 1\ntype t = T of int")
+        tree2 = parse.quiet_parse("let f x =\n  x + 1 type t = T of int")
+        tree3 = parse.quiet_parse("let f x = x + 2\ntype t = T of int")
+        hash(tree1).should.equal(hash(tree2))
+        hash(tree1).shouldnt.equal(hash(tree3))
+        ast.structural_hash(tree1).should.equal(hash(tree1))
+        tree1.should.equal(tree2)
+        tree1.shouldnt.equal(tree3)
+
+        node = ast.GenidExpression("x")
+        for _ in range(5000):
+            node = ast.UnaryExpression("!", node)
+        ast.structural_hash(node).should.be.an(int)
+
+    def test_mutate(self):
+        tree1 = parse.quiet_parse("let x = 1 + 2")
+        tree2 = parse.quiet_parse("let x = 1 + 3")
+        hash(tree1).shouldnt.equal(hash(tree2))
+        tree2.list[0].list[0].body.rightOperand.value = 2
+        (tree1 == tree2).should.be.true
+        hash(tree1).should.equal(hash(tree2))
+
+        # Hashes cached in a block are forgotten at its end.
+        tree2.list[0].list[0].body.rightOperand.value = 3
+        with ast.cached_hashes():
+            hash(tree1).shouldnt.equal(hash(tree2))
+            with ast.cached_hashes():
+                (tree1 == tree2).should.be.false
+        tree2.list[0].list[0].body.rightOperand.value = 2
+        (tree1 == tree2).should.be.true
+        hash(tree1).should.equal(hash(tree2))
+
+    def test_cached_hashes(self):
+        tree = parse.quiet_parse("let x = 1 + 2")
+        with ast.cached_hashes():
+            value = hash(tree)
+            # A block trusts its hashes until its end.
+            tree.list[0].list[0].body.rightOperand.value = 3
+            hash(tree).should.equal(value)
+        hash(tree).shouldnt.equal(value)
+
+    def test_cached_hashes_threads(self):
+        tree = parse.quiet_parse("let x = 1 + 2")
+        hashes = []
+        with ast.cached_hashes():
+            value = hash(tree)
+            tree.list[0].list[0].body.rightOperand.value = 3
+            # Other threads do not see the cache of this one.
+            thread = threading.Thread(target=lambda: hashes.append(
+                hash(tree)
+            ))
+            thread.start()
+            thread.join()
+            hash(tree).should.equal(value)
+        hashes.should.equal([hash(tree)])
+        hashes[0].shouldnt.equal(value)
+
+    def test_pickle(self):
+        tree = parse.quiet_parse("let x = 1 + 2")
+        copy = pickle.loads(pickle.dumps(tree))
+        copy.should.equal(tree)
+        copy.list[0].list[0].body.lineno.should.equal(1)
+
+    def test_identical_subtrees(self):
+        tree = parse.quiet_parse("let f x = (x + 1) * (x + 1) - f 2")
+        body = tree.list[0].list[0].body
+        groups = ast.identical_subtrees(tree)
+        product = body.leftOperand
+        groups[0].should.equal([product.leftOperand, product.rightOperand])
+        groups[0][0].shouldnt.be(groups[0][1])
+        groups[1].should.equal([
+            product.leftOperand.leftOperand,
+            product.rightOperand.leftOperand
+        ])
+        for group in groups:
+            len(group).should.be.greater_than(1)
+            for node in group[1:]:
+                node.should.equal(group[0])
@@ -57,3 +57,41 @@ class TestLogger(TestLoggerMock):
     @classmethod
     def setUpClass(cls):
         cls.logger_class = error.Logger
+
+
+class TestRecordingLogger(TestLoggerMock):
+    """Test the API of the RecordingLogger class."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.logger_class = error.RecordingLogger
+
+    def test_replay(self):
+        self.logger.warning("This is warning message No %d", 42)
+        self.logger.error("This is error message No %d", 42)
+        target = error.LoggerMock()
+        self.logger.replay(target)
+        self.assertEqual(target.warnings, 1)
+        self.assertEqual(target.errors, 1)
+        self.logger.clear()
+        self.assertEqual(self.logger.records, [])
+
+
+class TestCappedLogger(TestLoggerMock):
+    """Test the API of the CappedLogger class."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.logger_class = error.CappedLogger
+
+    @classmethod
+    def _make_logger(cls):
+        return cls.logger_class(error.LoggerMock(), 2)
+
+    def test_cap(self):
+        self.logger.warning("This is warning message No %d", 42)
+        self.logger.error("This is error message No %d", 42)
+        with self.assertRaises(error.TooManyErrorsError):
+            self.logger.error("This is error message No %d", 43)
+        self.assertEqual(self.logger.logger.warnings, 1)
+        self.assertEqual(self.logger.logger.errors, 2)
@@ -0,0 +1,134 @@
+import os
+import unittest
+
+from compiler import ast, error, incremental, lex, parse
+from tests import helpers
+
+# pylint: disable=no-member
+
+
+class TestIncrementalParser(unittest.TestCase):
+    """Test incremental reparsing against full parses."""
+
+    SOURCE = (
+        "let f x =\n"
+        "  x + 1\n"
+        "type t = A | B of int\n"
+        "let g y = f y * 2  let h = 3\n"
+        "\n"
+        "let main = g (h + 1)\n"
+    )
+
+    def _check(self, parser, data):
+        """
+        Reparse 'data' and assert that the result, its positions, its
+        log and the blocks agree with a full parse.
+        """
+        logger = error.RecordingLogger()
+        parser.logger = logger
+        tree = parser.reparse(data)
+        expected_logger = error.RecordingLogger()
+        expected = parse.Parser(logger=expected_logger).parse(data)
+        tree.should.equal(expected)
+        helpers.positions(tree).should.equal(helpers.positions(expected))
+        logger.records.should.equal(expected_logger.records)
+        if not logger.success:
+            return
+
+        tokens = lex.tokenize_to_buffer(data)
+        parser.blocks[0].start.should.equal(0)
+        parser.blocks[-1].end.should.equal(len(data))
+        parser.blocks[-1].last.should.equal(len(tokens))
+        for block, after in zip(parser.blocks, parser.blocks[1:]):
+            block.end.should.equal(after.start)
+            block.last.should.equal(after.first)
+            tokens.linenos[after.first].should.equal(after.lineno)
+            tokens.lexposes[after.first].should.equal(after.column)
+            line_start = data.rfind('\n', 0, after.start) + 1
+            data.count('\n', 0, after.start).should.equal(after.lineno - 1)
+            (after.start - line_start + 1).should.equal(after.column)
+
+    def _edits(self, source, edits):
+        parser = incremental.IncrementalParser(logger=error.LoggerMock())
+        parser.parse(source)
+        for old, new in edits:
+            source = source.replace(old, new, 1)
+            self._check(parser, source)
+        return parser
+
+    def test_parse(self):
+        parser = incremental.IncrementalParser()
+        parser.parse(self.SOURCE).should.equal(parse.Parser().parse(
+            self.SOURCE
+        ))
+        len(parser.blocks).should.equal(5)
+
+    def test_reuse(self):
+        parser = incremental.IncrementalParser()
+        parser.parse(self.SOURCE)
+        nodes = [block.node for block in parser.blocks]
+        parser.reparse(self.SOURCE.replace("x + 1", "x + 10"))
+        parser.blocks[0].node.should_not.be(nodes[0])
+        for block, node in zip(parser.blocks[1:], nodes[1:]):
+            block.node.should.be(node)
+
+    def test_edits(self):
+        self._edits(self.SOURCE, (
+            ("x + 1", "x + 42"),
+            ("x + 42", "x +\n\n 42"),
+            ("let h = 3", "let h = 3\nlet k = 4"),
+            ("B of int", "B of int\n  | C"),
+            ("  let h", "let h"),
+            ("\n\n", "\n"),
+            ("let f", "let  f"),
+            ("let main = g (h + 1)\n", ""),
+            ("type t = A | B of int\n  | C\n", ""),
+            ("", "let z = 0\n")
+        ))
+
+    def test_update(self):
+        parser = incremental.IncrementalParser()
+        parser.parse(self.SOURCE)
+        source = self.SOURCE
+        for old, new in (
+                ("x + 1", "x +\n 1"),
+                ("type t", "\ntype t"),
+                ("let h", "\nlet h")):
+            source = source.replace(old, new, 1)
+            parser.update(source)
+        parser.blocks[-1].shift.should.equal(3)
+        tree = parser.program()
+        expected = parse.Parser().parse(source)
+        tree.should.equal(expected)
+        helpers.positions(tree).should.equal(helpers.positions(expected))
+        parser.blocks[-1].shift.should.equal(0)
+
+    def test_merge_and_split(self):
+        self._edits(self.SOURCE, (
+            ("= 3", "= 3 +"),
+            ("3 +\n", "3 +\n1 "),
+            ("let g y", "let g y = 0 let gg y"),
+            ("let gg y = f y * 2", "")
+        ))
+
+    def test_errors(self):
+        parser = self._edits(self.SOURCE, (
+            ("x + 1", "x + "),
+            ("x + ", "x + 1"),
+            ("type t", "type type t"),
+            ("(h + 1)", "(h + 1"),
+            ("type type t", "type t"),
+            ("(h + 1", "(h + 1)")
+        ))
+        parser.reparse("$").should.equal(ast.Program([]))
+
+    def test_correct_programs(self):
+        path = os.path.join(os.path.dirname(__file__), "correct")
+        for name in sorted(os.listdir(path)):
+            with open(os.path.join(path, name)) as stream:
+                data = stream.read()
+            middle = len(data) // 2
+            self._edits(data, (
+                (data[middle:middle + 1], data[middle:middle + 1] + "\n"),
+                ("let", "let x = 0\nlet")
+            ))
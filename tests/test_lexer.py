@@ -1,4 +1,9 @@
+import io
+import mmap
+import os
+import random
 import string
+import tempfile
 import unittest
 
 from compiler import error, lex
@@ -92,13 +97,80 @@ class TestLexerAPI(unittest.TestCase):
         tokens3.should.equal([])
         l2.logger.success.should.be.true
 
+    @staticmethod
+    def test_reuse():
+        lexer = lex.Lexer(logger=error.LoggerMock())
+        list(lexer.tokenize("(* unclosed\n\n"))
+        inner = lexer._lexer  # pylint: disable=protected-access
 
-class TestLexerRules(unittest.TestCase):
-    """Test the Lexer's coverage of Llama vocabulary."""
+        tokens = list(lexer.tokenize("foo\n  bar"))
+        lexer._lexer.should.be(inner)  # pylint: disable=protected-access
+        [(t.type, t.lineno, t.lexpos) for t in tokens].should.equal(
+            [("GENID", 1, 1), ("GENID", 2, 3)]
+        )
+        lexer.lineno.should.equal(2)
+
+    @staticmethod
+    def test_reuse_tables():
+        for engine in ("ply", "dfa"):
+            lexer = lex.Lexer(logger=error.LoggerMock(), engine=engine)
+            for i in range(3):
+                list(lexer.tokenize("let x%d = y\n" % i))
+            len(lexer.names).should.equal(2)
+
+            names = lex.NameTable()
+            lexer = lex.Lexer(
+                logger=error.LoggerMock(),
+                engine=engine,
+                names=names
+            )
+            for i in range(3):
+                list(lexer.tokenize("let x%d = y\n" % i))
+            lexer.names.should.be(names)
+            len(names).should.equal(4)
+
+    @staticmethod
+    def test_reuse_constants():
+        for engine in ("ply", "dfa"):
+            lexer = lex.Lexer(logger=error.LoggerMock(), engine=engine)
+            for i in range(3):
+                list(lexer.tokenize('"s%d" "t"\n' % i))
+            len(lexer.constants).should.equal(2)
+
+            constants = lex.ConstantPool()
+            lexer = lex.Lexer(
+                logger=error.LoggerMock(),
+                engine=engine,
+                constants=constants
+            )
+            for i in range(3):
+                list(lexer.tokenize('"s%d" "t"\n' % i))
+            lexer.constants.should.be(constants)
+            len(constants).should.equal(4)
 
     @staticmethod
-    def _lex_data(text):
+    def test_clone():
         lexer = lex.Lexer(logger=error.LoggerMock())
+        lexer.clone().should.be.a(lex.Lexer)
+        list(lexer.tokenize("let x = (* open"))
+
+        twin = lexer.clone()
+        twin.logger.should.be(lexer.logger)
+        tokens1 = list(twin.tokenize("let y\n= 1"))
+        tokens2 = list(lexer.tokenize("let y\n= 1"))
+        [(t.type, t.value, t.lineno, t.lexpos) for t in tokens1].should.equal(
+            [(t.type, t.value, t.lineno, t.lexpos) for t in tokens2]
+        )
+
+
+class TestLexerRules(unittest.TestCase):
+    """Test the Lexer's coverage of Llama vocabulary."""
+
+    engine = "ply"
+
+    @classmethod
+    def _lex_data(cls, text):
+        lexer = lex.Lexer(logger=error.LoggerMock(), engine=cls.engine)
         tokens = list(lexer.tokenize(text))
         return tokens, lexer.logger
 
@@ -213,7 +285,7 @@ class TestLexerRules(unittest.TestCase):
             self._assert_individual_token(
                 '"%s"' % (escaped),
                 "SCONST",
-                [literal, '\0']
+                literal.encode()
             )
 
         testcases = (
@@ -231,7 +303,7 @@ class TestLexerRules(unittest.TestCase):
             self._assert_individual_token(
                 '"%s"' % (text),
                 "SCONST",
-                lex.explode(text)
+                lex.encode_string(text)
             )
 
         self._assert_lex_failure('"')
@@ -266,3 +338,329 @@ class TestLexerRules(unittest.TestCase):
         not_operators = r'\#$%&.?@^_`~'
         for symbol in not_operators:
             self._assert_lex_failure(symbol)
+
+
+class TestDFALexerRules(TestLexerRules):
+    """Test the DFA engine's coverage of Llama vocabulary."""
+
+    engine = "dfa"
+
+
+class TestEngineEquivalence(unittest.TestCase):
+    """Test that all lexing engines agree on tokens and diagnostics."""
+
+    @staticmethod
+    def _run(engine, text):
+        logger = error.RecordingLogger()
+        lexer = lex.Lexer(logger=logger, engine=engine)
+        tokens = [
+            (t.type, t.value, t.lineno, t.lexpos)
+            for t in lexer.tokenize(text)
+        ]
+        return tokens, logger.records, lexer.lineno, lexer.lexpos
+
+    def _assert_same(self, text):
+        self._run("dfa", text).should.equal(self._run("ply", text))
+
+    def test_unknown_engine(self):
+        lex.Lexer.when.called_with(engine="nfa").should.throw(ValueError)
+
+    def test_programs(self):
+        path = os.path.join(os.path.dirname(__file__), "correct")
+        for name in sorted(os.listdir(path)):
+            with open(os.path.join(path, name)) as program:
+                self._assert_same(program.read())
+
+    def test_corner_cases(self):
+        testcases = (
+            "let x=1--c\n(*a(*b*)c*)*)+.-.*.**->",
+            "a<=b<>c>=d==e!=f:=g||h&&i|j!k & ~",
+            "42.5.2 4.2e1.0 1e5 42. 00042 0.420e+2",
+            "'a' '\\n' '\\x61' '' 'ab' '\\xbad'\n'\n' 'x",
+            '"ok\\t" "bad\\q" x "\n" "open',
+            "(*\n\n(* nested *)\n",
+            "\t \r \n\n  @ \u00e9 foo",
+        )
+        for text in testcases:
+            self._assert_same(text)
+
+
+class TestStreaming(unittest.TestCase):
+    """Test lexing of file objects and mmaps in chunks."""
+
+    source = (
+        "let x = 1 (* a comment\nspanning (* nested *)\n lines *) + 2\n"
+        "let s = \"hello\" -- trailing\n"
+        "let t = \"bad\\q\nstill bad\" 'c' '\\x61' @\n"
+        "let long_name_for_a_chunk = 42.5e3 <= 3\n\n\n(* open"
+    )
+
+    @staticmethod
+    def _digest(lexer, tokens):
+        return (
+            [(t.type, t.value, t.lineno, t.lexpos) for t in tokens],
+            lexer.logger.records
+        )
+
+    def _expected(self, engine):
+        lexer = lex.Lexer(logger=error.RecordingLogger(), engine=engine)
+        return self._digest(lexer, list(lexer.tokenize(self.source)))
+
+    def _streamed(self, engine, stream, chunk_size):
+        lexer = lex.Lexer(logger=error.RecordingLogger(), engine=engine)
+        tokens = list(lexer.tokenize_stream(stream, chunk_size=chunk_size))
+        return self._digest(lexer, tokens)
+
+    def test_text_stream(self):
+        for engine in ("ply", "dfa"):
+            expected = self._expected(engine)
+            for chunk_size in (1, 2, 7, 64, 4096):
+                stream = io.StringIO(self.source)
+                self._streamed(engine, stream, chunk_size).should.equal(
+                    expected
+                )
+
+    def test_binary_stream(self):
+        source = "let \u00e9 = 1 (* \u00e9\u00e9 *)\n"
+        for engine in ("ply", "dfa"):
+            lexer = lex.Lexer(logger=error.RecordingLogger(), engine=engine)
+            expected = self._digest(lexer, list(lexer.tokenize(source)))
+            for chunk_size in (1, 3, 64):
+                stream = io.BytesIO(source.encode('utf-8'))
+                self._streamed(engine, stream, chunk_size).should.equal(
+                    expected
+                )
+
+    def test_mmap(self):
+        with tempfile.TemporaryFile() as file:
+            file.write(self.source.encode('ascii'))
+            file.flush()
+            with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mem:
+                self._streamed("dfa", mem, 16).should.equal(
+                    self._expected("dfa")
+                )
+
+    def test_reuse_after_stream(self):
+        lexer = lex.Lexer(logger=error.RecordingLogger(), engine="dfa")
+        list(lexer.tokenize_stream(io.StringIO("a\nb\n"), chunk_size=1))
+        tokens = list(lexer.tokenize("c"))
+        [(t.value, t.lineno) for t in tokens].should.equal([("c", 1)])
+
+
+class TestTokenBuffer(unittest.TestCase):
+    """Test bulk lexing into a TokenBuffer."""
+
+    source = TestStreaming.source
+
+    @staticmethod
+    def _digest(toks):
+        return [(t.type, t.value, t.lineno, t.lexpos) for t in toks]
+
+    def test_matches_token_stream(self):
+        expected = self._digest(lex.quiet_tokenize(self.source))
+        for engine in ("ply", "dfa"):
+            lexer = lex.Lexer(logger=error.LoggerMock(), engine=engine)
+            buf = lexer.tokenize_to_buffer(self.source)
+            len(buf).should.equal(len(expected))
+            self._digest(buf).should.equal(expected)
+            self._digest(iter(buf.reader().token, None)).should.equal(
+                expected
+            )
+
+    def test_pieces(self):
+        sources = ("let x = 1", "y \"s\" true", "", "z 2.5 x")
+        expected = lex.tokenize_to_buffer(" ".join(sources))
+        values = [expected.value(i) for i in range(len(expected))]
+        buf = lex.TokenBuffer()
+        for source in sources:
+            buf.extend(lex.tokenize_to_buffer(source))
+        whole = lex.TokenBuffer()
+        whole.extend(buf)
+        for merged in (buf, whole):
+            [merged.value(i) for i in range(len(merged))].should.equal(
+                values
+            )
+            list(merged.kinds).should.equal(list(expected.kinds))
+            for start, stop in ((0, len(merged)), (2, 8), (4, 4)):
+                part = merged.slice(start, stop)
+                [part.value(i) for i in range(len(part))].should.equal(
+                    values[start:stop]
+                )
+
+    def test_start_position(self):
+        source = self.source + "$"
+        padded = "\n" * 2 + " " * 4 + source
+        for engine in ("ply", "dfa"):
+            logger = error.RecordingLogger()
+            lexer = lex.Lexer(logger=logger, engine=engine)
+            buf = lexer.tokenize_to_buffer(source, lineno=3, column=5)
+            expected_logger = error.RecordingLogger()
+            lexer = lex.Lexer(logger=expected_logger, engine=engine)
+            expected = lexer.tokenize_to_buffer(padded)
+            self._digest(buf).should.equal(self._digest(expected))
+            logger.records.should.equal(expected_logger.records)
+
+    def test_random_access(self):
+        buf = lex.tokenize_to_buffer("let x = true + 42", error.LoggerMock())
+        list(buf.kinds).should.equal([
+            lex.token_codes[t]
+            for t in ("LET", "GENID", "EQ", "TRUE", "PLUS", "ICONST")
+        ])
+        [buf.value(i) for i in range(len(buf))].should.equal(
+            ["let", "x", "=", True, "+", 42]
+        )
+        buf.values.should.equal(["x", 42])
+
+
+class TestIncrementalLexer(unittest.TestCase):
+    """Test re-lexing of edited sources from checkpoints."""
+
+    @staticmethod
+    def _digest(toks):
+        return [(t.type, t.value, t.lineno, t.lexpos) for t in toks]
+
+    def _assert_consistent(self, inc):
+        expected = self._digest(lex.quiet_tokenize(inc.data))
+        self._digest(inc.tokens).should.equal(expected)
+
+    def test_one_line_edit_is_local(self):
+        lines = ["let x%d = %d" % (i, i) for i in range(1000)]
+        inc = lex.IncrementalLexer("\n".join(lines), error.LoggerMock(), 4)
+        start = inc.data.index("x500 = 500") + len("x500 = ")
+        first, stop, tokens = inc.edit(start, start + 3, "5 + 5")
+        (stop - first).should.be.lower_than(40)
+        len(tokens).should.equal(stop - first + 2)
+        self._assert_consistent(inc)
+
+    def test_comment_state_changes(self):
+        source = "let a = 1\n" * 50
+        inc = lex.IncrementalLexer(source, error.LoggerMock(), 2)
+        inc.edit(20, 20, "(*\n")
+        self._assert_consistent(inc)
+        len(inc.tokens).should.equal(8)
+        inc.edit(20, 23, "")
+        self._assert_consistent(inc)
+        len(inc.tokens).should.equal(200)
+
+    def test_tail_is_renumbered_lazily(self):
+        inc = lex.IncrementalLexer("let a = 1\n" * 100, error.LoggerMock(), 4)
+        last = inc.tokens[-1]
+        first, stop, _ = inc.edit(0, 0, "\n\n")
+        (stop - first).should.be.lower_than(20)
+        last.lineno.should.equal(100)
+        inc.tokens[-1].should.be(last)
+        last.lineno.should.equal(102)
+        self._assert_consistent(inc)
+
+    def test_random_edits(self):
+        path = os.path.join(os.path.dirname(__file__), "correct")
+        snippets = ("", "\n", "x", "(*", "*)", '"', "'", " -- ", "1.5e")
+        rng = random.Random(42)
+        for name in sorted(os.listdir(path)):
+            with open(os.path.join(path, name)) as program:
+                inc = lex.IncrementalLexer(
+                    program.read(),
+                    error.LoggerMock(),
+                    rng.choice((1, 3, 16))
+                )
+            for _ in range(20):
+                start = rng.randrange(len(inc.data) + 1)
+                end = min(len(inc.data), start + rng.randrange(8))
+                inc.edit(start, end, rng.choice(snippets))
+                self._assert_consistent(inc)
+
+
+class TestParallelLexing(unittest.TestCase):
+    """Test lexing of input pieces across processes."""
+
+    def test_matches_sequential(self):
+        source = TestStreaming.source + "\n" + "\n".join((
+            "let a = 1 (* spans",
+            "several *) let b = \"bad\\q",
+            "still\" let c = '' 'x",
+            "'",
+            "(* (* nested",
+            "*) still *) let d = @ 2",
+        )) * 5 + "\n(* unclosed\n at <EOF>\n"
+        sequential = error.RecordingLogger()
+        expected = TestTokenBuffer._digest(lex.tokenize(source, sequential))
+        for piece_size in (1, 10, 100, len(source)):
+            logger = error.RecordingLogger()
+            buf = lex.tokenize_parallel(
+                source,
+                logger,
+                workers=2,
+                piece_size=piece_size
+            )
+            TestTokenBuffer._digest(buf).should.equal(expected)
+            logger.records.should.equal(sequential.records)
+
+
+class TestNameTable(unittest.TestCase):
+    """Test interning of identifiers."""
+
+    def test_intern(self):
+        names = lex.NameTable()
+        first = names.intern("".join(["fo", "o"]))
+        names.intern("bar").should.equal("bar")
+        names.intern("".join(["f", "oo"])).should.be(first)
+        names.ident("foo").should.equal(0)
+        names.ident("bar").should.equal(1)
+        names.name(1).should.equal("bar")
+        len(names).should.equal(2)
+        ("foo" in names).should.be.true
+        ("baz" in names).should.be.false
+
+    def test_lexer_interns_names(self):
+        for engine in ("ply", "dfa"):
+            lexer = lex.Lexer(logger=error.LoggerMock(), engine=engine)
+            toks = list(lexer.tokenize("let foo = Foo foo true\n"))
+            toks[1].value.should.be(toks[4].value)
+            toks[5].value.should.be(True)
+            lexer.names.ident("foo").should.equal(0)
+            lexer.names.ident("Foo").should.equal(1)
+
+            again = list(lexer.clone().tokenize("foo\n"))
+            again[0].value.should.be(toks[1].value)
+
+    def test_lexer_pools_strings(self):
+        for engine in ("ply", "dfa"):
+            lexer = lex.Lexer(logger=error.LoggerMock(), engine=engine)
+            toks = list(lexer.tokenize('"a\\tb" "c" "a\\tb"\n'))
+            toks[0].value.should.equal(b"a\tb")
+            toks[2].value.should.be(toks[0].value)
+            len(lexer.constants).should.equal(2)
+
+
+class TestIllegalInput(unittest.TestCase):
+    """Test recovery from illegal characters."""
+
+    def test_runs(self):
+        for engine in ("ply", "dfa"):
+            logger = error.RecordingLogger()
+            lexer = lex.Lexer(logger=logger, engine=engine)
+            toks = list(lexer.tokenize("a \x01\x02\x7f b ?\n$"))
+            [tok.value for tok in toks].should.equal(["a", "b"])
+            [fmt % args for _, fmt, args in logger.records].should.equal([
+                "1:3-5: error: 3 illegal characters, starting with '\x01'.",
+                "1:9: error: Illegal character '?'.",
+                "2:1: error: Illegal character '$'."
+            ])
+
+    def test_max_errors(self):
+        source = "a $ b $\n$ c $ d\n"
+        for engine in ("ply", "dfa"):
+            logger = error.LoggerMock()
+            lexer = lex.Lexer(logger=logger, engine=engine, max_errors=3)
+            toks = list(lexer.tokenize(source))
+            [tok.value for tok in toks].should.equal(["a", "b"])
+            logger.errors.should.equal(4)
+
+            logger.clear()
+            buf = lexer.clone().tokenize_to_buffer(source)
+            len(buf).should.equal(2)
+            logger.errors.should.equal(4)
+
+            logger.clear()
+            list(lexer.tokenize("a $\n")).should.have.length_of(1)
+            logger.errors.should.equal(1)
@@ -0,0 +1,102 @@
+import os
+import tempfile
+import unittest
+
+from compiler import error, lrgen, lrtable, parse
+
+# pylint: disable=no-member
+
+
+class TestGeneratedParser(unittest.TestCase):
+    """Test the generated parser module against the PLY engine."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.automaton = parse.Parser(logger=error.LoggerMock()).parser
+        cls.digest = lrtable.fingerprint(parse.Parser, 'entry')
+        handle, cls.filename = tempfile.mkstemp(suffix='.py')
+        os.close(handle)
+        lrgen.generate(cls.automaton, cls.filename, cls.digest)
+
+    @classmethod
+    def tearDownClass(cls):
+        os.unlink(cls.filename)
+
+    @staticmethod
+    def _parse_both(data, start="program"):
+        """
+        Parse 'data' with both engines. Return the results and the
+        error counts of each.
+        """
+        results = []
+        for engine in ('ply', 'generated'):
+            mock = error.LoggerMock()
+            parser = parse.Parser(logger=mock, start=start, engine=engine)
+            results.append((parser.parse(data), mock.errors))
+        return results
+
+    def test_load(self):
+        module = lrgen.load(self.filename, self.digest)
+        module.should_not.be.none
+        module.LENGTHS.should.equal(
+            tuple(prod.len for prod in self.automaton.productions)
+        )
+        module.DEFAULTED.should.equal(self.automaton.defaulted_states)
+
+    def test_stale(self):
+        digest = lrtable.fingerprint(parse.Parser, 'program')
+        lrgen.load(self.filename, digest).should.be.none
+        lrgen.load(self.filename + '.missing', self.digest).should.be.none
+
+    def test_engine(self):
+        parse.Parser(engine="generated").engine.should.equal("generated")
+        parse.Parser(
+            engine="generated",
+            verbose=True,
+            logger=error.LoggerMock()
+        ).engine.should.equal("ply")
+        parse.Parser.when.called_with(engine="nosuch").should.throw(ValueError)
+
+    def test_correct_programs(self):
+        path = os.path.join(os.path.dirname(__file__), "correct")
+        for name in sorted(os.listdir(path)):
+            with open(os.path.join(path, name)) as stream:
+                data = stream.read()
+            (ply, ply_errors), (gen, gen_errors) = self._parse_both(data)
+            gen.should.equal(ply)
+            gen_errors.should.equal(ply_errors)
+
+    def test_positions(self):
+        data = "let f x =\n  x + 1\nlet main = f 2"
+        (ply, _), (gen, _) = self._parse_both(data)
+        for ply_def, gen_def in zip(ply.list, gen.list):
+            gen_def.lineno.should.equal(ply_def.lineno)
+            gen_def.lexpos.should.equal(ply_def.lexpos)
+            body, ply_body = gen_def.list[0].body, ply_def.list[0].body
+            body.lineno.should.equal(ply_body.lineno)
+            body.lexpos.should.equal(ply_body.lexpos)
+
+    def test_start_symbols(self):
+        for data, start in (
+            ("int -> bool", "type"),
+            ("1 + 2 * x", "expr"),
+            ("let x = 1 let y = 2", "def_list")
+        ):
+            (ply, _), (gen, _) = self._parse_both(data, start)
+            gen.should.equal(ply)
+
+    def test_error_recovery(self):
+        for data, start in (
+            ("let x = = 1\nlet y = 2", "program"),
+            ("let f x = (1 + ) in", "program"),
+            ("let", "program"),
+            ("1 +", "expr"),
+            ("type t = A of | B\nlet z = 1 +", "program")
+        ):
+            (ply, ply_errors), (gen, gen_errors) = self._parse_both(
+                data,
+                start
+            )
+            gen.should.equal(ply)
+            gen_errors.should.equal(ply_errors)
+            gen_errors.should.be.greater_than(0)
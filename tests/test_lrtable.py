@@ -0,0 +1,120 @@
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+from ply import yacc
+
+from compiler import error, lrtable, parse
+
+# pylint: disable=no-member
+
+
+class TestBinaryTables(unittest.TestCase):
+    """Test storing and loading of the parsing tables."""
+
+    @classmethod
+    def setUpClass(cls):
+        # NOTE: In debug mode, the tables are always generated by PLY.
+        cls.automaton = parse.Parser(
+            debug=True,
+            logger=error.LoggerMock()
+        ).parser
+        cls.digest = lrtable.fingerprint(parse.Parser, 'entry')
+        handle, cls.filename = tempfile.mkstemp(suffix='.bin')
+        os.close(handle)
+        lrtable.dump(cls.automaton, cls.filename, cls.digest)
+
+    @classmethod
+    def tearDownClass(cls):
+        os.unlink(cls.filename)
+
+    def test_roundtrip(self):
+        loaded = lrtable.load(self.filename, self.digest).parser()
+        for state in range(len(self.automaton.action)):
+            loaded.action[state].should.equal(self.automaton.action[state])
+            loaded.goto[state].should.equal(
+                self.automaton.goto.get(state, {})
+            )
+        loaded.defaulted_states.should.equal(
+            self.automaton.defaulted_states
+        )
+        [str(prod) for prod in loaded.productions].should.equal(
+            [str(prod) for prod in self.automaton.productions]
+        )
+
+    def test_stale(self):
+        digest = lrtable.fingerprint(parse.Parser, 'program')
+        digest.should_not.equal(self.digest)
+        lrtable.load(self.filename, digest).should.be.none
+
+    def test_malformed(self):
+        lrtable.load(self.filename + '.missing', self.digest).should.be.none
+        with open(self.filename, 'rb') as stream:
+            data = stream.read()
+        handle, filename = tempfile.mkstemp(suffix='.bin')
+        with os.fdopen(handle, 'wb') as out:
+            out.write(data[:100])
+        try:
+            lrtable.load(filename, self.digest).should.be.none
+        finally:
+            os.unlink(filename)
+
+
+class _OldGrammar:
+    """A grammar standing for an older version of the Llama grammar."""
+
+    tokens = ('LET',)
+
+    def p_program(self, p):
+        """program : LET"""
+
+    def p_error(self, p):
+        pass
+
+
+class TestStaleTableModule(unittest.TestCase):
+    """Test that a PLY table module left over is not stored as tables."""
+
+    def setUp(self):
+        self.expected = parse.quiet_parse("let x = 1")
+        self.root = tempfile.mkdtemp()
+        self.package = os.path.basename(self.root) + '_tables'
+        self.table_dir = os.path.join(self.root, self.package)
+        os.mkdir(self.table_dir)
+        yacc.yacc(
+            module=_OldGrammar(),
+            tabmodule='%s.parsetab' % self.package,
+            outputdir=self.table_dir,
+            debug=False
+        )
+        self.saved = (
+            parse._TABLE_DIR, parse._TABLE_FILE, dict(parse._automata)
+        )
+        parse._TABLE_DIR = self.package
+        parse._TABLE_FILE = os.path.join(self.table_dir, 'parsetab.bin')
+        parse._automata.clear()
+        sys.path.insert(0, self.root)
+
+    def tearDown(self):
+        sys.path.remove(self.root)
+        parse._TABLE_DIR, parse._TABLE_FILE, automata = self.saved
+        parse._automata.clear()
+        parse._automata.update(automata)
+        shutil.rmtree(self.root)
+
+    def _parse(self):
+        parser = parse.Parser(logger=error.LoggerMock())
+        return parser.parse("let x = 1")
+
+    def test_stale_module(self):
+        os.path.exists(
+            os.path.join(self.table_dir, 'parsetab.py')
+        ).should.be.true
+        self._parse().should.equal(self.expected)
+
+        # The stored tables are those of the current grammar.
+        os.path.exists(parse._TABLE_FILE).should.be.true
+        parse._automata.clear()
+        self._parse().should.equal(self.expected)
@@ -1,6 +1,7 @@
+import types
 import unittest
 
-from compiler import ast, error, lex, parse
+from compiler import ast, error, lex, parse, sem
 
 # pylint: disable=no-member
 
@@ -19,6 +20,11 @@ class TestModuleAPI(unittest.TestCase):
         p3 = parse.Parser(start="type")
         parse.parse("int", start="type").should.equal(p3.parse("int"))
 
+    def test_parse_token_buffer(self):
+        program = "let f x = x + 1 let main = print_string \"hi\"; f 2"
+        buf = lex.tokenize_to_buffer(program)
+        parse.Parser().parse(buf).should.equal(parse.parse(program))
+
     def test_quiet_parse(self):
         mock = error.LoggerMock()
         p1 = parse.Parser(logger=mock)
@@ -42,6 +48,207 @@ class TestParserAPI(unittest.TestCase):
         )
         p1.should.have.property("logger").being.equal(logger)
 
+    def test_shared_automaton(self):
+        mock1, mock2 = error.LoggerMock(), error.LoggerMock()
+        p1 = parse.Parser(logger=mock1, start="expr")
+        p2 = parse.Parser(logger=mock2, start="expr")
+        p1.parser.action.should.be(p2.parser.action)
+        p1.parser.should_not.be(p2.parser)
+
+        p2.parse("1 +")
+        mock1.success.should.be.true
+        mock2.success.should.be.false
+        p1.parse("1 + 2").should.equal(p2.parse("1 + 2"))
+
+    def test_start_symbols(self):
+        p1 = parse.Parser(logger=error.LoggerMock())
+        p2 = parse.Parser(logger=error.LoggerMock(), start="type")
+        p1.parser.action.should.be(p2.parser.action)
+        p1.parse("int", start="type").should.equal(p2.parse("int"))
+        p2.parse("let x = 1", start="program").should.equal(
+            p1.parse("let x = 1")
+        )
+        parse.Parser.when.called_with(start="nosuch").should.throw(ValueError)
+
+    def test_start_symbol_recovery(self):
+        # Recovery restarts from the start symbol, never from a program,
+        # as when each start symbol had an automaton of its own.
+        cases = (
+            ("simple_expr", "x end", None, "1:3: END"),
+            ("clause", "else := x A -> in ->", None, "1:1: ELSE"),
+            ("expr", "end ] 1 delete (", None, "1:1: END"),
+            ("pattern", ", - + 1 ;", None, "1:1: COMMA"),
+            (
+                "expr", "1 + ) 2",
+                ast.ConstExpression(2, ast.Int()), "1:5: RPAREN"
+            ),
+            ("type", "int ) bool", ast.Bool(), "1:5: RPAREN"),
+            ("def_list", "let x = 1 ; let y = 2", None, None),
+            ("empty", "x", None, "1:1: GENID")
+        )
+        for start, data, expected, message in cases:
+            for engine in parse.ENGINES:
+                logger = error.RecordingLogger()
+                parser = parse.Parser(
+                    logger=logger,
+                    start=start,
+                    engine=engine
+                )
+                tree = parser.parse(data)
+                if expected is None:
+                    tree.should.be.none
+                else:
+                    tree.should.equal(expected)
+                [
+                    "%d:%d: %s" % args[:3] if args else fmt
+                    for _, fmt, args in logger.records
+                ].should.equal(
+                    [message or "Syntax error in unknown token"]
+                )
+
+    def test_iter_definitions(self):
+        program = "let x = 1\n(* f *) let f y = y\ntype t = A | B\nlet z = f x"
+        parser = parse.Parser(logger=error.LoggerMock())
+        definitions = list(parser.iter_definitions(program))
+        [node for node, _ in definitions].should.equal(
+            parser.parse(program).list
+        )
+        [span for _, span in definitions].should.equal([
+            ((1, 1), (2, 9)),
+            ((2, 9), (3, 1)),
+            ((3, 1), (4, 1)),
+            ((4, 1), None)
+        ])
+
+        # Definitions are yielded before the rest of the input is read.
+        tokens = list(lex.tokenize(program))
+        stream = iter(tokens)
+        lexer = types.SimpleNamespace(token=lambda: next(stream, None))
+        first, _ = next(parser.iter_definitions(None, lexer))
+        first.should.equal(definitions[0][0])
+        len(list(stream)).should.be.greater_than(len(tokens) // 2)
+
+    @staticmethod
+    def test_iter_definitions_analyze():
+        program = "type iter_t = IterA\nlet iter_x = IterA\nlet iter_y = 1"
+        parser = parse.Parser(logger=error.LoggerMock())
+        nodes = parser.iter_definitions(program, spans=False)
+        nodes.should_not.be.a(list)
+        list(nodes).should.equal(parser.parse(program).list)
+
+        analyzer = sem.Analyzer(logger=error.LoggerMock())
+        analyzer.analyze(parser.iter_definitions(program, spans=False))
+        analyzer.logger.success.should.be.true
+
+    def test_iter_definitions_error(self):
+        program = "let x = 1\nlet y = = 2\nlet z = 3 +"
+        logger1, logger2 = error.RecordingLogger(), error.RecordingLogger()
+        definitions = list(
+            parse.Parser(logger=logger1).iter_definitions(program)
+        )
+        parse.Parser(logger=logger2).parse(program)
+        len(definitions).should.equal(1)
+        logger1.records.should.equal(logger2.records)
+
+    def test_track_positions(self):
+        program = "let f x =\n  x + 1\nlet main = f (2)"
+        for engine in ('ply', 'generated'):
+            parser = parse.Parser(engine=engine, track_positions=False)
+            tree = parser.parse(program)
+            tree.should.equal(parse.parse(program))
+            tree.list[0].lineno.should.be.none
+            tree.list[1].list[0].body.lineno.should.be.none
+
+        program = "let f (x : int) (y : int ref) = x + 1"
+        tree = parse.Parser(track_positions=False).parse(program)
+        func = tree.list[0].list[0]
+        func.params[0].type.should.be(ast.builtin_types['int'])
+        func.params[1].type.type.should.be(ast.builtin_types['int'])
+        func.body.rightOperand.type.should.be(ast.builtin_types['int'])
+
+    def test_track_positions_error(self):
+        for program, lexer in (
+            ("let x = 1\nlet y = = 2\nlet z = 3", None),
+            ("let x = 1\nlet y = $ 2", None),
+            ("let y = = 2\nlet z = 3", lex.Lexer(logger=error.LoggerMock()))
+        ):
+            for engine in parse.ENGINES:
+                logger1 = error.RecordingLogger()
+                logger2 = error.RecordingLogger()
+                tree = parse.Parser(
+                    logger=logger1,
+                    engine=engine,
+                    track_positions=False
+                ).parse(program, lexer and lexer.clone())
+                expected = parse.Parser(logger=logger2, engine=engine).parse(
+                    program,
+                    lexer and lexer.clone()
+                )
+                tree.should.equal(expected)
+                logger1.records.should.equal(logger2.records)
+                logger1.success.should.be.false
+                tree.list[-1].lineno.should_not.be.none
+
+    def test_track_positions_lexer(self):
+        program = "let x = 1 $\nlet y = = 2"
+        records = []
+        for track in (True, False):
+            lexer = lex.Lexer(logger=error.RecordingLogger())
+            logger = error.RecordingLogger()
+            parse.Parser(logger=logger, track_positions=track).parse(
+                program,
+                lexer
+            )
+            records.append((lexer.logger.records, logger.records))
+        records[1].should.equal(records[0])
+        len(records[0][0]).should.equal(1)
+
+        # A lexer fed beforehand is read once, with positions tracked.
+        lexer = lex.Lexer(logger=error.LoggerMock())
+        lexer.input("let x = 1\nlet y = 2")
+        tree = parse.Parser(track_positions=False).parse(None, lexer)
+        tree.list[1].lineno.should.equal(2)
+
+    def test_deep_nesting(self):
+        depth = 3000
+        deep = "let x = " + "(" * depth + "1" + ")" * depth
+        program = "let a = 1\n%s\nlet b = !" % deep + "!" * depth + "a"
+        expected = parse.Parser(logger=error.LoggerMock()).parse(program)
+        len(expected.list).should.equal(3)
+        for engine in parse.ENGINES:
+            parser = parse.Parser(logger=error.LoggerMock(), engine=engine)
+            (parser.parse(program) == expected).should.be.true
+            definitions = list(parser.iter_definitions(program))
+            [span for _, span in definitions].should.equal([
+                ((1, 1), (2, 1)),
+                ((2, 1), (3, 1)),
+                ((3, 1), None)
+            ])
+            ([node for node, _ in definitions] == expected.list).should.be.true
+
+    def test_parse_parallel(self):
+        program = "\n".join((
+            "let x = let y = 1 in y",
+            "type t = A | B of int ref",
+            "let f z = begin z end let g = f (x)",
+            "let mutable a [2] : int",
+            "let h = 'c' let k = \"s\"",
+            "let rec m n = match n with A -> 1 | B w -> 0 end"
+        ))
+        for data in (program, program + "\nlet w = = 1", program + " $"):
+            sequential = error.RecordingLogger()
+            expected = parse.Parser(logger=sequential).parse(data)
+            for piece_size in (1, 10, 1000):
+                logger = error.RecordingLogger()
+                tree = parse.parse_parallel(
+                    data,
+                    logger,
+                    workers=2,
+                    piece_size=piece_size
+                )
+                tree.should.equal(expected)
+                logger.records.should.equal(sequential.records)
+
 
 class TestParserRules(unittest.TestCase):
     """Test the Parser's coverage of Llama grammar."""
@@ -177,7 +384,7 @@ class TestParserRules(unittest.TestCase):
             ast.ConstExpression("z", ast.Char())
         )
         parse.quiet_parse('"z"', "expr").should.equal(
-            ast.ConstExpression(["z", '\0'], ast.String())
+            ast.ConstExpression(b"z", ast.String())
         )
         parse.quiet_parse("true", "expr").should.equal(
             ast.ConstExpression(True, ast.Bool())
@@ -0,0 +1,102 @@
+import os
+import unittest
+
+from compiler import error, parse
+from tests import helpers
+
+# pylint: disable=no-member
+
+
+class TestPrattParser(unittest.TestCase):
+    """Test the hand-written parser against the PLY engine."""
+
+    def _check(self, data, start="program"):
+        """
+        Assert that both engines parse 'data' alike: same tree, same
+        positions and same log. Return whether parsing succeeded.
+        """
+        results = []
+        for engine in ('ply', 'pratt'):
+            logger = error.RecordingLogger()
+            parser = parse.Parser(logger=logger, start=start, engine=engine)
+            tree = parser.parse(data)
+            results.append((tree, helpers.positions(tree), logger.records))
+        (ply, ply_pos, ply_log), (pratt, pratt_pos, pratt_log) = results
+        pratt.should.equal(ply)
+        pratt_pos.should.equal(ply_pos)
+        pratt_log.should.equal(ply_log)
+        return not ply_log
+
+    def test_engine(self):
+        parse.Parser(engine="pratt").engine.should.equal("pratt")
+        parse.Parser(
+            engine="pratt",
+            verbose=True,
+            logger=error.LoggerMock()
+        ).engine.should.equal("ply")
+
+    def test_correct_programs(self):
+        path = os.path.join(os.path.dirname(__file__), "correct")
+        for name in sorted(os.listdir(path)):
+            with open(os.path.join(path, name)) as stream:
+                self._check(stream.read()).should.be.true
+
+    def test_precedence(self):
+        for data in (
+            "a + b * c - d / e mod f",
+            "a ** b ** -c",
+            "-a ** b",
+            "not a && b || c && not d",
+            "a := b + 1; c := !d; e",
+            "if a then b else c + d; e",
+            "if a then if b then c else d",
+            "let x = 1 in x; y",
+            "not if a then b else c || d",
+            "delete a; b",
+            "f x y + g (h z) a[1, 2] - C x !y",
+            "begin a; b end * (c + d)",
+            "a = b && c <> d || e == f && g != h",
+            "x < y",
+            "match x with C (D y) 1 -> -1 | -2 -> z | w -> 2 end + 1",
+            "for i = 1 to n do a; b done; while c do d done",
+            "new int -> array [*, *] of char ref ref",
+            "dim 2 a + dim b"
+        ):
+            self._check(data, "expr").should.be.true
+
+    def test_nonassociative(self):
+        for data in ("a < b < c", "a := b := c", "a = b <> c"):
+            self._check(data, "expr").should.be.false
+
+    def test_types(self):
+        for data in (
+            "int -> bool -> unit",
+            "(int -> bool) -> unit",
+            "array of int -> int",
+            "array of int ref",
+            "int ref ref -> (float)"
+        ):
+            self._check(data, "type").should.be.true
+
+    def test_definitions(self):
+        self._check(
+            "let rec f (x : int) y : int = x + y and g = 1\n"
+            "let mutable a [3, 4] : int and mutable b : float\n"
+            "type color = Red | Green of int (int -> bool) and t = T\n"
+        ).should.be.true
+
+    def test_error_recovery(self):
+        for data in (
+            "let x = = 1\nlet y = 2",
+            "let f x = (1 + ) in",
+            "let",
+            "type t = A of | B\nlet z = 1 +",
+            "let x = 1 $ +\nlet y = 2"
+        ):
+            self._check(data).should.be.false
+
+    def test_start_symbols(self):
+        self._check("let x = 1 let y = 2", "def_list").should.be.true
+        self._check("C (D x) y", "pattern").should.be.true
+        self._check("x (y : int)", "param_seq").should.be.true
+        self._check("1 +", "expr").should.be.false
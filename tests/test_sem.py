@@ -21,6 +21,20 @@ class TestAnalyzer(unittest.TestCase):
         simple_ast = parse.quiet_parse("let x = 42")
         self.analyzer.analyze(simple_ast)
 
+    def test_analyze_definitions(self):
+        source = "type defs_t = DefsA\nlet defs_%s = DefsA"
+        for i, wrap in enumerate((list, iter)):
+            program = parse.quiet_parse(source % i)
+            analyzer = sem.Analyzer(logger=error.LoggerMock())
+            analyzer.analyze(wrap(program))
+            analyzer.logger.success.should.be.true
+
+    def test_analyze_deep(self):
+        depth = 3000
+        program = "let x = 42\nlet y = " + "let z = !" * depth + "x"
+        program += " in z" * depth
+        self.analyzer.analyze(parse.quiet_parse(program))
+
 
 class TestSemModuleAPI(unittest.TestCase):
     """Test API of the sem module."""
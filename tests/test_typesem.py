@@ -178,6 +178,16 @@ class TestTable(unittest.TestCase):
                     exc.prev.shouldnt.be(exc.node)
                     self._assert_node_lineinfo(exc.prev)
 
+    def test_validate_deep(self):
+        table = typesem.Table()
+        deep = ast.Int()
+        for _ in range(5000):
+            deep = ast.Function(ast.Ref(deep), ast.Char())
+        table.validate(deep)
+        table.validate.when.called_with(
+            ast.Ref(ast.Function(deep, ast.Array(deep)))
+        ).should.throw(typesem.ArrayReturnError)
+
     def test_validate(self):
         """Test the validating of types."""
         table = typesem.Table()